@@ -0,0 +1,93 @@
+import gzip
+import json
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from flask import Response, request
+
+# Helpers for the JSON API (/api/v1/..., routes in app.py). Lists are
+# {"data": [...], "next": token, "prev": token}; ?fields=a,b trims each
+# record to those fields; ?after=/?before= take the tokens back.
+
+PREFIX = "/api/v1"
+GZIP_MIN_BYTES = 1024
+MAX_BATCH = 500
+
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def _default(value):
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, timedelta):
+        # MySQL returns TIME columns as timedelta.
+        minutes, seconds = divmod(int(value.total_seconds()), 60)
+        return f"{minutes // 60:02d}:{minutes % 60:02d}:{seconds:02d}"
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def respond(payload, status=200):
+    body = json.dumps(payload, default=_default, separators=(",", ":")).encode("utf-8")
+    response = Response(body, status=status, mimetype="application/json")
+    response.vary.add("Accept-Encoding")
+    if len(body) >= GZIP_MIN_BYTES and request.accept_encodings["gzip"]:
+        response.set_data(gzip.compress(body, compresslevel=6))
+        response.headers["Content-Encoding"] = "gzip"
+    return response
+
+
+def error(status, message):
+    return respond({"error": message}, status)
+
+
+def records(fields, rows):
+    wanted = request.args.get("fields")
+    if not wanted:
+        return [dict(zip(fields, row)) for row in rows]
+    names = [name for name in wanted.split(",") if name]
+    unknown = [name for name in names if name not in fields]
+    if unknown:
+        raise ApiError(400, f"Unknown fields: {', '.join(unknown)}. Available: {', '.join(fields)}")
+    index = [fields.index(name) for name in names]
+    return [{name: row[i] for name, i in zip(names, index)} for row in rows]
+
+
+def listing(fields, page):
+    return respond({"data": records(fields, page["rows"]), "next": page["next"], "prev": page["prev"]})
+
+
+def body():
+    # Requiring a JSON body also keeps the API safe from cross-site form
+    # posts without CSRF tokens: browsers cannot send application/json
+    # cross-origin without a CORS preflight.
+    if not request.is_json:
+        raise ApiError(415, "Expected an application/json body")
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        raise ApiError(400, "Expected a JSON object")
+    return data
+
+
+def ids(data, key="ids"):
+    values = data.get(key)
+    if not isinstance(values, list) or not values or not all(type(v) is int for v in values):
+        raise ApiError(400, f"'{key}' must be a non-empty list of integer ids")
+    if len(values) > MAX_BATCH:
+        raise ApiError(400, f"At most {MAX_BATCH} ids per request")
+    return sorted(set(values))
+
+
+def field(data, key, choices=None):
+    value = data.get(key)
+    if not isinstance(value, str) or not value.strip():
+        raise ApiError(400, f"'{key}' is required")
+    if choices is not None and value not in choices:
+        raise ApiError(400, f"'{key}' must be one of: {', '.join(choices)}")
+    return value.strip()
@@ -1,23 +1,47 @@
 from flask import (
     Flask, render_template, request, redirect,
-    session, url_for, send_file
+    session, url_for, send_file, send_from_directory, g, Response, jsonify,
+    abort, has_request_context
 )
-import mysql.connector
 import os
 import io
-import smtplib
+import time
+import json
+import hashlib
+import mimetypes
 import random
 import stripe
-from datetime import date
+import click
+from contextlib import contextmanager
+from functools import wraps
+from datetime import date, datetime, timedelta
+from decimal import Decimal, InvalidOperation
 from dotenv import load_dotenv
-from flask_wtf.csrf import CSRFProtect
+from flask_wtf.csrf import CSRFProtect, generate_csrf
+
+from db import set_query_observer
+from pagination import decode_token
+import storage
+from repositories import Repositories
+import migrate
+from cache import TTLCache
+from mailer import Mailer
+import invoices
+import tenants
+import reports
+import billing
+import payments
+import ledger
+import jobs
+import metrics
+import sessions
+import events
+import api
+import ratelimit
+from assets import Assets
 
 from werkzeug.security import generate_password_hash, check_password_hash
-
-from reportlab.lib.pagesizes import letter
-from reportlab.pdfgen import canvas
-from reportlab.lib import colors
-from reportlab.platypus import Table, TableStyle
+from werkzeug.middleware.proxy_fix import ProxyFix
 
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
@@ -29,56 +53,394 @@ app.secret_key = os.getenv("SECRET_KEY", "")
 
 csrf = CSRFProtect(app)
 
+# Sessions live server-side (sessions.py): in this process by default, or
+# in Redis when SESSION_REDIS_URL is set. Idle sessions expire after
+# SESSION_LIFETIME_HOURS.
+app.session_interface = sessions.ServerSessionInterface(sessions.store_from_env())
+app.permanent_session_lifetime = timedelta(hours=float(os.getenv("SESSION_LIFETIME_HOURS", 168)))
+
+# Behind nginx or a load balancer, TRUST_PROXY=1 takes the client address
+# from X-Forwarded-For (one hop) instead of the proxy's own; rate limits
+# are per client address.
+if os.getenv("TRUST_PROXY") == "1":
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=1, x_proto=1)
+
+def revoke_sessions(role, account_id, keep_current=False):
+    # Logs the account out everywhere, optionally except this browser.
+    keep = session.sid if keep_current else None
+    app.session_interface.store.revoke(sessions.principal(role, account_id), keep=keep)
+
+mailer = Mailer.from_env(dead_letter_path=os.path.join(app.instance_path, "mail_dead_letter.jsonl"))
+
 db_config = {
     "host": os.getenv("DB_HOST", ""),
     "user": os.getenv("DB_USER", ""),
     "password": os.getenv("DB_PASSWORD", ""),
-    "database": os.getenv("DB_NAME", "")
+    "database": os.getenv("DB_NAME", ""),
+    # The C extension blocks a whole gevent worker while it waits on the
+    # server; gunicorn.conf.py sets DB_USE_PURE=1 for gevent workers.
+    "use_pure": os.getenv("DB_USE_PURE", "0") == "1",
 }
 
+# DB_BACKEND=sqlite runs everything on a local SQLite file (SQLITE_PATH)
+# instead of the MySQL server.
+backend = storage.backend_from_env(db_config)
+
 def get_db_connection():
     try:
-        return mysql.connector.connect(**db_config)
-    except mysql.connector.Error as err:
+        return backend.connect()
+    except storage.Error as err:
         print(f"❌ Database Connection Error: {err}")
         return None
 
+def get_db():
+    # One pooled connection per request, handed back in close_db().
+    if "db" not in g:
+        g.db = get_db_connection()
+    return g.db
+
+def repo():
+    # Repositories bound to this request's connection.
+    if "repo" not in g:
+        g.repo = Repositories(get_db())
+    return g.repo
+
+@app.teardown_appcontext
+def close_db(exc):
+    db = g.pop("db", None)
+    if db is not None:
+        db.close()
+
+@contextmanager
+def transaction():
+    db = get_db()
+    cur = db.cursor()
+    try:
+        yield cur
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        cur.close()
+
+# ---------------- INSTRUMENTATION ----------------
+SLOW_REQUEST_SECONDS = float(os.getenv("SLOW_REQUEST_MS", 0)) / 1000
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+def record_query(sql, seconds):
+    metrics.QUERY_SECONDS.observe(seconds, verb=metrics.query_verb(sql))
+    if has_request_context() and "queries" in g:
+        g.queries.append((seconds, sql))
+
+set_query_observer(record_query)
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    g.queries = []
+
+def observe_request(status):
+    started = g.pop("request_started", None)
+    if started is None:
+        return
+    elapsed = time.perf_counter() - started
+    endpoint = request.endpoint or "unmatched"
+    queries = g.get("queries", [])
+    db_seconds = sum(seconds for seconds, _ in queries)
+
+    metrics.REQUEST_SECONDS.observe(elapsed, endpoint=endpoint, method=request.method, status=status)
+    metrics.REQUEST_QUERIES.observe(len(queries), endpoint=endpoint)
+    metrics.REQUEST_DB_SECONDS.observe(db_seconds, endpoint=endpoint)
+
+    if SLOW_REQUEST_SECONDS and elapsed >= SLOW_REQUEST_SECONDS:
+        slowest = sorted(queries, key=lambda q: q[0], reverse=True)[:3]
+        app.logger.warning(
+            "Slow request %s %s (%s): %.0f ms, %d queries, %.0f ms in SQL%s",
+            request.method, request.path, endpoint, elapsed * 1000, len(queries), db_seconds * 1000,
+            "".join(f"\n  {seconds * 1000:.1f} ms  {' '.join(sql.split())[:200]}" for seconds, sql in slowest),
+        )
+
+@app.after_request
+def record_request(response):
+    observe_request(response.status_code)
+    return response
+
+@app.teardown_request
+def record_failed_request(exc):
+    # Unhandled exceptions skip after_request; count them as 500s.
+    if exc is not None:
+        observe_request(500)
+
+def pool_stats():
+    return {(name,): value for name, value in backend.stats().items()}
+
+metrics.registry.gauge("db_pool", "Connection pool state for this worker.", ("stat",), pool_stats)
+metrics.registry.gauge("mail_queue_pending", "Emails waiting to be delivered.", (), lambda: {(): mailer.pending()})
+
+# ---------------- LIVE UPDATES ----------------
+# Server-Sent Events (events.py). Each open stream holds a worker thread,
+# so a worker keeps at most EVENTS_MAX_STREAMS (default 8) open; pages
+# beyond that get a 204, which tells EventSource not to reconnect, and
+# live.js polls instead. Set EVENTS_REDIS_URL when there is more than one
+# worker.
+EVENT_HEARTBEAT_SECONDS = 15
+
+broker = events.broker_from_env()
+
+def notify(channel, event, **data):
+    # Called after the change is committed. A lost event only means a
+    # page is not refreshed, so it never fails the request.
+    try:
+        broker.publish(channel, event, data)
+    except Exception as e:
+        print(f"❌ Could not publish {event} to {channel}: {e}")
+
+@app.route("/events")
+def event_stream():
+    if "admin" in session:
+        channels = [f"admin:{session['admin']}", f"society:{session['society']}"]
+    elif "user" in session:
+        channels = [f"user:{session['user']}", f"society:{session['society']}"]
+    else:
+        return jsonify(error="Login required"), 401
+
+    subscription = broker.subscribe(channels)
+    if subscription is None:
+        return "", 204
+
+    def stream():
+        try:
+            yield "retry: 5000\n\n"
+            while True:
+                message = subscription.get(timeout=EVENT_HEARTBEAT_SECONDS)
+                if message is None:
+                    # Keeps proxies from timing out the connection, and
+                    # notices a client that has gone away.
+                    yield ": keep-alive\n\n"
+                    continue
+                event, data = message
+                yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+        finally:
+            subscription.close()
+
+    response = Response(stream(), mimetype="text/event-stream",
+                        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+    # Frees the slot even when the client leaves before the stream starts.
+    response.call_on_close(subscription.close)
+    return response
+
+metrics.registry.gauge("event_streams", "Open live-update streams on this worker.", (), lambda: {(): broker.hub.streams()})
+
+@app.route("/metrics")
+def metrics_endpoint():
+    if METRICS_TOKEN and request.headers.get("Authorization") != f"Bearer {METRICS_TOKEN}":
+        abort(403)
+    return Response(metrics.registry.render(), mimetype="text/plain; version=0.0.4")
+
+def page_args():
+    return {
+        "size": request.args.get("size", type=int),
+        "after": decode_token(request.args.get("after")),
+        "before": decode_token(request.args.get("before")),
+    }
+
+# The largest values the DECIMAL(12, 2) fund columns and the
+# DECIMAL(10, 2) bill columns can hold.
+FUND_AMOUNT_MAX = Decimal("9999999999.99")
+BILL_AMOUNT_MAX = Decimal("99999999.99")
+
+def form_amount(limit):
+    # The form's amount rounded to cents, or None unless it is a number
+    # above 0 and at most limit (so not NaN or Infinity either).
+    try:
+        amount = Decimal(request.form.get("amount", ""))
+    except InvalidOperation:
+        return None
+    if not amount.is_finite() or not 0 < amount <= limit:
+        return None
+    amount = amount.quantize(Decimal("0.01"))
+    return amount if amount > 0 else None
+
+# ---------------- PUBLIC PAGES & STATIC ----------------
+# url_for("static", ...) adds ?v=<content hash>, so a static URL changes
+# whenever its file does and can be cached by browsers for a year.
+# `flask --app app assets build` adds WebP/resized images and gzip/brotli
+# copies of CSS and JS (see assets.py); restart the app after building.
+STATIC_MAX_AGE = 365 * 24 * 3600
+PUBLIC_PAGE_MAX_AGE = 300
+
+assets = Assets(app.static_folder)
+app.jinja_env.globals["image_variants"] = assets.variants
+
+@app.url_defaults
+def fingerprint_static(endpoint, values):
+    if endpoint == "static" and "filename" in values:
+        version = assets.fingerprint(values["filename"])
+        if version:
+            values.setdefault("v", version)
+
+def static_file(filename):
+    versioned = "v" in request.args
+    max_age = STATIC_MAX_AGE if versioned else None
+    compressed = assets.precompressed(filename, request.accept_encodings)
+    if compressed:
+        path, encoding = compressed
+        response = send_from_directory(app.static_folder, path, max_age=max_age,
+                                       mimetype=mimetypes.guess_type(filename)[0])
+        response.headers["Content-Encoding"] = encoding
+    else:
+        response = send_from_directory(app.static_folder, filename, max_age=max_age)
+    if assets.has_precompressed(filename):
+        response.vary.add("Accept-Encoding")
+    if versioned:
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+    return response
+
+app.view_functions["static"] = static_file
+
+public_pages = {}
+
+def render_public(template):
+    # These pages are the same for every visitor (no session, no CSRF
+    # token: forms fetch theirs from /csrf_token), so each worker renders
+    # them once and answers repeat visits with 304 Not Modified.
+    page = public_pages.get(template)
+    if page is None or app.debug:
+        body = render_template(template).encode("utf-8")
+        source = app.jinja_env.loader.get_source(app.jinja_env, template)[1]
+        page = public_pages[template] = {
+            "body": body,
+            "etag": hashlib.sha256(body).hexdigest()[:16],
+            "last_modified": max(os.path.getmtime(source), assets.last_modified()),
+        }
+    response = Response(page["body"], mimetype="text/html")
+    response.set_etag(page["etag"])
+    response.last_modified = page["last_modified"]
+    response.cache_control.public = True
+    response.cache_control.max_age = PUBLIC_PAGE_MAX_AGE
+    return response.make_conditional(request)
+
 @app.route("/")
 def index():
-    return render_template("index.html")
+    return render_public("index.html")
+
+@app.route("/csrf_token")
+def public_csrf_token():
+    # The cached public pages cannot carry a per-session token, so their
+    # forms (the home page contact form) fetch one from here when used.
+    response = jsonify({"token": generate_csrf()})
+    response.cache_control.no_store = True
+    return response
 
 @app.route("/features")
 def features():
-    return render_template("features.html")
+    return render_public("features.html")
 
 @app.route("/about")
 def about():
-    return render_template("about.html")
+    return render_public("about.html")
 
 @app.route("/login")
 def login_page():
     return render_template("page.html")
 
 stripe.api_key = os.getenv("STRIPE_SECRET_KEY")
+if os.getenv("STRIPE_API_BASE"):
+    # Point the SDK at a local stand-in (stubs/stripe_stub.py or stripe-mock).
+    stripe.api_base = os.getenv("STRIPE_API_BASE")
+STRIPE_WEBHOOK_SECRET = os.getenv("STRIPE_WEBHOOK_SECRET", "")
+# The SDK waits up to 80 s by default, holding the worker all the while.
+try:
+    stripe.default_http_client = stripe.new_default_http_client(timeout=float(os.getenv("STRIPE_TIMEOUT", 20)))
+except TypeError:
+    # The urllib fallback (requests not installed) takes no timeout.
+    pass
+
+# ---------------- RATE LIMITS ----------------
+# Login, sign-up, password reset and the contact form check a password
+# hash (deliberately slow) or send an email, so they are throttled per
+# client address, and failed logins and OTP emails per account
+# (ratelimit.py). Counts live in each worker unless RATELIMIT_REDIS_URL
+# is set. RATELIMIT_ENABLED=0 turns every limit off.
+limiter = ratelimit.Limiter(ratelimit.store_from_env(), enabled=os.getenv("RATELIMIT_ENABLED", "1") != "0")
+
+# Token buckets per client address: (requests per second, burst).
+LOGIN_RATE = (1 / 6, 10)
+REGISTER_RATE = (1 / 300, 3)
+RESET_RATE = (1 / 120, 5)
+CONTACT_RATE = (1 / 120, 3)
+# Sliding windows per account: (events, seconds).
+FAILED_LOGINS = (5, 15 * 60)
+OTP_EMAILS = (3, 60 * 60)
+# Wrong codes before a sent OTP is thrown away.
+OTP_ATTEMPTS = 5
+
+def client_address():
+    return request.remote_addr or "unknown"
+
+def throttle(name, rate):
+    limiter.take(name, client_address(), *rate)
+
+def check_login(kind, email, password_hash, password):
+    # Once an account has FAILED_LOGINS recent failures, further attempts
+    # are refused before the (slow) hash check.
+    key = f"{kind}:{email.strip().lower()}"
+    limiter.window("failed_login", key, *FAILED_LOGINS,
+                   message="Too many failed logins for this account. Please try again later.")
+    if password_hash and check_password_hash(password_hash, password):
+        limiter.reset("failed_login", key)
+        return True
+    limiter.hit("failed_login", key, FAILED_LOGINS[1])
+    return False
+
+def allow_otp_email(email):
+    key = email.strip().lower()
+    limiter.window("otp_email", key, *OTP_EMAILS,
+                   message="Too many codes sent to this email address. Please try again later.")
+    limiter.hit("otp_email", key, OTP_EMAILS[1])
+
+def wrong_otp(code_key):
+    # Counts a wrong code; after OTP_ATTEMPTS the code is dropped and a new
+    # one has to be requested. Returns True when that happened.
+    attempts = session.get("otp_attempts", 0) + 1
+    if attempts < OTP_ATTEMPTS:
+        session["otp_attempts"] = attempts
+        return False
+    session.pop(code_key, None)
+    session.pop("otp_attempts", None)
+    return True
+
+@app.errorhandler(429)
+def too_many_requests(e):
+    if request.path.startswith(api.PREFIX):
+        response = api.error(429, e.description)
+    else:
+        response = Response(e.description, 429, mimetype="text/plain")
+    if e.retry_after:
+        response.headers["Retry-After"] = str(e.retry_after)
+    return response
 
 @app.route("/admin/register", methods=["GET", "POST"])
 def admin_register():
     if request.method == "POST":
+        throttle("register", REGISTER_RATE)
         name = request.form["name"]
         email = request.form["email"]
         password = request.form["password"]
         society_name = request.form["society_name"]
 
-        db = get_db_connection()
+        db = get_db()
         cur = db.cursor()
         cur.execute("SELECT id FROM admins WHERE email = %s", (email,))
         existing_admin = cur.fetchone()
         cur.close()
-        db.close()
 
         if existing_admin:
             return "Email already registered! Please login."
 
+        allow_otp_email(email)
         otp = str(random.randint(100000, 999999))
 
         session['temp_admin'] = {
@@ -88,6 +450,7 @@ def admin_register():
             'society_name': society_name
         }
         session['temp_otp'] = otp
+        session.pop('otp_attempts', None)
 
         send_email(
             to_email=email, 
@@ -111,7 +474,7 @@ def admin_verify_registration():
             data = session['temp_admin']
             
             try:
-                db = get_db_connection()
+                db = get_db()
                 cur = db.cursor()
                 cur.execute(
                     "INSERT INTO admins (name, email, password, society_name) VALUES (%s, %s, %s, %s)",
@@ -119,15 +482,17 @@ def admin_verify_registration():
                 )
                 db.commit()
                 cur.close()
-                db.close()
                 
                 session.pop('temp_admin', None)
                 session.pop('temp_otp', None)
+                session.pop('otp_attempts', None)
                 
                 return redirect("/admin/login")
                 
             except Exception as e:
                 return f"Database Error: {e}"
+        elif wrong_otp('temp_otp'):
+            return render_template("admin_verify_otp.html", error="Too many wrong codes. Please register again.")
         else:
             return render_template("admin_verify_otp.html", error="Invalid OTP! Please try again.")
 
@@ -135,19 +500,20 @@ def admin_verify_registration():
 @app.route("/admin/login", methods=["GET", "POST"])
 def admin_login():
     if request.method == "POST":
+        throttle("login", LOGIN_RATE)
         email = request.form["email"]
         password = request.form["password"]
 
-        db = get_db_connection()
+        db = get_db()
         cur = db.cursor()
         cur.execute("SELECT id, password FROM admins WHERE email=%s", (email,))
         admin = cur.fetchone()
         cur.close()
-        db.close()
 
-        if admin and check_password_hash(admin[1], password):
+        if check_login("admin", email, admin and admin[1], password):
             session.clear()
             session["admin"] = admin[0]
+            session["society"] = admin[0]
             return redirect("/admin/dashboard")
 
         return "Invalid Admin Credentials ❌"
@@ -157,19 +523,16 @@ def admin_login():
 @app.route("/user/login", methods=["GET", "POST"])
 def user_login():
     if request.method == "POST":
+        throttle("login", LOGIN_RATE)
         email = request.form["email"]
         password = request.form["password"]
 
-        db = get_db_connection()
-        cur = db.cursor()
-        cur.execute("SELECT id, password FROM users WHERE email=%s", (email,))
-        user = cur.fetchone()
-        cur.close()
-        db.close()
+        user = repo().users.login(email)
 
-        if user and check_password_hash(user[1], password):
+        if check_login("user", email, user and user[1], password):
             session.clear()
             session["user"] = user[0]
+            session["society"] = user[2]
             return redirect("/user/dashboard")
 
         return "Invalid User Credentials ❌"
@@ -179,21 +542,24 @@ def user_login():
 @app.route("/forgot_password", methods=["GET", "POST"])
 def forgot_password():
     if request.method == "POST":
+        throttle("reset", RESET_RATE)
         email = request.form["email"]
         
-        db = get_db_connection()
+        db = get_db()
         cur = db.cursor()
         
         cur.execute("SELECT id FROM admins WHERE email = %s", (email,))
         admin = cur.fetchone()
         
         cur.close()
-        db.close()
 
         if admin:
+            allow_otp_email(email)
             otp = str(random.randint(100000, 999999))
             session['reset_otp'] = otp
             session['reset_email'] = email
+            session.pop('reset_verified', None)
+            session.pop('otp_attempts', None)
             
             send_email(
             to_email=email, 
@@ -215,7 +581,11 @@ def verify_otp_route():
         user_otp = request.form["otp"]
         
         if "reset_otp" in session and session["reset_otp"] == user_otp:
+            session["reset_verified"] = True
+            session.pop("otp_attempts", None)
             return redirect("/reset_password")
+        elif "reset_otp" not in session or wrong_otp("reset_otp"):
+            return render_template("verify_otp.html", error="Too many wrong codes. Please request a new one.")
         else:
             return render_template("verify_otp.html", error="Invalid OTP! Try again later")
 
@@ -223,7 +593,8 @@ def verify_otp_route():
 
 @app.route("/reset_password", methods=["GET", "POST"])
 def reset_password():
-    if "reset_email" not in session:
+    # Only after the emailed code was entered correctly.
+    if "reset_email" not in session or not session.get("reset_verified"):
         return redirect("/admin/login")
 
     if request.method == "POST":
@@ -232,25 +603,27 @@ def reset_password():
         
         hashed_pw = generate_password_hash(new_password)
         
-        db = get_db_connection()
+        db = get_db()
         cur = db.cursor()
         
         cur.execute("UPDATE admins SET password = %s WHERE email = %s", (hashed_pw, email))
         db.commit()
+        cur.execute("SELECT id FROM admins WHERE email = %s", (email,))
+        admin = cur.fetchone()
         cur.close()
-        db.close()
+        if admin:
+            revoke_sessions("admin", admin[0])
         
         session.pop("reset_otp", None)
         session.pop("reset_email", None)
+        session.pop("reset_verified", None)
         
         return redirect("/admin/login")
 
     return render_template("reset_password.html")
 
 def send_email(to_email, otp, subject, heading, message_text):
-    # ---------------- CONFIGURATION ----------------
-    sender_email = os.getenv("MAIL_USERNAME")
-    sender_password = os.getenv("MAIL_PASSWORD")
+    sender_email = mailer.sender
     body = f"""
     <html>
       <body style="font-family: Arial, sans-serif; color: #333;">
@@ -277,15 +650,9 @@ def send_email(to_email, otp, subject, heading, message_text):
     msg['Subject'] = subject
     msg.attach(MIMEText(body, 'html'))
 
-    try:
-        server = smtplib.SMTP('smtp.gmail.com', 587)
-        server.starttls()
-        server.login(sender_email, sender_password)
-        text = msg.as_string()
-        server.sendmail(sender_email, to_email, text)
-        server.quit()
-    except Exception as e:
-        print(f"❌ Failed to send email: {e}")
+    # Delivered by the background mailer thread; retries and the
+    # dead-letter log are handled there.
+    mailer.send(msg)
 
 @app.route("/profile", methods=["GET", "POST"])
 def profile():
@@ -296,7 +663,7 @@ def profile():
     user_id = session[role]
     table = "admins" if role == "admin" else "users"
 
-    db = get_db_connection()
+    db = get_db()
     cur = db.cursor()
     msg = ""
 
@@ -309,13 +676,13 @@ def profile():
             (email, password, user_id)
         )
         db.commit()
+        revoke_sessions(role, user_id, keep_current=True)
         msg = "✅ Profile updated"
 
     cur.execute(f"SELECT email FROM {table} WHERE id=%s", (user_id,))
     data = cur.fetchone()
 
     cur.close()
-    db.close()
 
     return render_template("profile.html", user=data, role=role, msg=msg)
 
@@ -324,64 +691,145 @@ def logout():
     session.clear()
     return redirect("/")
 
+dashboard_cache = TTLCache(ttl=int(os.getenv("DASHBOARD_CACHE_TTL", 60)))
+
+def society_summary(admin_id):
+    # Everything on the dashboard that does not page: the fund, bill totals
+    # by status, and the resident list for the "Create New Bill" picker.
+    def load():
+        with transaction() as cur:
+            cur.execute("INSERT IGNORE INTO society_fund (admin_id, amount) VALUES (%s, 0)", (admin_id,))
+            cur.execute("SELECT amount FROM society_fund WHERE admin_id = %s", (admin_id,))
+            total_fund = cur.fetchone()[0]
+
+        by_status = repo().bills.totals_by_status(admin_id)
+        users = repo().users.for_society(admin_id)
+
+        unpaid_count, total_due = by_status.get("Unpaid", (0, 0))
+        return {
+            "total_fund": total_fund,
+            "total_due": total_due,
+            "total_paid": by_status.get("Paid", (0, 0))[1],
+            "unpaid_count": unpaid_count,
+            "tenant_count": len(users),
+            "users": users,
+        }
+    return dashboard_cache.get_or_set(admin_id, load)
+
+def invalidate_dashboard(admin_id):
+    dashboard_cache.invalidate(admin_id)
+
 @app.route("/admin/dashboard")
 def admin_dashboard():
     if "admin" not in session:
         return redirect("/admin/login")
 
     admin_id = session["admin"]
-    db = get_db_connection()
-    cur = db.cursor()
-
-    cur.execute("SELECT amount FROM society_fund WHERE admin_id = %s", (admin_id,))
-    fund_row = cur.fetchone()
-    
-    if fund_row:
-        total_fund = fund_row[0]
-    else:
-        cur.execute("INSERT INTO society_fund (admin_id, amount) VALUES (%s, 0)", (admin_id,))
-        db.commit()
-        total_fund = 0
-
-    query_bills = """
-        SELECT b.id, u.email, b.amount, b.status 
-        FROM bills b 
-        JOIN users u ON b.user_id = u.id 
-        WHERE u.admin_id = %s
-    """
-    cur.execute(query_bills, (admin_id,))
-    bills = cur.fetchall()
+    summary = society_summary(admin_id)
+    page = repo().bills.society_page(admin_id, **page_args())
 
-    cur.execute("SELECT id, name, email FROM users WHERE admin_id = %s", (admin_id,))
-    users = cur.fetchall()
+    cur = get_db().cursor()
+    cur.execute(
+        "SELECT id, period, status, done, total FROM billing_runs WHERE admin_id = %s ORDER BY id DESC LIMIT 1",
+        (admin_id,)
+    )
+    billing_run = cur.fetchone()
 
     cur.close()
-    db.close()
 
-    return render_template("admin_dashboard.html", bills=bills, users=users, total_fund=total_fund)
+    return render_template("admin_dashboard.html", bills=page["rows"], page=page, users=summary["users"],
+                           total_fund=summary["total_fund"], summary=summary, billing_run=billing_run,
+                           current_period=date.today().strftime("%Y-%m"))
 
 @app.route("/admin/visitors")
 def admin_visitors():
     if "admin" not in session:
         return redirect("/admin/login")
 
+    page = repo().visitors.society_page(session["admin"], **page_args())
+    return render_template("admin_visitors.html", visitors=page["rows"], page=page)
+
+# Gate check-in. The guard looks visitors up by phone or pass code among
+# the society's visitors for today; that list is loaded with one indexed
+# query and kept in memory with lookup tables, keyed by day so it rolls
+# over at midnight. A miss reloads once, in case the visitor was added
+# through another worker since.
+gate_cache = TTLCache(ttl=int(os.getenv("GATE_CACHE_TTL", 30)))
+
+def phone_key(phone):
+    # Last ten digits, so "+91 98765-43210" and "9876543210" match.
+    return "".join(ch for ch in phone if ch.isdigit())[-10:]
+
+def gate_day(admin_id):
+    def load():
+        rows = repo().visitors.for_gate(admin_id, day)
+        by_phone = {}
+        for row in rows:
+            by_phone.setdefault(phone_key(row[2]), []).append(row)
+        return {"rows": rows, "by_phone": by_phone, "by_code": {row[3]: row for row in rows if row[3]}}
+
+    day = date.today()
+    return gate_cache.get_or_set((admin_id, day), load)
+
+def invalidate_gate(admin_id):
+    gate_cache.invalidate((admin_id, date.today()))
+
+def gate_lookup(admin_id, query):
+    def find(visitors):
+        found = [visitors["by_code"][query]] if query in visitors["by_code"] else []
+        if key:
+            found += [row for row in visitors["by_phone"].get(key, ()) if row not in found]
+        return found
+
+    query = query.strip()
+    key = phone_key(query)
+    matches = find(gate_day(admin_id))
+    if not matches:
+        invalidate_gate(admin_id)
+        matches = find(gate_day(admin_id))
+    return matches
+
+def gate_move(admin_id, visitor_id, action):
+    # Returns an error message, or None once the visitor was moved.
+    visitors = repo().visitors
+    with transaction():
+        if action == "check_in":
+            owner = visitors.check_in(visitor_id, admin_id, date.today())
+        else:
+            owner = visitors.check_out(visitor_id, admin_id)
+    invalidate_gate(admin_id)
+    if owner is None:
+        return "Visitor is not expected today" if action == "check_in" else "Visitor is not inside"
+    status = "Inside" if action == "check_in" else "Exited"
+    notify(f"user:{owner}", "visitor", id=visitor_id, status=status)
+    notify(f"admin:{admin_id}", "visitor", id=visitor_id, status=status)
+    return None
+
+@app.route("/admin/visitors/gate", methods=["GET", "POST"])
+def visitor_gate():
+    if "admin" not in session:
+        return redirect("/admin/login")
     admin_id = session["admin"]
-    db = get_db_connection()
-    cur = db.cursor()
 
-    query = """
-        SELECT v.id, v.name, v.phone, v.visit_date, v.visit_time, v.status, u.email 
-        FROM visitors v 
-        JOIN users u ON v.user_id = u.id 
-        WHERE u.admin_id = %s
-        ORDER BY v.visit_date DESC
-    """
-    cur.execute(query, (admin_id,))
-    visitors = cur.fetchall()
-    
-    cur.close()
-    db.close()
-    return render_template("admin_visitors.html", visitors=visitors)
+    error = None
+    query = request.values.get("q", "").strip()
+    if request.method == "POST":
+        visitor_id = request.form.get("visitor_id", type=int)
+        action = request.form.get("action")
+        if action not in ("check_in", "check_out") or visitor_id is None:
+            return "Invalid gate action", 400
+        error = gate_move(admin_id, visitor_id, action)
+        if error is None:
+            return redirect(url_for("visitor_gate", q=query))
+
+    matches = gate_lookup(admin_id, query) if query else None
+    return render_template("admin_visitor_gate.html", query=query, matches=matches, error=error,
+                           today=gate_day(admin_id)["rows"])
+
+poll_cache = TTLCache(ttl=30)
+
+def society_polls(admin_id):
+    return poll_cache.get_or_set(admin_id, lambda: repo().polls.for_society(admin_id))
 
 @app.route("/admin/polls", methods=["GET", "POST"])
 def admin_polls():
@@ -389,57 +837,26 @@ def admin_polls():
         return redirect("/admin/login")
 
     admin_id = session["admin"]
-    db = get_db_connection()
-    cur = db.cursor()
 
     if request.method == "POST":
         question = request.form["question"]
         opt1 = request.form["option1"]
         opt2 = request.form["option2"]
         
-        cur.execute(
-            "INSERT INTO polls (question, option1, option2, admin_id) VALUES (%s, %s, %s, %s)", 
-            (question, opt1, opt2, admin_id)
-        )
-        db.commit()
-
-    query = """
-        SELECT p.id, p.question, p.option1, p.option2, p.status,
-        (SELECT COUNT(*) FROM poll_votes v WHERE v.poll_id = p.id AND v.choice = 'option1') as vote1,
-        (SELECT COUNT(*) FROM poll_votes v WHERE v.poll_id = p.id AND v.choice = 'option2') as vote2
-        FROM polls p 
-        WHERE p.admin_id = %s
-        ORDER BY p.id DESC
-    """
-    cur.execute(query, (admin_id,))
-    polls = cur.fetchall()
+        with transaction():
+            poll_id = repo().polls.create(admin_id, question, opt1, opt2)
+        poll_cache.invalidate(admin_id)
+        notify(f"society:{admin_id}", "poll", id=poll_id)
 
-    cur.close()
-    db.close()
-    return render_template("admin_polls.html", polls=polls)
+    return render_template("admin_polls.html", polls=society_polls(admin_id))
 
 @app.route("/admin/bookings")
 def admin_bookings():
     if "admin" not in session:
         return redirect("/admin/login")
 
-    admin_id = session["admin"]
-    db = get_db_connection()
-    cur = db.cursor()
-
-    query = """
-        SELECT b.id, b.facility_name, b.booking_date, b.time_slot, b.status, u.email 
-        FROM bookings b 
-        JOIN users u ON b.user_id = u.id 
-        WHERE u.admin_id = %s
-        ORDER BY b.booking_date DESC
-    """
-    cur.execute(query, (admin_id,))
-    bookings = cur.fetchall()
-    
-    cur.close()
-    db.close()
-    return render_template("admin_bookings.html", bookings=bookings)
+    page = repo().bookings.society_page(session["admin"], **page_args())
+    return render_template("admin_bookings.html", bookings=page["rows"], page=page)
 
 @app.route("/admin/update_fund", methods=["POST"])
 def update_fund():
@@ -447,33 +864,50 @@ def update_fund():
         return redirect("/admin/login")
 
     admin_id = session["admin"]
-    new_amount = request.form["amount"]
+    kind = request.form.get("kind")
+    note = request.form.get("note", "").strip()[:255] or None
+    amount = form_amount(FUND_AMOUNT_MAX)
+    if kind not in ("credit", "debit") or amount is None:
+        return "Error: Invalid amount", 400
 
-    db = get_db_connection()
-    cur = db.cursor()
-    
-    cur.execute("UPDATE society_fund SET amount = %s WHERE admin_id = %s", (new_amount, admin_id))
-    db.commit()
-
-    cur.close()
-    db.close()
+    # The fund is only ever moved by ledger entries, never overwritten.
+    with transaction() as cur:
+        ledger.post(cur, admin_id, amount if kind == "credit" else -amount, kind, note=note)
+    invalidate_dashboard(admin_id)
 
     return redirect("/admin/dashboard")
 
-@app.route("/admin/delete_bill/<int:bill_id>", methods=["POST"]) 
-def delete_bill(bill_id):
+@app.route("/admin/fund")
+def fund_history():
     if "admin" not in session:
         return redirect("/admin/login")
 
+    admin_id = session["admin"]
+    as_of = None
     try:
-        db = get_db_connection()
-        cur = db.cursor()
+        as_of = date.fromisoformat(request.args["as_of"]) if request.args.get("as_of") else None
+    except ValueError:
+        return "Error: Date must be YYYY-MM-DD", 400
+    # "As of" a day means at its end.
+    balance_as_of = repo().fund.balance_as_of(admin_id, as_of + timedelta(days=1)) if as_of else None
 
-        cur.execute("DELETE FROM bills WHERE id = %s", (bill_id,))
+    page = repo().fund.page(admin_id, **page_args())
+    return render_template("admin_fund.html", entries=page["rows"], page=page, kinds=ledger.KINDS,
+                           total_fund=society_summary(admin_id)["total_fund"],
+                           as_of=as_of, balance_as_of=balance_as_of)
 
-        db.commit()
-        cur.close()
-        db.close()
+@app.route("/admin/delete_bill/<int:bill_id>", methods=["POST"]) 
+def delete_bill(bill_id):
+    if "admin" not in session:
+        return redirect("/admin/login")
+
+    try:
+        with transaction():
+            deleted = repo().bills.delete(bill_id, session["admin"])
+        if not deleted:
+            return "Bill not found", 404
+        invoices.invalidate(bill_id)
+        invalidate_dashboard(session["admin"])
     except Exception as e:
         print(f"Error deleting bill: {e}")
 
@@ -485,52 +919,144 @@ def admin_tenants():
         return redirect("/admin/login")
     
     admin_id = session["admin"]
-    db = get_db_connection()
-    
+
     if request.method == "POST":
         name = request.form["name"]
         email = request.form["email"]
         password = generate_password_hash(request.form["password"])
-        
+
         try:
-            cur = db.cursor()
-            cur.execute(
-                "INSERT INTO users (name, email, password, admin_id) VALUES (%s, %s, %s, %s)", 
-                (name, email, password, admin_id)
-            )
-            
-            user_id = cur.lastrowid
-            cur.execute("INSERT INTO bills (user_id, amount, status) VALUES (%s, 0, 'Paid')", (user_id,))
-            
-            db.commit()
-            cur.close()
-        except mysql.connector.Error as err:
+            with transaction():
+                user_id = repo().users.create(admin_id, name, email, password)
+                repo().bills.create(user_id, admin_id, 0, "Paid")
+            invalidate_dashboard(admin_id)
+        except storage.Error as err:
             print(f"Error: {err}")
 
-    cur = db.cursor()
-    cur.execute("SELECT id, name, email FROM users WHERE admin_id = %s ORDER BY id DESC", (admin_id,))
-    tenants = cur.fetchall()
-    cur.close()
-    db.close()
+    return render_template("admin_tenants.html", tenants=repo().users.for_society(admin_id))
 
-    return render_template("admin_tenants.html", tenants=tenants)
-
-@app.route("/admin/delete_tenant/<int:user_id>", methods=["POST"])
-def delete_tenant(user_id):
+@app.route("/admin/tenants/import", methods=["POST"])
+def import_tenants():
     if "admin" not in session:
         return redirect("/admin/login")
 
+    admin_id = session["admin"]
+    upload = request.files.get("file")
+    if not upload or not upload.filename:
+        return "Please choose a CSV or XLSX file", 400
+
+    created, errors = tenants.import_tenants(get_db(), admin_id, tenants.read_rows(upload))
+    if created:
+        invalidate_dashboard(admin_id)
+    return render_template("admin_tenants.html", tenants=repo().users.for_society(admin_id),
+                           imported=created, import_errors=errors)
+
+def streamed(query):
+    # Rows for a streamed response, fetched as the body is sent on a
+    # connection of their own: the request's is handed back before that.
+    db = get_db_connection()
     try:
-        db = get_db_connection()
-        cur = db.cursor()
+        yield from query(Repositories(db))
+    finally:
+        db.close()
 
-        cur.execute("DELETE FROM bills WHERE user_id = %s", (user_id,))
+def download(name, header, rows, fmt="csv", title=None, widths=None):
+    if fmt == "pdf":
+        body = reports.stream_pdf(title, date.today().strftime("%d %b %Y"), header, rows, widths)
+        mimetype = "application/pdf"
+    else:
+        body = reports.stream_csv(header, rows)
+        mimetype = "text/csv"
+    return Response(body, mimetype=mimetype, headers={"Content-Disposition": f"attachment; filename={name}.{fmt}"})
 
-        cur.execute("DELETE FROM users WHERE id = %s", (user_id,))
+@app.route("/admin/tenants/export")
+def export_tenants():
+    if "admin" not in session:
+        return redirect("/admin/login")
+    admin_id = session["admin"]
+    return download("tenants", ("id", "name", "email", "joined"),
+                    streamed(lambda repos: repos.users.export_rows(admin_id)))
 
-        db.commit()
-        cur.close()
-        db.close()
+@app.route("/admin/bills/export")
+def export_bills():
+    if "admin" not in session:
+        return redirect("/admin/login")
+    admin_id = session["admin"]
+    return download("bills",
+                    ("bill_id", "tenant_id", "name", "email", "period", "amount", "status", "created_at", "paid_at"),
+                    streamed(lambda repos: repos.bills.export_rows(admin_id)))
+
+# ---------------- REPORTS ----------------
+# Column widths (relative) for the PDF versions.
+COLLECTION_WIDTHS = (12, 8, 14, 14, 14, 10)
+ARREARS_WIDTHS = (6, 18, 24, 11, 11, 11, 11, 12, 11)
+STATEMENT_WIDTHS = (12, 40, 14, 14, 14)
+
+@app.route("/admin/reports")
+def admin_reports():
+    if "admin" not in session:
+        return redirect("/admin/login")
+
+    admin_id = session["admin"]
+    bills = repo().bills
+    # Both are aggregates, at most one row per month or per tenant.
+    collection = list(reports.collection_rows(bills.monthly_collection(admin_id)))
+    arrears = list(reports.arrears_rows(bills.arrears(admin_id, reports.ageing_cutoffs())))
+    return render_template("admin_reports.html", collection=collection, arrears=arrears,
+                           tenants=repo().users.for_society(admin_id))
+
+@app.route("/admin/reports/collection.<any(csv, pdf):fmt>")
+def collection_report(fmt):
+    if "admin" not in session:
+        return redirect("/admin/login")
+    admin_id = session["admin"]
+    rows = streamed(lambda repos: reports.collection_rows(repos.bills.monthly_collection(admin_id)))
+    return download("monthly_collection", reports.COLLECTION_HEADER, rows, fmt,
+                    "Monthly Collection", COLLECTION_WIDTHS)
+
+@app.route("/admin/reports/arrears.<any(csv, pdf):fmt>")
+def arrears_report(fmt):
+    if "admin" not in session:
+        return redirect("/admin/login")
+    admin_id = session["admin"]
+    cutoffs = reports.ageing_cutoffs()
+    rows = streamed(lambda repos: reports.arrears_rows(repos.bills.arrears(admin_id, cutoffs)))
+    return download("arrears", reports.ARREARS_HEADER, rows, fmt, "Arrears Ageing", ARREARS_WIDTHS)
+
+def statement_download(user_id, email, fmt):
+    rows = streamed(lambda repos: reports.statement_rows(repos.bills.statement(user_id)))
+    return download(f"statement_{user_id}", reports.STATEMENT_HEADER, rows, fmt,
+                    f"Statement - {email}", STATEMENT_WIDTHS)
+
+@app.route("/admin/reports/statement.<any(csv, pdf):fmt>")
+def tenant_statement(fmt):
+    if "admin" not in session:
+        return redirect("/admin/login")
+    user_id = request.args.get("user_id", type=int)
+    tenant = repo().users.in_society(user_id, session["admin"]) if user_id else None
+    if not tenant:
+        return "Tenant not found", 404
+    return statement_download(user_id, tenant[2], fmt)
+
+@app.route("/user/statement.<any(csv, pdf):fmt>")
+def user_statement(fmt):
+    if "user" not in session:
+        return redirect("/user/login")
+    tenant = repo().users.in_society(session["user"], session["society"])
+    return statement_download(session["user"], tenant[2], fmt)
+
+@app.route("/admin/delete_tenant/<int:user_id>", methods=["POST"])
+def delete_tenant(user_id):
+    if "admin" not in session:
+        return redirect("/admin/login")
+
+    try:
+        with transaction():
+            deleted = repo().users.delete(user_id, session["admin"])
+        if not deleted:
+            return "Tenant not found", 404
+        revoke_sessions("user", user_id)
+        invalidate_dashboard(session["admin"])
     except Exception as e:
         print(f"Error deleting tenant: {e}")
 
@@ -541,29 +1067,17 @@ def edit_tenant():
     if "admin" not in session:
         return redirect("/admin/login")
 
-    user_id = request.form["user_id"]
+    user_id = request.form.get("user_id", type=int)
     name = request.form["name"]
     email = request.form["email"]
     password_input = request.form["password"]
+    hashed_pw = generate_password_hash(password_input) if password_input.strip() else None
 
-    db = get_db_connection()
-    cur = db.cursor()
-
-    if password_input.strip():
-        hashed_pw = generate_password_hash(password_input)
-        cur.execute(
-            "UPDATE users SET name=%s, email=%s, password=%s WHERE id=%s",
-            (name, email, hashed_pw, user_id)
-        )
-    else:
-        cur.execute(
-            "UPDATE users SET name=%s, email=%s WHERE id=%s",
-            (name, email, user_id)
-        )
-
-    db.commit()
-    cur.close()
-    db.close()
+    with transaction():
+        updated = repo().users.update(user_id, session["admin"], name, email, hashed_pw)
+    if hashed_pw and updated:
+        revoke_sessions("user", user_id)
+    invalidate_dashboard(session["admin"])
 
     return redirect("/admin/tenants")
 
@@ -572,23 +1086,8 @@ def admin_invoices():
     if "admin" not in session:
         return redirect("/admin/login")
 
-    admin_id = session["admin"]
-    db = get_db_connection()
-    cur = db.cursor()
-    
-    query = """
-        SELECT bills.id, users.email, bills.amount, bills.status 
-        FROM bills 
-        JOIN users ON bills.user_id = users.id
-        WHERE users.admin_id = %s
-        ORDER BY bills.id DESC
-    """
-    cur.execute(query, (admin_id,))
-    invoices = cur.fetchall()
-    
-    cur.close()
-    db.close()
-    return render_template("admin_invoices.html", invoices=invoices)
+    page = repo().bills.society_page(session["admin"], **page_args())
+    return render_template("admin_invoices.html", invoices=page["rows"], page=page)
 
 @app.route("/admin/settings", methods=["GET", "POST"])
 def admin_settings():
@@ -600,13 +1099,13 @@ def admin_settings():
         new_password = request.form["new_password"]
         admin_id = session["admin"]
 
-        db = get_db_connection()
+        db = get_db()
         cur = db.cursor()
         cur.execute("UPDATE admins SET password=%s WHERE id=%s",
                     (new_password, admin_id))
         db.commit()
         cur.close()
-        db.close()
+        revoke_sessions("admin", admin_id, keep_current=True)
         msg = "Password updated successfully!"
 
     return render_template("admin_settings.html", msg=msg)
@@ -623,15 +1122,11 @@ def add_bill():
         if not user_id or not amount:
             return "Error: Missing User or Amount", 400
 
-        db = get_db_connection()
-        cur = db.cursor()
-        cur.execute(
-            "INSERT INTO bills (user_id, amount, status) VALUES (%s, %s, 'Unpaid')", 
-            (user_id, amount)
-        )
-        db.commit()
-        cur.close()
-        db.close()
+        with transaction():
+            bill_id = repo().bills.create_for_tenant(user_id, session["admin"], amount)
+        if bill_id is None:
+            return "Error: Tenant not found", 404
+        invalidate_dashboard(session["admin"])
 
         return redirect("/admin/dashboard")
 
@@ -639,20 +1134,64 @@ def add_bill():
         print(f"Error generating bill: {e}")
         return f"An error occurred: {e}", 500
 
+@app.route("/admin/billing/run", methods=["POST"])
+def run_monthly_billing():
+    if "admin" not in session:
+        return redirect("/admin/login")
+
+    admin_id = session["admin"]
+    period = request.form.get("period", "")
+    if not billing.PERIOD.match(period):
+        return "Error: Billing period must be YYYY-MM", 400
+    amount = form_amount(BILL_AMOUNT_MAX)
+    if amount is None:
+        return "Error: Invalid amount", 400
+
+    with transaction() as cur:
+        cur.execute(
+            "INSERT INTO billing_runs (admin_id, period, amount) VALUES (%s, %s, %s)",
+            (admin_id, period, amount)
+        )
+        run_id = cur.lastrowid
+
+    jobs.submit(billing.run_billing, get_db_connection, run_id, admin_id, period, amount,
+                on_complete=lambda: invalidate_dashboard(admin_id), commit_batches=backend.single_writer)
+    return redirect("/admin/dashboard")
+
+@app.route("/admin/billing/runs/<int:run_id>")
+def billing_run_status(run_id):
+    if "admin" not in session:
+        return redirect("/admin/login")
+
+    cur = get_db().cursor(dictionary=True)
+    cur.execute(
+        """SELECT id, period, amount, status, total, done, bills_created, error, started_at, finished_at
+           FROM billing_runs WHERE id = %s AND admin_id = %s""",
+        (run_id, session["admin"])
+    )
+    run = cur.fetchone()
+    cur.close()
+
+    if not run:
+        return jsonify(error="Billing run not found"), 404
+    run["amount"] = str(run["amount"])
+    return jsonify(run)
+
 @app.route("/user/dashboard")
 def user_dashboard():
     if "user" not in session:
         return redirect("/user/login")
 
-    user_id = session["user"]
-    db = get_db_connection()
-    cur = db.cursor()
-    cur.execute("SELECT id, amount, status FROM bills WHERE user_id = %s", (session['user'],))
-    bills = cur.fetchall()
-    cur.close()
-    db.close()
+    return render_template("user_dashboard.html", bills=repo().bills.for_user(session["user"]))
+
+# Rendered notice feed pages per society: {paging args: (html, etag)}.
+# The feed has nothing resident-specific in it, so a society's residents
+# share one copy.
+notice_cache = TTLCache(ttl=60)
+NOTICE_PAGES_PER_SOCIETY = 32
 
-    return render_template("user_dashboard.html", bills=bills)
+def invalidate_notices(admin_id):
+    notice_cache.invalidate(admin_id)
 
 @app.route("/admin/notices", methods=["GET", "POST"])
 def admin_notices():
@@ -660,23 +1199,15 @@ def admin_notices():
         return redirect("/admin/login")
 
     admin_id = session["admin"]
-    db = get_db_connection()
-    cur = db.cursor()
 
     if request.method == "POST":
         title = request.form["title"]
         content = request.form["content"]
-        cur.execute("INSERT INTO notices (title, content, admin_id) VALUES (%s, %s, %s)", 
-                    (title, content, admin_id))
-        db.commit()
+        with transaction():
+            repo().notices.create(admin_id, title, content)
+        invalidate_notices(admin_id)
 
-    cur.execute("SELECT id, title, content, DATE_FORMAT(created_at, '%d %b %Y') FROM notices WHERE admin_id = %s ORDER BY id DESC", (admin_id,))
-    notices = cur.fetchall()
-
-    cur.close()
-    db.close()
-
-    return render_template("admin_notices.html", notices=notices)
+    return render_template("admin_notices.html", notices=repo().notices.for_society(admin_id))
 
 @app.route("/admin/edit_notice", methods=["POST"])
 def edit_notice():
@@ -687,13 +1218,9 @@ def edit_notice():
     title = request.form["title"]
     content = request.form["content"]
 
-    db = get_db_connection()
-    cur = db.cursor()
-    cur.execute("UPDATE notices SET title=%s, content=%s WHERE id=%s",
-                (title, content, notice_id))
-    db.commit()
-    cur.close()
-    db.close()
+    with transaction():
+        repo().notices.update(notice_id, session["admin"], title, content)
+    invalidate_notices(session["admin"])
 
     return redirect("/admin/notices")
 
@@ -702,12 +1229,9 @@ def delete_notice(id):
     if "admin" not in session:
         return redirect("/admin/login")
 
-    db = get_db_connection()
-    cur = db.cursor()
-    cur.execute("DELETE FROM notices WHERE id=%s", (id,))
-    db.commit()
-    cur.close()
-    db.close()
+    with transaction():
+        repo().notices.delete(id, session["admin"])
+    invalidate_notices(session["admin"])
 
     return redirect("/admin/notices")
 
@@ -716,114 +1240,62 @@ def user_notices():
     if "user" not in session:
         return redirect("/user/login")
 
-    db = get_db_connection()
-    cur = db.cursor()
-    cur.execute(
-        "SELECT title, content, DATE_FORMAT(created_at, '%d %b %Y') as date FROM notices ORDER BY id DESC")
-    notices = cur.fetchall()
-    cur.close()
-    db.close()
-
-    return render_template("user_notices.html", notices=notices)
+    admin_id = session["society"]
+    pages = notice_cache.get_or_set(admin_id, dict)
+    key = (request.args.get("size"), request.args.get("after"), request.args.get("before"))
+    feed = pages.get(key)
+    if feed is None:
+        page = repo().notices.society_page(admin_id, **page_args())
+        body = render_template("user_notices.html", notices=page["rows"], page=page).encode("utf-8")
+        feed = (body, hashlib.sha256(body).hexdigest()[:16])
+        if len(pages) < NOTICE_PAGES_PER_SOCIETY:
+            pages[key] = feed
+
+    # Revalidated on every visit; an unchanged feed costs a 304 and no query.
+    body, etag = feed
+    response = Response(body, mimetype="text/html")
+    response.set_etag(etag)
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
 
 @app.route("/admin/download_invoice/<int:bill_id>")
 def download_invoice(bill_id):
     if "admin" not in session:
         return redirect("/admin/login")
 
-    db = get_db_connection()
-    cur = db.cursor()
-    query = """
-        SELECT bills.id, bills.amount, bills.status, users.email 
-        FROM bills JOIN users ON bills.user_id = users.id 
-        WHERE bills.id = %s
-    """
-    cur.execute(query, (bill_id,))
-    bill = cur.fetchone()
-    cur.close()
-    db.close()
-
+    bill = repo().bills.invoice(bill_id, session["admin"])
     if not bill:
         return "Invoice not found", 404
 
     invoice_id, amount, status, user_email = bill
-    today_date = date.today().strftime("%B %d, %Y")
-
-    buffer = io.BytesIO()
-    c = canvas.Canvas(buffer, pagesize=letter)
-    width, height = letter
-
-    c.setFillColor(colors.HexColor("#ff8c00"))
-    c.rect(0, height - 100, width, 100, fill=1, stroke=0)
-
-    c.setFillColor(colors.black)
-    c.setFont("Helvetica-Bold", 24)
-    c.drawString(50, height - 60, "Society Management System")
+    pdf = invoices.cached_invoice(invoice_id, amount, status, user_email)
 
-    c.setFillColor(colors.white)
-    c.setFont("Helvetica", 12)
-    c.drawString(50, height - 80, "Sector 62, Noida, India - 201309")
+    return send_file(io.BytesIO(pdf), as_attachment=True, download_name=f"Invoice_{invoice_id}.pdf", mimetype='application/pdf')
 
-    c.setFillColor(colors.black)
-    c.setFont("Helvetica-Bold", 16)
-    c.drawRightString(width - 50, height - 140, "INVOICE")
-
-    c.setFont("Helvetica", 12)
-    c.drawRightString(width - 50, height - 160, f"#{invoice_id:04d}")
-    c.drawRightString(width - 50, height - 175, f"Date: {today_date}")
-
-    c.setFont("Helvetica-Bold", 12)
-    c.drawString(50, height - 160, "Bill To:")
-    c.setFont("Helvetica", 12)
-    c.drawString(50, height - 175, user_email)
-
-    data = [
-        ["Description", "Amount (INR)"],
-        ["Monthly Society Maintenance", f"Rs. {amount:,.2f}"],
-        ["Late Fees", "Rs. 0.00"],
-        ["TOTAL", f"Rs. {amount:,.2f}"]
-    ]
-
-    table = Table(data, colWidths=[400, 100])
-    style = TableStyle([
-        ('BACKGROUND', (0, 0), (1, 0), colors.HexColor(
-            "#333333")),
-        ('TEXTCOLOR', (0, 0), (1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('ALIGN', (0, 0), (0, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('BACKGROUND', (0, -1), (-1, -1),
-         colors.HexColor("#ff8c00")),
-        ('GRID', (0, 0), (-1, -2), 1, colors.black)
-    ])
-    table.setStyle(style)
-    table.wrapOn(c, width, height)
-    table.drawOn(c, 50, height - 350)
-
-    if status == "Paid":
-        c.saveState()
-        c.translate(width/2, height/2)
-        c.rotate(45)
-        c.setFillColorRGB(0, 1, 0, 0.3)
-        c.setFont("Helvetica-Bold", 80)
-        c.drawCentredString(0, 0, "PAID")
-        c.restoreState()
-    else:
-        c.saveState()
-        c.translate(width/2, height/2)
-        c.rotate(45)
-        c.setFillColorRGB(1, 0, 0, 0.1)
-        c.setFont("Helvetica-Bold", 80)
-        c.drawCentredString(0, 0, "UNPAID")
-        c.restoreState()
+@app.route("/admin/invoices/export")
+def export_invoices():
+    if "admin" not in session:
+        return redirect("/admin/login")
 
-    c.showPage()
-    c.save()
+    admin_id = session["admin"]
+    month = request.args.get("month", "")
 
-    buffer.seek(0)
-    from flask import send_file
-    return send_file(buffer, as_attachment=True, download_name=f"Invoice_{invoice_id}.pdf", mimetype='application/pdf')
+    start = end = None
+    if month:
+        try:
+            start = datetime.strptime(month, "%Y-%m").date()
+        except ValueError:
+            return "Invalid month, expected YYYY-MM", 400
+        start, end = month_bounds(start)
+    rows = repo().bills.invoices_for_society(admin_id, start, end)
+
+    filename = f"Invoices_{month or 'all'}.zip"
+    return Response(
+        invoices.stream_invoice_zip(rows),
+        mimetype="application/zip",
+        headers={"Content-Disposition": f"attachment; filename={filename}"},
+    )
 
 @app.route("/user/complaints", methods=["GET", "POST"])
 def user_complaints():
@@ -831,23 +1303,15 @@ def user_complaints():
         return redirect("/user/login")
 
     user_id = session["user"]
-    db = get_db_connection()
-    cur = db.cursor()
 
     if request.method == "POST":
         subject = request.form["subject"]
         description = request.form["description"]
-        cur.execute("INSERT INTO complaints (user_id, subject, description) VALUES (%s, %s, %s)",
-                    (user_id, subject, description))
-        db.commit()
-
-    cur.execute(
-        "SELECT subject, description, status, created_at FROM complaints WHERE user_id = %s ORDER BY id DESC", (user_id,))
-    my_complaints = cur.fetchall()
+        with transaction():
+            complaint_id = repo().complaints.create(user_id, session["society"], subject, description)
+        notify(f"admin:{session['society']}", "complaint", id=complaint_id, status="Pending")
 
-    cur.close()
-    db.close()
-    return render_template("user_complaints.html", complaints=my_complaints)
+    return render_template("user_complaints.html", complaints=repo().complaints.for_user(user_id))
 
 @app.route("/admin/complaints", methods=["GET", "POST"])
 def admin_complaints():
@@ -855,34 +1319,23 @@ def admin_complaints():
         return redirect("/admin/login")
 
     admin_id = session["admin"]
-    db = get_db_connection()
-    cur = db.cursor()
 
     if request.method == "POST":
-        complaint_id = request.form["complaint_id"]
+        complaint_id = request.form.get("complaint_id", type=int)
         status = request.form["status"]
-        cur.execute("UPDATE complaints SET status=%s WHERE id=%s", (status, complaint_id))
-        db.commit()
+        with transaction():
+            owner = repo().complaints.set_status(complaint_id, admin_id, status)
+        if owner:
+            notify(f"user:{owner}", "complaint", id=complaint_id, status=status)
+            notify(f"admin:{admin_id}", "complaint", id=complaint_id, status=status)
         return redirect("/admin/complaints")
 
-    query = """
-        SELECT c.id, u.email, c.subject, c.description, c.status, 
-               DATE_FORMAT(c.created_at, '%d %b %Y') as date
-        FROM complaints c
-        JOIN users u ON c.user_id = u.id
-        WHERE u.admin_id = %s
-        ORDER BY c.status ASC, c.created_at DESC
-    """
-    cur.execute(query, (admin_id,))
-    complaints = cur.fetchall()
-
-    cur.close()
-    db.close()
-    return render_template("admin_complaints.html", complaints=complaints)
+    page = repo().complaints.society_page(admin_id, **page_args())
+    return render_template("admin_complaints.html", complaints=page["rows"], page=page)
 
 @app.route('/dashboard')
 def dashboard():
-    db = get_db_connection()
+    db = get_db()
     if not db:
         return "Database Error"
 
@@ -892,7 +1345,6 @@ def dashboard():
     result = cur.fetchone()
 
     cur.close()
-    db.close()
 
     total_fund = result[0] if result[0] else 0
 
@@ -903,103 +1355,133 @@ def user_visitors():
     if "user" not in session:
         return redirect("/user/login")
     user_id = session["user"]
-    db = get_db_connection()
-    cur = db.cursor()
 
     if request.method == "POST":
         name = request.form["name"]
         phone = request.form["phone"]
-        date = request.form["date"]
-        time = request.form["time"]
-        cur.execute("INSERT INTO visitors (user_id, name, phone, visit_date, visit_time) VALUES (%s, %s, %s, %s, %s)",
-                    (user_id, name, phone, date, time))
-        db.commit()
-
-    cur.execute(
-        "SELECT name, phone, visit_date, visit_time, status FROM visitors WHERE user_id=%s ORDER BY id DESC", (user_id,))
-    visitors = cur.fetchall()
+        visit_date = request.form["date"]
+        visit_time = request.form["time"]
+        with transaction():
+            visitor_id, _ = repo().visitors.create(user_id, session["society"], name, phone, visit_date, visit_time)
+        invalidate_gate(session["society"])
+        notify(f"admin:{session['society']}", "visitor", id=visitor_id)
 
-    cur.close()
-    db.close()
-    return render_template("user_visitors.html", visitors=visitors)
+    return render_template("user_visitors.html", visitors=repo().visitors.for_user(user_id))
 
 @app.route("/user/polls", methods=["GET", "POST"])
 def user_polls():
     if "user" not in session:
         return redirect("/user/login")
     user_id = session["user"]
-    db = get_db_connection()
-    cur = db.cursor()
+    admin_id = session["society"]
+    polls = society_polls(admin_id)
 
     if request.method == "POST":
-        poll_id = request.form["poll_id"]
+        poll_id = request.form.get("poll_id", type=int)
         choice = request.form["choice"]
 
-        cur.execute(
-            "SELECT id FROM poll_votes WHERE user_id=%s AND poll_id=%s", (user_id, poll_id))
-        if not cur.fetchone():
-            cur.execute(
-                "INSERT INTO poll_votes (user_id, poll_id, choice) VALUES (%s, %s, %s)", (user_id, poll_id, choice))
-            db.commit()
+        if choice not in repo().polls.COLUMNS:
+            return "Invalid choice", 400
+        if not any(p[0] == poll_id and p[4] == "Active" for p in polls):
+            return "Poll not found", 404
 
-    query = """
-        SELECT p.id, p.question, p.option1, p.option2, p.status,
-        (SELECT COUNT(*) FROM poll_votes v WHERE v.poll_id = p.id AND v.choice = 'option1') as vote1,
-        (SELECT COUNT(*) FROM poll_votes v WHERE v.poll_id = p.id AND v.choice = 'option2') as vote2,
-        (SELECT COUNT(*) FROM poll_votes v WHERE v.poll_id = p.id AND v.user_id = %s) as has_voted
-        FROM polls p ORDER BY p.id DESC
-    """
-    cur.execute(query, (user_id,))
-    polls = cur.fetchall()
+        with transaction():
+            counted = repo().polls.vote(user_id, poll_id, choice)
+        poll_cache.invalidate(admin_id)
+        if counted:
+            notify(f"society:{admin_id}", "poll", id=poll_id)
+        polls = society_polls(admin_id)
 
-    cur.close()
-    db.close()
+    voted = repo().polls.voted_by(user_id)
+    polls = [p + (1 if p[0] in voted else 0,) for p in polls]
     return render_template("user_polls.html", polls=polls)
 
+booking_options_cache = TTLCache(ttl=600)
+availability_cache = TTLCache(ttl=60, maxsize=2048)
+
+def booking_options():
+    return booking_options_cache.get_or_set("options", lambda: repo().bookings.options())
+
+def month_bounds(day):
+    start = day.replace(day=1)
+    end = date(start.year + start.month // 12, start.month % 12 + 1, 1)
+    return start, end
+
+def facility_availability(admin_id, facility, month_start):
+    # {"YYYY-MM-DD": [taken slot, ...]} for one facility and month.
+    def load():
+        taken = {}
+        for booking_date, slot in repo().bookings.taken_slots(admin_id, facility, *month_bounds(month_start)):
+            taken.setdefault(booking_date.isoformat(), []).append(slot)
+        return taken
+    return availability_cache.get_or_set((admin_id, facility, month_start), load)
+
+def invalidate_availability(admin_id, facility, booking_date):
+    availability_cache.invalidate((admin_id, facility, booking_date.replace(day=1)))
+
+@app.route("/user/bookings/availability")
+def booking_availability():
+    if "user" not in session:
+        return jsonify(error="Login required"), 401
+
+    facilities, slots = booking_options()
+    facility = request.args.get("facility", "")
+    if facility not in facilities:
+        return jsonify(error="Unknown facility"), 400
+    try:
+        month_start = datetime.strptime(request.args.get("month", ""), "%Y-%m").date()
+    except ValueError:
+        month_start = date.today().replace(day=1)
+
+    taken = facility_availability(session["society"], facility, month_start)
+    return jsonify(facility=facility, month=month_start.strftime("%Y-%m"), slots=slots, taken=taken)
+
+def reserve_facility(user_id, admin_id, facility, slot, day):
+    # Returns (booking_id, None, None) or (None, error message, HTTP status).
+    facilities, slots = booking_options()
+    try:
+        booking_date = date.fromisoformat(day)
+    except (TypeError, ValueError):
+        booking_date = None
+
+    if facility not in facilities or slot not in slots or booking_date is None:
+        return None, "Please choose a valid facility, date and time slot.", 400
+    if booking_date < date.today():
+        return None, "Bookings can only be made for upcoming dates.", 400
+
+    # uq_bookings_active_slot makes the insert itself the check: a
+    # concurrent request for the same slot fails here instead of
+    # racing a separate SELECT.
+    try:
+        with transaction():
+            booking_id = repo().bookings.create(user_id, admin_id, facility, booking_date, slot)
+    except storage.IntegrityError:
+        return None, f"Sorry! The {facility} is already booked for that slot.", 409
+    finally:
+        invalidate_availability(admin_id, facility, booking_date)
+    notify(f"admin:{admin_id}", "booking", id=booking_id, status="Pending")
+    return booking_id, None, None
+
 @app.route("/user/bookings", methods=["GET", "POST"])
 def user_bookings():
     if "user" not in session:
         return redirect("/user/login")
     user_id = session["user"]
-
-    facilities = ["Community Hall", "Clubhouse",
-                  "Tennis Court", "Swimming Pool Area"]
-    slots = ["Morning (9 AM - 1 PM)", "Afternoon (2 PM - 6 PM)",
-             "Evening (7 PM - 11 PM)"]
+    facilities, slots = booking_options()
 
     error = None
     success = None
 
-    db = get_db_connection()
-    cur = db.cursor()
-
     if request.method == "POST":
-        facility = request.form["facility"]
-        date = request.form["date"]
-        slot = request.form["slot"]
-
-        check_query = "SELECT id FROM bookings WHERE facility_name=%s AND booking_date=%s AND time_slot=%s AND status='Confirmed'"
-        cur.execute(check_query, (facility, date, slot))
-        existing_booking = cur.fetchone()
-
-        if existing_booking:
-            error = f"Sorry! The {facility} is already booked for that slot."
-        else:
-            insert_query = "INSERT INTO bookings (user_id, facility_name, booking_date, time_slot, status) VALUES (%s, %s, %s, %s, 'Pending')"
-            cur.execute(insert_query, (user_id, facility, date, slot))
-            db.commit()
+        booking_id, error, _ = reserve_facility(user_id, session["society"], request.form["facility"],
+                                                request.form["slot"], request.form["date"])
+        if booking_id:
             success = "Booking Request Sent! Awaiting Admin Approval."
 
-    cur.execute("SELECT facility_name, booking_date, time_slot, status FROM bookings WHERE user_id=%s ORDER BY booking_date DESC", (user_id,))
-    my_bookings = cur.fetchall()
-
-    cur.close()
-    db.close()
-
     return render_template("user_bookings.html",
                            facilities=facilities,
                            slots=slots,
-                           my_bookings=my_bookings,
+                           my_bookings=repo().bookings.for_user(user_id),
                            error=error,
                            success=success)
 
@@ -1008,17 +1490,23 @@ def booking_action():
     if "admin" not in session:
         return redirect("/admin/login")
 
-    booking_id = request.form.get("id")
+    booking_id = request.form.get("id", type=int)
     action = request.form.get("action")
 
     new_status = "Confirmed" if action == "approve" else "Rejected"
 
-    db = get_db_connection()
-    cur = db.cursor()
-    cur.execute("UPDATE bookings SET status = %s WHERE id = %s", (new_status, booking_id))
-    db.commit()
-    cur.close()
-    db.close()
+    try:
+        with transaction():
+            booking = repo().bookings.set_status(booking_id, session["admin"], new_status)
+    except storage.IntegrityError:
+        return "This slot is already taken by another booking ❌", 409
+
+    if not booking:
+        return "Booking not found", 404
+    owner, facility, booking_date = booking
+    invalidate_availability(session["admin"], facility, booking_date)
+    notify(f"user:{owner}", "booking", id=booking_id, status=new_status)
+    notify(f"admin:{session['admin']}", "booking", id=booking_id, status=new_status)
 
     return redirect("/admin/bookings")
 
@@ -1051,27 +1539,24 @@ def user_emergency():
 
 @app.route("/submit_contact", methods=["POST"])
 def submit_contact():
+    throttle("contact", CONTACT_RATE)
     name = request.form.get("name")
     email = request.form.get("email")
     message = request.form.get("message")
 
     try:
-        db = get_db_connection()
+        db = get_db()
         if db:
             cur = db.cursor()
             query = "INSERT INTO contact_inquiries (name, email, message) VALUES (%s, %s, %s)"
             cur.execute(query, (name, email, message))
             db.commit()
             cur.close()
-            db.close()
     except Exception as e:
         print(f"Database Error: {e}")
 
     try:
-        smtp_server = os.getenv("MAIL_SERVER", "smtp.gmail.com")
-        smtp_port = int(os.getenv("MAIL_PORT", 587))
-        sender_email = os.getenv("MAIL_USERNAME")
-        password = os.getenv("MAIL_PASSWORD")
+        sender_email = mailer.sender
         receiver_email = sender_email
 
         msg = MIMEMultipart()
@@ -1090,13 +1575,7 @@ def submit_contact():
         """
         msg.attach(MIMEText(body, "plain"))
 
-        server = smtplib.SMTP(smtp_server, smtp_port)
-        server.starttls()
-        server.login(sender_email, password)
-        server.send_message(msg)
-        server.quit()
-
-        print("✅ Email notification sent successfully!")
+        mailer.send(msg)
 
     except Exception as e:
         print(f"❌ Email Error: {e}")
@@ -1107,17 +1586,20 @@ def submit_contact():
 def pay_bill(bill_id):
     if 'user' not in session:
         return redirect('/user/login')
-    db = get_db_connection()
-    cur = db.cursor()
-    cur.execute("SELECT amount FROM bills WHERE id = %s", (bill_id,))
-    bill = cur.fetchone()
-    cur.close()
-    db.close()
-
+    bill = repo().bills.checkout_state(bill_id, session['user'])
     if not bill:
         return "Bill not found", 404
-    
-    amount_in_cents = int(bill[0] * 100)
+    amount, status, checkout_url, checkout_expires_at = bill
+    if status == 'Paid':
+        return redirect(url_for('user_dashboard'))
+
+    # A second click re-uses the open Checkout Session instead of creating
+    # another one with Stripe.
+    reusable = payments.reusable_checkout_url(checkout_url, checkout_expires_at)
+    if reusable:
+        return redirect(reusable, code=303)
+
+    amount_in_cents = int(amount * 100)
 
     try:
         checkout_session = stripe.checkout.Session.create(
@@ -1134,27 +1616,361 @@ def pay_bill(bill_id):
                 'quantity': 1,
             }],
             mode='payment',
+            client_reference_id=str(bill_id),
+            metadata={'bill_id': str(bill_id)},
             success_url=url_for('payment_success', bill_id=bill_id, _external=True) + '?session_id={CHECKOUT_SESSION_ID}',
             cancel_url=url_for('user_dashboard', _external=True),
         )
-        return redirect(checkout_session.url, code=303)
-
     except Exception as e:
         return str(e)
 
+    with transaction():
+        repo().bills.store_checkout(bill_id, checkout_session.id, checkout_session.url,
+                                    datetime.fromtimestamp(checkout_session.expires_at))
+    return redirect(checkout_session.url, code=303)
+
 @app.route('/payment_success/<int:bill_id>')
 def payment_success(bill_id):
     if 'user' not in session:
         return redirect('/user/login')
 
-    db = get_db_connection()
-    cur = db.cursor()
-    cur.execute("UPDATE bills SET status = 'Paid' WHERE id = %s", (bill_id,))
-    db.commit()
-    cur.close()
-    db.close()
+    bill = repo().bills.payment_state(bill_id, session['user'])
+    if not bill:
+        return "Bill not found", 404
+
+    # The webhook is the source of truth. This page only reconciles when it
+    # wins the race against the webhook, and only after asking Stripe
+    # whether the session really was paid.
+    status, session_id = bill
+    if status != 'Paid' and session_id and request.args.get('session_id') == session_id:
+        try:
+            checkout_session = stripe.checkout.Session.retrieve(session_id)
+        except Exception as e:
+            print(f"❌ Could not verify checkout session {session_id}: {e}")
+            checkout_session = None
+        if checkout_session is not None and checkout_session.payment_status == 'paid':
+            with transaction() as cur:
+                admin_id = payments.mark_bill_paid(cur, bill_id, checkout_session.amount_total, session_id)
+            if admin_id:
+                after_payment(bill_id, admin_id)
 
     return render_template('payment_success.html', bill_id=bill_id)
 
+def after_payment(bill_id, admin_id):
+    invoices.invalidate(bill_id)
+    invalidate_dashboard(admin_id)
+
+@app.route('/stripe/webhook', methods=['POST'])
+@csrf.exempt
+def stripe_webhook():
+    payload = request.get_data()
+    try:
+        event = payments.parse_event(payload, request.headers.get('Stripe-Signature', ''), STRIPE_WEBHOOK_SECRET)
+    except (ValueError, stripe.SignatureVerificationError) as e:
+        print(f"❌ Rejected Stripe webhook: {e}")
+        return "Invalid signature", 400
+
+    paid = payments.completed_checkout(event)
+    admin_id = None
+    try:
+        with transaction() as cur:
+            if not payments.record_event(cur, event['id'], event.get('type', '')):
+                return "Already processed", 200
+            if paid:
+                admin_id = payments.mark_bill_paid(cur, *paid)
+    except ValueError as e:
+        # Amount mismatch: roll back (including the event id) so the event
+        # stays unprocessed and shows up in Stripe's failed deliveries.
+        print(f"❌ Stripe webhook {event['id']}: {e}")
+        return "Amount mismatch", 400
+
+    if admin_id:
+        after_payment(paid[0], admin_id)
+    return "OK", 200
+
+# ---------------- JSON API v1 ----------------
+# The pages' data as JSON, for the mobile app and the gate-security
+# tablet, from the same repository queries. POST /api/v1/login returns a
+# token to send as "Authorization: Bearer <token>". Conventions (paging,
+# ?fields=, gzip, batch ids) are in api.py.
+VISITOR_STATUSES = ("Expected", "Approved", "Denied")
+COMPLAINT_STATUSES = ("Pending", "Resolved")
+
+@app.errorhandler(api.ApiError)
+def api_error(e):
+    return api.error(e.status, e.message)
+
+def api_route(rule, roles=("admin", "user"), **options):
+    # The view is called with the caller's role; other accounts get a 403
+    # and anonymous callers a 401.
+    def decorator(view):
+        @wraps(view)
+        def wrapped(*args, **kwargs):
+            role = next((r for r in roles if r in session), None)
+            if role is None:
+                if "admin" in session or "user" in session:
+                    raise api.ApiError(403, "Not allowed for this account")
+                raise api.ApiError(401, "Login required")
+            return view(role, *args, **kwargs)
+        return app.route(api.PREFIX + rule, **options)(csrf.exempt(wrapped))
+    return decorator
+
+def batch_result(requested, updated, skipped=()):
+    # Ids outside the society are reported as not found, not as an error;
+    # skipped ids are in the society but past the requested change.
+    done = {row[0] for row in updated}
+    seen = done | set(skipped)
+    return api.respond({"updated": sorted(done), "skipped": sorted(skipped),
+                        "not_found": [i for i in requested if i not in seen]})
+
+@app.route(api.PREFIX + "/login", methods=["POST"])
+@csrf.exempt
+def api_login():
+    data = api.body()
+    role = api.field(data, "role", ("admin", "user"))
+    email = api.field(data, "email")
+    password = api.field(data, "password")
+
+    throttle("login", LOGIN_RATE)
+    if role == "admin":
+        cur = get_db().cursor()
+        cur.execute("SELECT id, password, id FROM admins WHERE email=%s", (email,))
+        account = cur.fetchone()
+        cur.close()
+    else:
+        account = repo().users.login(email)
+    if not check_login(role, email, account and account[1], password):
+        raise api.ApiError(401, "Invalid credentials")
+
+    session.clear()
+    session[role] = account[0]
+    session["society"] = account[2]
+    token = app.session_interface.issue_token(session)
+    return api.respond({"token": token, "role": role, "id": account[0], "society_id": account[2]})
+
+@api_route("/logout", methods=["POST"])
+def api_logout(role):
+    session.clear()
+    return api.respond({"ok": True})
+
+@api_route("/bills")
+def api_bills(role):
+    bills = repo().bills
+    if role == "admin":
+        return api.listing(bills.SOCIETY_FIELDS, bills.society_page(session["admin"], **page_args()))
+    return api.listing(bills.USER_FIELDS, bills.user_page(session["user"], **page_args()))
+
+@api_route("/notices")
+def api_notices(role):
+    notices = repo().notices
+    return api.listing(notices.FIELDS, notices.society_page(session["society"], formatted=False, **page_args()))
+
+@api_route("/polls")
+def api_polls(role):
+    polls = society_polls(session["society"])
+    fields = repo().polls.FIELDS
+    if role == "user":
+        voted = repo().polls.voted_by(session["user"])
+        polls = [p + (p[0] in voted,) for p in polls]
+        fields += ("voted",)
+    return api.listing(fields, {"rows": polls, "next": None, "prev": None})
+
+@api_route("/polls/<int:poll_id>/vote", roles=("user",), methods=["POST"])
+def api_vote(role, poll_id):
+    choice = api.field(api.body(), "choice", tuple(repo().polls.COLUMNS))
+    admin_id = session["society"]
+    if not any(p[0] == poll_id and p[4] == "Active" for p in society_polls(admin_id)):
+        raise api.ApiError(404, "Poll not found")
+
+    with transaction():
+        counted = repo().polls.vote(session["user"], poll_id, choice)
+    poll_cache.invalidate(admin_id)
+    if counted:
+        notify(f"society:{admin_id}", "poll", id=poll_id)
+    return api.respond({"id": poll_id, "counted": counted})
+
+@api_route("/visitors", methods=["GET", "POST"])
+def api_visitors(role):
+    visitors = repo().visitors
+    if request.method == "POST":
+        if role != "user":
+            raise api.ApiError(403, "Only residents can register visitors")
+        data = api.body()
+        name, phone = api.field(data, "name"), api.field(data, "phone")
+        try:
+            visit_date = date.fromisoformat(api.field(data, "date"))
+            visit_time = datetime.strptime(api.field(data, "time"), "%H:%M").time()
+        except ValueError:
+            raise api.ApiError(400, "'date' must be YYYY-MM-DD and 'time' HH:MM")
+        with transaction():
+            visitor_id, pass_code = visitors.create(session["user"], session["society"], name, phone, visit_date, visit_time)
+        invalidate_gate(session["society"])
+        notify(f"admin:{session['society']}", "visitor", id=visitor_id)
+        return api.respond({"id": visitor_id, "pass_code": pass_code}, 201)
+
+    if role == "admin":
+        return api.listing(visitors.SOCIETY_FIELDS, visitors.society_page(session["admin"], **page_args()))
+    return api.listing(visitors.USER_FIELDS, visitors.user_page(session["user"], **page_args()))
+
+@api_route("/visitors/batch", roles=("admin",), methods=["POST"])
+def api_visitors_batch(role):
+    data = api.body()
+    visitor_ids = api.ids(data)
+    status = api.field(data, "status", VISITOR_STATUSES)
+    admin_id = session["admin"]
+
+    with transaction():
+        updated, skipped = repo().visitors.set_status_many(visitor_ids, admin_id, status)
+    invalidate_gate(admin_id)
+    for visitor_id, owner in updated:
+        notify(f"user:{owner}", "visitor", id=visitor_id, status=status)
+    notify(f"admin:{admin_id}", "visitor", ids=[row[0] for row in updated], status=status)
+    return batch_result(visitor_ids, updated, skipped)
+
+@api_route("/gate", roles=("admin",))
+def api_gate(role):
+    # ?q=<phone or pass code> looks up today's visitors; without it, all of them.
+    query = request.args.get("q", "").strip()
+    rows = gate_lookup(session["admin"], query) if query else gate_day(session["admin"])["rows"]
+    return api.respond({"data": api.records(repo().visitors.GATE_FIELDS, rows)})
+
+@api_route("/visitors/<int:visitor_id>/<any(check_in, check_out):action>", roles=("admin",), methods=["POST"])
+def api_visitor_gate(role, visitor_id, action):
+    error = gate_move(session["admin"], visitor_id, action)
+    if error:
+        raise api.ApiError(409, error)
+    return api.respond({"id": visitor_id, "status": "Inside" if action == "check_in" else "Exited"})
+
+@api_route("/bookings", methods=["GET", "POST"])
+def api_bookings(role):
+    bookings = repo().bookings
+    if request.method == "POST":
+        if role != "user":
+            raise api.ApiError(403, "Only residents can book facilities")
+        data = api.body()
+        booking_id, error, status = reserve_facility(session["user"], session["society"],
+                                                     data.get("facility"), data.get("slot"), data.get("date"))
+        if error:
+            raise api.ApiError(status, error)
+        return api.respond({"id": booking_id, "status": "Pending"}, 201)
+
+    if role == "admin":
+        return api.listing(bookings.SOCIETY_FIELDS, bookings.society_page(session["admin"], **page_args()))
+    return api.listing(bookings.USER_FIELDS, bookings.user_page(session["user"], **page_args()))
+
+@api_route("/bookings/batch", roles=("admin",), methods=["POST"])
+def api_bookings_batch(role):
+    data = api.body()
+    booking_ids = api.ids(data)
+    action = api.field(data, "action", ("approve", "reject"))
+    status = "Confirmed" if action == "approve" else "Rejected"
+    admin_id = session["admin"]
+
+    # All or nothing: one slot conflict rolls the whole batch back.
+    try:
+        with transaction():
+            updated = repo().bookings.set_status_many(booking_ids, admin_id, status)
+    except storage.IntegrityError:
+        raise api.ApiError(409, "A slot in this batch is already taken by another booking; nothing was changed")
+
+    for booking_id, owner, facility, booking_date in updated:
+        invalidate_availability(admin_id, facility, booking_date)
+        notify(f"user:{owner}", "booking", id=booking_id, status=status)
+    notify(f"admin:{admin_id}", "booking", ids=[row[0] for row in updated], status=status)
+    return batch_result(booking_ids, updated)
+
+@api_route("/complaints", methods=["GET", "POST"])
+def api_complaints(role):
+    complaints = repo().complaints
+    if request.method == "POST":
+        if role != "user":
+            raise api.ApiError(403, "Only residents can lodge complaints")
+        data = api.body()
+        subject, description = api.field(data, "subject"), api.field(data, "description")
+        with transaction():
+            complaint_id = complaints.create(session["user"], session["society"], subject, description)
+        notify(f"admin:{session['society']}", "complaint", id=complaint_id, status="Pending")
+        return api.respond({"id": complaint_id, "status": "Pending"}, 201)
+
+    if role == "admin":
+        return api.listing(complaints.SOCIETY_FIELDS,
+                           complaints.society_page(session["admin"], formatted=False, **page_args()))
+    return api.listing(complaints.USER_FIELDS, complaints.user_page(session["user"], **page_args()))
+
+@api_route("/complaints/batch", roles=("admin",), methods=["POST"])
+def api_complaints_batch(role):
+    data = api.body()
+    complaint_ids = api.ids(data)
+    status = api.field(data, "status", COMPLAINT_STATUSES)
+    admin_id = session["admin"]
+
+    with transaction():
+        updated = repo().complaints.set_status_many(complaint_ids, admin_id, status)
+    for complaint_id, owner in updated:
+        notify(f"user:{owner}", "complaint", id=complaint_id, status=status)
+    notify(f"admin:{admin_id}", "complaint", ids=[row[0] for row in updated], status=status)
+    return batch_result(complaint_ids, updated)
+
+@app.cli.group("db")
+def db_cli():
+    """Database schema migrations."""
+
+@db_cli.command("upgrade")
+@click.option("--target", type=int, default=None, help="Stop after this migration version.")
+def db_upgrade(target):
+    db = get_db_connection()
+    if not db:
+        raise click.ClickException("Could not connect to the database")
+    try:
+        applied = migrate.upgrade(db, backend.migrations_dir, target=target, echo=click.echo)
+    finally:
+        db.close()
+    if not applied:
+        click.echo("Database is up to date.")
+
+@db_cli.command("status")
+def db_status():
+    db = get_db_connection()
+    if not db:
+        raise click.ClickException("Could not connect to the database")
+    try:
+        pending = migrate.pending_migrations(db, backend.migrations_dir)
+    finally:
+        db.close()
+    for version, name, _ in pending:
+        click.echo(f"pending  {version:04d}_{name}")
+    if not pending:
+        click.echo("Database is up to date.")
+
+@app.cli.group("assets")
+def assets_cli():
+    """Static asset build."""
+
+@assets_cli.command("build")
+def assets_build():
+    click.echo(f"Building into {assets.build_folder}")
+    assets.build(echo=click.echo)
+
+@app.cli.group("fund")
+def fund_cli():
+    """Society fund ledger."""
+
+@fund_cli.command("verify")
+def fund_verify():
+    db = get_db_connection()
+    if not db:
+        raise click.ClickException("Could not connect to the database")
+    cur = db.cursor()
+    try:
+        problems = ledger.verify(cur)
+    finally:
+        cur.close()
+        db.close()
+    for admin_id, stored, total, last in problems:
+        click.echo(f"society {admin_id}: fund {stored}, ledger total {total}, last entry balance {last}")
+    if problems:
+        raise click.ClickException(f"{len(problems)} society fund(s) disagree with their ledger")
+    click.echo("Every fund matches its ledger.")
+
 if __name__ == "__main__":
     app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,17 @@
+# ASGI entry point, for uvicorn or hypercorn, or gunicorn with
+# WEB_WORKER_CLASS=uvicorn (see gunicorn.conf.py):
+#     uvicorn asgi:app --host 0.0.0.0 --port 8000 --workers 4
+# The views are synchronous: a2wsgi runs each request on its own thread
+# pool, ASGI_THREADS threads per process (default 64), which is how many
+# requests one process works on at once. Streamed responses (CSV/PDF
+# downloads, /events) are passed through chunk by chunk.
+import os
+
+try:
+    from a2wsgi import WSGIMiddleware
+except ImportError:
+    raise RuntimeError("ASGI serving needs the a2wsgi package (pip install a2wsgi uvicorn)")
+
+from app import app as flask_app
+
+app = WSGIMiddleware(flask_app, workers=int(os.getenv("ASGI_THREADS", 64)))
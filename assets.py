@@ -0,0 +1,173 @@
+import os
+import gzip
+import json
+import hashlib
+import threading
+
+try:
+    import brotli
+except ImportError:  # optional: without it the build writes .gz only
+    brotli = None
+
+try:
+    from PIL import Image
+except ImportError:  # optional: without it images are served as-is
+    Image = None
+
+# Static asset fingerprints and the `flask assets build` step. The build
+# writes everything under static/build/ (not committed): gzip and brotli
+# copies of text assets, and resized JPEG/PNG + WebP variants of images.
+# The manifest records the content hash each output was built from, so a
+# source edited after the last build is simply served unoptimised.
+
+BUILD_DIR = "build"
+MANIFEST = "manifest.json"
+COMPRESSIBLE = (".css", ".js", ".svg", ".json", ".txt")
+IMAGES = (".jpg", ".jpeg", ".png")
+IMAGE_WIDTHS = (240, 480, 960, 1600)
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+
+def _digest(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(65536), b""):
+            h.update(chunk)
+    return h.hexdigest()[:12]
+
+
+class Assets:
+    def __init__(self, static_folder):
+        self.static_folder = static_folder
+        self.build_folder = os.path.join(static_folder, BUILD_DIR)
+        self._hashes = {}
+        self._manifest = None
+        self._lock = threading.Lock()
+
+    def _source(self, filename):
+        root = os.path.abspath(self.static_folder)
+        path = os.path.normpath(os.path.join(root, filename))
+        if not path.startswith(root + os.sep) or not os.path.isfile(path):
+            return None
+        return path
+
+    def fingerprint(self, filename):
+        # Content hash used as the ?v= cache buster; None for unknown files.
+        # Computed once per process: static files only change on deploy.
+        version = self._hashes.get(filename)
+        if version is None:
+            path = self._source(filename)
+            if path is None:
+                return None
+            version = self._hashes[filename] = _digest(path)
+        return version
+
+    def last_modified(self):
+        # Newest source file, for Last-Modified on pages that link to them.
+        newest = 0
+        for root, dirs, files in os.walk(self.static_folder):
+            dirs[:] = [d for d in dirs if os.path.join(root, d) != self.build_folder]
+            for name in files:
+                newest = max(newest, os.path.getmtime(os.path.join(root, name)))
+        return newest
+
+    def manifest(self):
+        if self._manifest is None:
+            try:
+                with open(os.path.join(self.build_folder, MANIFEST), encoding="utf-8") as f:
+                    self._manifest = json.load(f)
+            except (OSError, ValueError):
+                self._manifest = {"compressed": {}, "images": {}}
+        return self._manifest
+
+    def precompressed(self, filename, accept_encodings):
+        # (path under static/, encoding) of the smallest acceptable copy.
+        entry = self.manifest()["compressed"].get(filename)
+        if not entry or entry["hash"] != self.fingerprint(filename):
+            return None
+        for encoding, suffix in ENCODINGS:
+            if encoding in entry["encodings"] and accept_encodings[encoding]:
+                return f"{BUILD_DIR}/{filename}{suffix}", encoding
+        return None
+
+    def has_precompressed(self, filename):
+        return filename in self.manifest()["compressed"]
+
+    def variants(self, filename):
+        # [{"width", "webp", "fallback"}, ...] smallest first, or [] when
+        # the image has not been built.
+        entry = self.manifest()["images"].get(filename)
+        if not entry or entry["hash"] != self.fingerprint(filename):
+            return []
+        return entry["variants"]
+
+    # ---------------- BUILD ----------------
+    def build(self, echo=print):
+        manifest = {"compressed": {}, "images": {}}
+        for root, dirs, files in os.walk(self.static_folder):
+            dirs[:] = [d for d in dirs if os.path.join(root, d) != self.build_folder]
+            for name in sorted(files):
+                path = os.path.join(root, name)
+                filename = os.path.relpath(path, self.static_folder).replace(os.sep, "/")
+                ext = os.path.splitext(name)[1].lower()
+                if ext in COMPRESSIBLE:
+                    manifest["compressed"][filename] = self._compress(path, filename, echo)
+                elif ext in IMAGES and Image is not None:
+                    manifest["images"][filename] = self._resize(path, filename, echo)
+
+        if Image is None:
+            echo("Pillow is not installed; images were left as they are.")
+        if brotli is None:
+            echo("brotli is not installed; wrote gzip copies only (pip install brotli).")
+
+        os.makedirs(self.build_folder, exist_ok=True)
+        with open(os.path.join(self.build_folder, MANIFEST), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=1, sort_keys=True)
+        with self._lock:
+            self._manifest = manifest
+            self._hashes.clear()
+        return manifest
+
+    def _output(self, name):
+        path = os.path.join(self.build_folder, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return path
+
+    def _compress(self, path, filename, echo):
+        with open(path, "rb") as f:
+            data = f.read()
+        outputs = {"gzip": gzip.compress(data, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            outputs["br"] = brotli.compress(data, quality=11)
+        encodings = []
+        for encoding, suffix in ENCODINGS:
+            if encoding in outputs and len(outputs[encoding]) < len(data):
+                with open(self._output(filename + suffix), "wb") as f:
+                    f.write(outputs[encoding])
+                encodings.append(encoding)
+        sizes = ", ".join(f"{e} {len(outputs[e]) // 1024} KB" for e in encodings)
+        echo(f"  {filename}: {len(data) // 1024} KB -> {sizes or 'not compressible'}")
+        return {"hash": _digest(path), "encodings": encodings}
+
+    def _resize(self, path, filename, echo):
+        stem, ext = os.path.splitext(filename)
+        variants = []
+        with Image.open(path) as image:
+            image.load()
+            widths = [w for w in IMAGE_WIDTHS if w < image.width] + [min(image.width, IMAGE_WIDTHS[-1])]
+            for width in sorted(set(widths)):
+                height = round(image.height * width / image.width)
+                resized = image.resize((width, height), Image.LANCZOS) if width != image.width else image
+                webp = f"{BUILD_DIR}/{stem}-{width}.webp"
+                fallback = f"{BUILD_DIR}/{stem}-{width}{ext}"
+                resized.save(self._output(f"{stem}-{width}.webp"), "WEBP", quality=80, method=6)
+                if ext.lower() == ".png":
+                    resized.save(self._output(f"{stem}-{width}{ext}"), "PNG", optimize=True)
+                else:
+                    resized.convert("RGB").save(self._output(f"{stem}-{width}{ext}"), "JPEG",
+                                                quality=82, optimize=True, progressive=True)
+                variants.append({"width": width, "webp": webp, "fallback": fallback})
+        largest = os.path.getsize(os.path.join(self.static_folder, variants[-1]["webp"]))
+        echo(f"  {filename}: {os.path.getsize(path) // 1024} KB -> {len(variants)} sizes, "
+             f"largest WebP {largest // 1024} KB")
+        return {"hash": _digest(path), "variants": variants}
@@ -0,0 +1,313 @@
+"""Concurrent load test for the hot SocietyPro routes.
+
+Logs concurrent clients in as the seeded admin and tenants (see
+bench/seed.py) and drives a weighted mix of /admin/dashboard,
+/admin/invoices, /admin/download_invoice/<id>, /user/polls and POST
+/user/bookings. Reports p50/p95/p99 latency and requests/sec per route.
+
+    # against a running server (gunicorn, the real deployment shape),
+    # started with RATELIMIT_ENABLED=0: every client logs in from one IP
+    python bench/loadtest.py --url http://127.0.0.1:8000 --concurrency 32 --duration 60
+
+    # in-process server, Stripe and SMTP pointed at local stubs
+    python bench/loadtest.py --concurrency 16 --duration 30
+
+    # fail (exit 1) when any route's p95 is >20% slower than a saved run
+    python bench/loadtest.py --json after.json --baseline before.json --max-regression 20
+
+In-process numbers share one interpreter with the clients, so compare them
+only with other in-process runs.
+"""
+import os
+import re
+import sys
+import json
+import math
+import time
+import random
+import argparse
+import threading
+import http.client
+from datetime import date, timedelta
+from urllib.parse import urlsplit, urlencode
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+ROUTES = {
+    "dashboard": 3,
+    "invoices": 2,
+    "download_invoice": 1,
+    "polls": 3,
+    "book": 1,
+}
+
+_CSRF = re.compile(r'name="csrf_token"\s+value="([^"]+)"')
+
+
+class Client:
+    # One keep-alive connection and one session cookie, like a browser tab.
+
+    def __init__(self, base_url):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.conn = None
+        self.cookie = None
+
+    def request(self, method, path, form=None):
+        headers = {}
+        body = None
+        if self.cookie:
+            headers["Cookie"] = self.cookie
+        if form is not None:
+            body = urlencode(form)
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+        for attempt in (1, 2):
+            if self.conn is None:
+                self.conn = http.client.HTTPConnection(self.host, self.port, timeout=60)
+            try:
+                self.conn.request(method, path, body=body, headers=headers)
+                response = self.conn.getresponse()
+                data = response.read()
+                break
+            except (http.client.HTTPException, ConnectionError):
+                # The server closed an idle keep-alive connection.
+                self.conn.close()
+                self.conn = None
+                if attempt == 2:
+                    raise
+        set_cookie = response.getheader("Set-Cookie")
+        if set_cookie:
+            self.cookie = set_cookie.split(";", 1)[0]
+        return response.status, data
+
+    def csrf_token(self, path):
+        status, body = self.request("GET", path)
+        match = _CSRF.search(body.decode("utf-8", "replace"))
+        if not match:
+            raise RuntimeError(f"No CSRF token on {path} (HTTP {status})")
+        return match.group(1)
+
+    def login(self, role, email, password):
+        token = self.csrf_token(f"/{role}/login")
+        status, _ = self.request("POST", f"/{role}/login",
+                                 {"csrf_token": token, "email": email, "password": password})
+        if status == 429:
+            raise RuntimeError(f"{role} login for {email} was rate limited; start the server with RATELIMIT_ENABLED=0")
+        if status != 302:
+            raise RuntimeError(f"{role} login failed for {email} (HTTP {status})")
+
+
+class Worker:
+    def __init__(self, base_url, manifest, rng):
+        self.manifest = manifest
+        self.rng = rng
+        self.admin = Client(base_url)
+        self.admin.login("admin", manifest["admin_email"], manifest["password"])
+        self.user = Client(base_url)
+        self.user.login("user", rng.choice(manifest["user_emails"]), manifest["password"])
+        self.booking_token = self.user.csrf_token("/user/bookings")
+
+    def call(self, route):
+        if route == "dashboard":
+            return self.admin.request("GET", "/admin/dashboard")
+        if route == "invoices":
+            return self.admin.request("GET", "/admin/invoices")
+        if route == "download_invoice":
+            return self.admin.request("GET", f"/admin/download_invoice/{self.rng.choice(self.manifest['bill_ids'])}")
+        if route == "polls":
+            return self.user.request("GET", "/user/polls")
+        if route == "book":
+            # A few months of future dates, so a realistic share of
+            # requests collide on an already reserved slot.
+            day = date.today() + timedelta(days=self.rng.randint(1, 90))
+            return self.user.request("POST", "/user/bookings", {
+                "csrf_token": self.booking_token,
+                "facility": self.rng.choice(self.manifest["facilities"]),
+                "slot": self.rng.choice(self.manifest["slots"]),
+                "date": day.isoformat(),
+            })
+        raise ValueError(route)
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    # Nearest-rank: the smallest sample with at least pct% of samples <= it.
+    rank = math.ceil(pct / 100 * len(sorted_values))
+    return sorted_values[max(0, rank - 1)]
+
+
+def run(base_url, manifest, concurrency, duration, warmup, weights, seed_value=None):
+    routes = list(weights)
+    cum_weights = []
+    total = 0
+    for route in routes:
+        total += weights[route]
+        cum_weights.append(total)
+
+    samples = {route: [] for route in routes}
+    errors = {route: 0 for route in routes}
+    lock = threading.Lock()
+    window = {}
+
+    def open_window():
+        # Runs once every client has logged in, before any is released.
+        window["start"] = time.perf_counter() + warmup
+        window["end"] = window["start"] + duration
+
+    ready = threading.Barrier(concurrency + 1, action=open_window)
+
+    def loop(n):
+        rng = random.Random(None if seed_value is None else seed_value + n)
+        try:
+            worker = Worker(base_url, manifest, rng)
+        finally:
+            ready.wait()
+        local = {route: [] for route in routes}
+        local_errors = {route: 0 for route in routes}
+        while True:
+            now = time.perf_counter()
+            if now >= window["end"]:
+                break
+            route = rng.choices(routes, cum_weights=cum_weights)[0]
+            start = time.perf_counter()
+            try:
+                status, _ = worker.call(route)
+                ok = status == 200
+            except Exception:
+                ok = False
+            elapsed = time.perf_counter() - start
+            if start >= window["start"]:
+                if ok:
+                    local[route].append(elapsed)
+                else:
+                    local_errors[route] += 1
+        with lock:
+            for route in routes:
+                samples[route].extend(local[route])
+                errors[route] += local_errors[route]
+
+    threads = [threading.Thread(target=loop, args=(n,), daemon=True) for n in range(concurrency)]
+    for t in threads:
+        t.start()
+    ready.wait()
+    for t in threads:
+        t.join()
+
+    report = {"concurrency": concurrency, "duration": duration, "routes": {}}
+    all_samples = []
+    for route in routes:
+        values = sorted(samples[route])
+        all_samples.extend(values)
+        report["routes"][route] = _summary(values, errors[route], duration)
+    report["total"] = _summary(sorted(all_samples), sum(errors.values()), duration)
+    return report
+
+
+def _summary(values, errors, duration):
+    return {
+        "requests": len(values),
+        "errors": errors,
+        "rps": round(len(values) / duration, 1),
+        "p50_ms": round(percentile(values, 50) * 1000, 1),
+        "p95_ms": round(percentile(values, 95) * 1000, 1),
+        "p99_ms": round(percentile(values, 99) * 1000, 1),
+        "max_ms": round((values[-1] if values else 0) * 1000, 1),
+    }
+
+
+def print_report(report):
+    print(f"\n{report['concurrency']} clients, {report['duration']:.0f}s")
+    print(f"{'route':<18}{'reqs':>8}{'errors':>8}{'rps':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}")
+    for name, row in list(report["routes"].items()) + [("TOTAL", report["total"])]:
+        print(f"{name:<18}{row['requests']:>8}{row['errors']:>8}{row['rps']:>9}"
+              f"{row['p50_ms']:>9}{row['p95_ms']:>9}{row['p99_ms']:>9}{row['max_ms']:>9}")
+
+
+def regressions(report, baseline, max_regression):
+    found = []
+    for route, row in report["routes"].items():
+        before = baseline.get("routes", {}).get(route)
+        if not before or not before["p95_ms"]:
+            continue
+        change = (row["p95_ms"] - before["p95_ms"]) / before["p95_ms"] * 100
+        if change > max_regression:
+            found.append(f"{route}: p95 {before['p95_ms']} ms -> {row['p95_ms']} ms (+{change:.0f}%)")
+    return found
+
+
+def serve_in_process():
+    # Keep every outbound call on this machine: Stripe goes to the stub
+    # URL and mail to a local port (none of the benchmarked routes send
+    # either, this only guards against surprises). All clients log in from
+    # 127.0.0.1, which the per-IP login limit would soon refuse.
+    os.environ.setdefault("STRIPE_SECRET_KEY", "sk_test_bench")
+    os.environ["STRIPE_API_BASE"] = os.getenv("BENCH_STRIPE_API_BASE", "http://127.0.0.1:12111")
+    os.environ["MAIL_SERVER"] = "127.0.0.1"
+    os.environ["MAIL_PORT"] = os.getenv("BENCH_MAIL_PORT", "1025")
+    os.environ["MAIL_USE_TLS"] = "0"
+    os.environ["MAIL_MAX_ATTEMPTS"] = "1"
+    os.environ["RATELIMIT_ENABLED"] = "0"
+
+    from werkzeug.serving import make_server, WSGIRequestHandler
+    from app import app
+
+    class QuietHandler(WSGIRequestHandler):
+        def log_request(self, *args, **kwargs):
+            pass
+
+    server = make_server("127.0.0.1", 0, app, threaded=True, request_handler=QuietHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="Base URL of a running server; omit to serve the app in-process")
+    parser.add_argument("--manifest", default=os.path.join("instance", "bench_society.json"),
+                        help="Written by bench/seed.py")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--warmup", type=float, default=5)
+    parser.add_argument("--mix", help="Route weights, e.g. dashboard=3,polls=3,book=1 (default: all routes)")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--json", help="Write the report here")
+    parser.add_argument("--baseline", help="Report from an earlier run to compare against")
+    parser.add_argument("--max-regression", type=float, default=20, help="Allowed p95 increase, in percent")
+    args = parser.parse_args()
+
+    with open(args.manifest, encoding="utf-8") as f:
+        manifest = json.load(f)
+
+    weights = dict(ROUTES)
+    if args.mix:
+        weights = {}
+        for part in args.mix.split(","):
+            name, _, weight = part.partition("=")
+            if name not in ROUTES:
+                parser.error(f"unknown route {name!r}; choose from {', '.join(ROUTES)}")
+            weights[name] = float(weight or 1)
+
+    server = None
+    base_url = args.url
+    if not base_url:
+        server, base_url = serve_in_process()
+
+    try:
+        report = run(base_url, manifest, args.concurrency, args.duration, args.warmup, weights, args.seed)
+    finally:
+        if server is not None:
+            server.shutdown()
+
+    print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            found = regressions(report, json.load(f), args.max_regression)
+        for line in found:
+            print(f"❌ {line}")
+        sys.exit(1 if found else 0)
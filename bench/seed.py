@@ -0,0 +1,179 @@
+"""Seed a realistic society for load tests.
+
+Applies pending migrations, then creates one admin with thousands of
+tenants, a year of monthly bills, visitors, polls and votes, notices,
+complaints and facility bookings. Uses the database configured in .env
+(DB_BACKEND=sqlite seeds a local SQLite file instead of MySQL).
+
+    python bench/seed.py --users 2000 --months 12 --out instance/bench_society.json
+
+The JSON manifest it writes (logins, bill ids, facilities) is the input to
+bench/loadtest.py. Every seeded account shares the password "bench-password".
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+from datetime import date, time as dtime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from werkzeug.security import generate_password_hash
+
+import ledger
+
+PASSWORD = "bench-password"
+BATCH = 1000
+
+
+def _months_back(today, count):
+    periods = []
+    year, month = today.year, today.month
+    for _ in range(count):
+        periods.append(f"{year:04d}-{month:02d}")
+        year, month = (year, month - 1) if month > 1 else (year - 1, 12)
+    return periods
+
+
+def _insert(cur, sql, rows):
+    for start in range(0, len(rows), BATCH):
+        cur.executemany(sql, rows[start:start + BATCH])
+
+
+def seed(conn, users=2000, months=12, visitors_per_user=5, polls=20, seed_value=None, echo=print):
+    rng = random.Random(seed_value)
+    tag = f"{int(time.time())}{rng.randint(100, 999)}"
+    today = date.today()
+    # Hashing is deliberately slow; one hash shared by every account keeps
+    # seeding fast and does not change what the hot routes do.
+    password = generate_password_hash(PASSWORD)
+
+    cur = conn.cursor()
+    try:
+        admin_email = f"bench-{tag}@societypro.local"
+        cur.execute(
+            "INSERT INTO admins (name, email, password, society_name) VALUES (%s, %s, %s, %s)",
+            ("Bench Admin", admin_email, password, f"Bench Society {tag}")
+        )
+        admin_id = cur.lastrowid
+        cur.execute("INSERT INTO society_fund (admin_id, amount) VALUES (%s, 0)", (admin_id,))
+
+        emails = [f"bench-{tag}-{i}@societypro.local" for i in range(users)]
+        _insert(cur, "INSERT INTO users (admin_id, name, email, password) VALUES (%s, %s, %s, %s)",
+                [(admin_id, f"Tenant {i}", email, password) for i, email in enumerate(emails)])
+        cur.execute("SELECT id FROM users WHERE admin_id = %s ORDER BY id", (admin_id,))
+        user_ids = [row[0] for row in cur.fetchall()]
+        conn.commit()
+        echo(f"✅ {len(user_ids)} tenants")
+
+        bill_rows = []
+        for age, period in enumerate(_months_back(today, months)):
+            # Older bills are mostly settled; the current month mostly is not.
+            paid_ratio = 0.2 if age == 0 else min(0.97, 0.6 + 0.05 * age)
+            for user_id in user_ids:
+                status = "Paid" if rng.random() < paid_ratio else "Unpaid"
+                bill_rows.append((user_id, admin_id, 2500, status, period))
+        _insert(cur, "INSERT INTO bills (user_id, admin_id, amount, status, period) VALUES (%s, %s, %s, %s, %s)",
+                bill_rows)
+        cur.execute("SELECT COALESCE(SUM(amount), 0) FROM bills WHERE admin_id = %s AND status = 'Paid'", (admin_id,))
+        # The fund only moves through the ledger, so the paid bills go in
+        # as one opening balance.
+        ledger.post(cur, admin_id, cur.fetchone()[0], "opening", note="Opening balance")
+        cur.execute("SELECT id FROM bills WHERE admin_id = %s", (admin_id,))
+        bill_ids = [row[0] for row in cur.fetchall()]
+        conn.commit()
+        echo(f"✅ {len(bill_ids)} bills")
+
+        visitor_rows = []
+        for user_id in user_ids:
+            for _ in range(rng.randint(0, visitors_per_user * 2)):
+                visitor_rows.append((
+                    user_id, admin_id, f"Visitor {rng.randint(1, 99999)}", f"9{rng.randint(100000000, 999999999)}",
+                    today + timedelta(days=rng.randint(-180, 14)), dtime(rng.randint(8, 21), rng.choice([0, 15, 30, 45]))
+                ))
+        _insert(cur, "INSERT INTO visitors (user_id, admin_id, name, phone, visit_date, visit_time) VALUES (%s, %s, %s, %s, %s, %s)",
+                visitor_rows)
+        conn.commit()
+        echo(f"✅ {len(visitor_rows)} visitors")
+
+        vote_rows = []
+        for n in range(polls):
+            voters = rng.sample(user_ids, int(len(user_ids) * rng.uniform(0.2, 0.8)))
+            choices = [rng.choice(["option1", "option2"]) for _ in voters]
+            cur.execute(
+                "INSERT INTO polls (admin_id, question, option1, option2, status, vote1, vote2) VALUES (%s, %s, %s, %s, %s, %s, %s)",
+                (admin_id, f"Bench poll {n + 1}?", "Yes", "No", "Active" if n < 5 else "Closed",
+                 choices.count("option1"), choices.count("option2"))
+            )
+            poll_id = cur.lastrowid
+            vote_rows.extend((poll_id, user_id, choice) for user_id, choice in zip(voters, choices))
+        _insert(cur, "INSERT INTO poll_votes (poll_id, user_id, choice) VALUES (%s, %s, %s)", vote_rows)
+        conn.commit()
+        echo(f"✅ {polls} polls, {len(vote_rows)} votes")
+
+        _insert(cur, "INSERT INTO notices (admin_id, title, content) VALUES (%s, %s, %s)",
+                [(admin_id, f"Notice {n + 1}", "Water supply will be interrupted for maintenance. " * 4)
+                 for n in range(200)])
+        _insert(cur, "INSERT INTO complaints (user_id, admin_id, subject, description, status) VALUES (%s, %s, %s, %s, %s)",
+                [(rng.choice(user_ids), admin_id, f"Complaint {n + 1}", "Lift is not working on the 4th floor.",
+                  rng.choice(["Pending", "Resolved"])) for n in range(users // 2)])
+        conn.commit()
+
+        cur.execute("SELECT name FROM facilities WHERE active = 1 ORDER BY sort_order, name")
+        facilities = [row[0] for row in cur.fetchall()]
+        cur.execute("SELECT label FROM facility_slots ORDER BY sort_order, id")
+        slots = [row[0] for row in cur.fetchall()]
+
+        # Past bookings only: future dates are left free for the load test
+        # to reserve. Each (facility, date, slot) is used at most once.
+        combos = [(f, today - timedelta(days=d), s) for f in facilities for d in range(1, 366) for s in slots]
+        booking_rows = [
+            (rng.choice(user_ids), admin_id, facility, day, slot, rng.choice(["Confirmed", "Confirmed", "Rejected"]))
+            for facility, day, slot in rng.sample(combos, min(len(combos), users))
+        ]
+        _insert(cur, "INSERT INTO bookings (user_id, admin_id, facility_name, booking_date, time_slot, status) VALUES (%s, %s, %s, %s, %s, %s)",
+                booking_rows)
+        conn.commit()
+        echo(f"✅ {len(booking_rows)} bookings")
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+
+    return {
+        "admin_id": admin_id,
+        "admin_email": admin_email,
+        "user_emails": emails,
+        "password": PASSWORD,
+        "bill_ids": bill_ids,
+        "facilities": facilities,
+        "slots": slots,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--months", type=int, default=12)
+    parser.add_argument("--polls", type=int, default=20)
+    parser.add_argument("--seed", type=int, help="Random seed, for repeatable data")
+    parser.add_argument("--out", default=os.path.join("instance", "bench_society.json"))
+    args = parser.parse_args()
+
+    import migrate
+    from app import backend
+
+    conn = backend.connect()
+    try:
+        migrate.upgrade(conn, backend.migrations_dir)
+        manifest = seed(conn, users=args.users, months=args.months, polls=args.polls, seed_value=args.seed)
+    finally:
+        conn.close()
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    print(f"Manifest written to {args.out} (admin {manifest['admin_email']}, password {PASSWORD})")
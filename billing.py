@@ -0,0 +1,83 @@
+import re
+from datetime import datetime
+
+PERIOD = re.compile(r"^\d{4}-(0[1-9]|1[0-2])$")
+
+INSERT_BILL = "INSERT IGNORE INTO bills (user_id, admin_id, amount, status, period) VALUES (%s, %s, %s, 'Unpaid', %s)"
+
+
+def generate_monthly_bills(conn, admin_id, period, amount, on_progress=None, batch_size=500, commit_batches=False):
+    # One transaction for the whole society. uq_bills_user_period makes the
+    # run idempotent: tenants already billed for the period are skipped, so
+    # re-running after onboarding new tenants only bills the newcomers.
+    # commit_batches commits after every batch instead, for databases with
+    # a single writer (SQLite) where progress updates would otherwise wait
+    # for the whole run; a failed run is then finished by re-running it.
+    cur = conn.cursor()
+    try:
+        cur.execute("SELECT id FROM users WHERE admin_id = %s ORDER BY id", (admin_id,))
+        user_ids = [row[0] for row in cur.fetchall()]
+        total = len(user_ids)
+        created = 0
+
+        for start in range(0, total, batch_size):
+            batch = user_ids[start:start + batch_size]
+            cur.executemany(INSERT_BILL, [(user_id, admin_id, amount, period) for user_id in batch])
+            created += max(cur.rowcount, 0)
+            if commit_batches:
+                conn.commit()
+            if on_progress:
+                on_progress(start + len(batch), total)
+
+        conn.commit()
+        return created, total
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+
+
+def _update_run(conn, run_id, **fields):
+    assignments = ", ".join(f"{name} = %s" for name in fields)
+    cur = conn.cursor()
+    cur.execute(f"UPDATE billing_runs SET {assignments} WHERE id = %s", (*fields.values(), run_id))
+    conn.commit()
+    cur.close()
+
+
+def run_billing(connect, run_id, admin_id, period, amount, on_complete=None, commit_batches=False):
+    # Background entry point. Progress goes through its own connection so
+    # it is visible to the dashboard while the bill inserts are still
+    # uncommitted on the main one.
+    db = status_db = None
+    try:
+        db = connect()
+        status_db = connect()
+        if not db or not status_db:
+            raise RuntimeError("no database connection")
+        _update_run(status_db, run_id, status="Running")
+        created, total = generate_monthly_bills(
+            db, admin_id, period, amount,
+            on_progress=lambda done, total: _update_run(status_db, run_id, done=done, total=total),
+            commit_batches=commit_batches,
+        )
+        _update_run(status_db, run_id, status="Completed", done=total, total=total,
+                    bills_created=created, finished_at=datetime.now())
+        if on_complete:
+            on_complete()
+        return created
+    except Exception as e:
+        print(f"❌ Billing run {run_id} failed: {e}")
+        # Through whichever connection opened, so the run does not stay
+        # Queued or Running for ever.
+        conn = status_db or db
+        if conn:
+            try:
+                _update_run(conn, run_id, status="Failed", error=str(e), finished_at=datetime.now())
+            except Exception as update_error:
+                print(f"❌ Billing run {run_id}: could not record the failure: {update_error}")
+    finally:
+        for conn in (db, status_db):
+            if conn:
+                conn.close()
@@ -0,0 +1,240 @@
+import os
+import time
+import threading
+from collections import deque
+
+import mysql.connector
+from mysql.connector.errors import PoolError
+
+
+class PoolExhausted(PoolError):
+    pass
+
+
+_query_observer = None
+
+
+def set_query_observer(observer):
+    # observer(sql, seconds) is called after every statement run through a
+    # pooled connection's cursor.
+    global _query_observer
+    _query_observer = observer
+
+
+class TimedCursor:
+    def __init__(self, cursor, observer):
+        self._cursor = cursor
+        self._observer = observer
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def execute(self, operation, params=None, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return self._cursor.execute(operation, params, *args, **kwargs)
+        finally:
+            self._observer(operation, time.perf_counter() - start)
+
+    def executemany(self, operation, seq_params, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return self._cursor.executemany(operation, seq_params, *args, **kwargs)
+        finally:
+            self._observer(operation, time.perf_counter() - start)
+
+
+def timed(cursor):
+    if _query_observer is None:
+        return cursor
+    return TimedCursor(cursor, _query_observer)
+
+
+class PooledConnection:
+    # Thin proxy around a real connection. close() hands the connection
+    # back to the pool instead of tearing down the socket, so the existing
+    # "db.close()" calls in the routes keep working unchanged.
+
+    def __init__(self, pool, conn):
+        self._pool = pool
+        self._conn = conn
+
+    def __getattr__(self, name):
+        if self._conn is None:
+            raise mysql.connector.errors.OperationalError("Connection already returned to pool")
+        return getattr(self._conn, name)
+
+    def cursor(self, *args, **kwargs):
+        return timed(self.__getattr__("cursor")(*args, **kwargs))
+
+    def close(self):
+        conn, self._conn = self._conn, None
+        if conn is not None:
+            self._pool.release(conn)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def __del__(self):
+        # Last line of defence for handlers that bail out before close().
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+class ConnectionPool:
+    def __init__(self, config, size=5, timeout=10.0, ping_interval=30.0):
+        self.config = dict(config)
+        self.size = size
+        self.timeout = timeout
+        self.ping_interval = ping_interval
+
+        self._idle = deque()
+        self._lock = threading.Condition()
+        self._created = 0
+        self._in_use = 0
+
+        self._checkouts = 0
+        self._exhausted = 0
+        self._reconnects = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    def _connect(self):
+        return mysql.connector.connect(**self.config)
+
+    def _healthy(self, conn, idle_since):
+        # Skip the round trip for connections that were used a moment ago.
+        if time.monotonic() - idle_since < self.ping_interval:
+            return True
+        try:
+            conn.ping(reconnect=True, attempts=2, delay=0)
+            return True
+        except mysql.connector.Error:
+            return False
+
+    def get(self):
+        start = time.monotonic()
+        deadline = start + self.timeout
+        conn = None
+        idle_since = None
+
+        with self._lock:
+            waited = False
+            while True:
+                if self._idle:
+                    conn, idle_since = self._idle.pop()
+                    break
+                if self._created < self.size:
+                    self._created += 1
+                    break
+                if not waited:
+                    self._exhausted += 1
+                    waited = True
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolExhausted(f"No free connection after {self.timeout}s (pool size {self.size})")
+                self._lock.wait(remaining)
+            self._in_use += 1
+
+        try:
+            if conn is None:
+                conn = self._connect()
+            elif not self._healthy(conn, idle_since):
+                self._close_quietly(conn)
+                conn = self._connect()
+                with self._lock:
+                    self._reconnects += 1
+        except Exception:
+            with self._lock:
+                self._created -= 1
+                self._in_use -= 1
+                self._lock.notify()
+            raise
+
+        waited_for = time.monotonic() - start
+        with self._lock:
+            self._checkouts += 1
+            self._wait_total += waited_for
+            self._wait_max = max(self._wait_max, waited_for)
+
+        return PooledConnection(self, conn)
+
+    def release(self, conn):
+        try:
+            if conn.unread_result:
+                conn.consume_results()
+            if conn.in_transaction:
+                conn.rollback()
+            reusable = True
+        except mysql.connector.Error:
+            reusable = False
+
+        with self._lock:
+            self._in_use -= 1
+            if reusable:
+                self._idle.append((conn, time.monotonic()))
+            else:
+                self._created -= 1
+            self._lock.notify()
+
+        if not reusable:
+            self._close_quietly(conn)
+
+    def _close_quietly(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def close_all(self):
+        with self._lock:
+            idle, self._idle = list(self._idle), deque()
+            self._created -= len(idle)
+        for conn, _ in idle:
+            self._close_quietly(conn)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": self.size,
+                "created": self._created,
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                "checkouts": self._checkouts,
+                "exhausted": self._exhausted,
+                "reconnects": self._reconnects,
+                "wait_total_seconds": round(self._wait_total, 6),
+                "wait_max_seconds": round(self._wait_max, 6),
+                "wait_avg_seconds": round(self._wait_total / self._checkouts, 6) if self._checkouts else 0.0,
+            }
+
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def get_pool(config):
+    # One pool per process: gunicorn forks workers after import, and a
+    # socket inherited from the master must never be shared between them.
+    global _pool, _pool_pid
+    pid = os.getpid()
+    if _pool is None or _pool_pid != pid:
+        with _pool_lock:
+            if _pool is None or _pool_pid != pid:
+                _pool = ConnectionPool(
+                    config,
+                    size=int(os.getenv("DB_POOL_SIZE", 5)),
+                    timeout=float(os.getenv("DB_POOL_TIMEOUT", 10)),
+                    ping_interval=float(os.getenv("DB_POOL_PING_INTERVAL", 30)),
+                )
+                _pool_pid = pid
+    return _pool
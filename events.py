@@ -0,0 +1,151 @@
+import os
+import json
+import time
+import queue
+import threading
+
+# Live updates for open pages. Requests publish small events ("complaint",
+# "booking", "poll", "visitor") to channels:
+#   user:<id>       one resident
+#   admin:<id>      one society's admin
+#   society:<id>    everyone in a society
+# and /events streams them to the browser as Server-Sent Events. Each
+# worker fans events out to its own streams through a Hub; the broker
+# decides how an event reaches the hubs of the other workers.
+
+
+class Subscription:
+    def __init__(self, hub, channels, maxsize=100):
+        self.hub = hub
+        self.channels = tuple(channels)
+        self._queue = queue.Queue(maxsize)
+
+    def put(self, event, data):
+        try:
+            self._queue.put_nowait((event, data))
+        except queue.Full:
+            # A stalled client misses updates rather than holding memory.
+            pass
+
+    def get(self, timeout):
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.hub.remove(self)
+
+
+class Hub:
+    # Every open stream holds a worker thread (or greenlet) for as long as
+    # the page stays open, so a worker serves at most max_streams of them;
+    # subscribe() returns None beyond that.
+
+    def __init__(self, max_streams=None):
+        self.max_streams = max_streams
+        self._subscribers = {}
+        self._open = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self, channels):
+        subscription = Subscription(self, channels)
+        with self._lock:
+            if self.max_streams is not None and len(self._open) >= self.max_streams:
+                return None
+            self._open.add(subscription)
+            for channel in subscription.channels:
+                self._subscribers.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def remove(self, subscription):
+        # Safe to call more than once.
+        with self._lock:
+            self._open.discard(subscription)
+            for channel in subscription.channels:
+                subscribers = self._subscribers.get(channel)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._subscribers[channel]
+
+    def dispatch(self, channel, event, data):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for subscription in subscribers:
+            subscription.put(event, data)
+
+    def streams(self):
+        with self._lock:
+            return len(self._open)
+
+
+class LocalBroker:
+    # One process: publishing is dispatching. With several gunicorn workers
+    # a resident only hears about changes made through their own worker;
+    # use RedisBroker there.
+
+    def __init__(self, max_streams=None):
+        self.hub = Hub(max_streams)
+
+    def publish(self, channel, event, data):
+        self.hub.dispatch(channel, event, data)
+
+    def subscribe(self, channels):
+        return self.hub.subscribe(channels)
+
+
+class RedisBroker:
+    # Any Redis-protocol server. Every worker runs one listener thread that
+    # feeds its hub from a single pattern subscription.
+
+    def __init__(self, url, prefix="societypro:events:", max_streams=None):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("EVENTS_REDIS_URL is set but the redis package is not installed (pip install redis)")
+        self._redis = redis.Redis.from_url(url)
+        self.prefix = prefix
+        self.hub = Hub(max_streams)
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def publish(self, channel, event, data):
+        self._redis.publish(self.prefix + channel, json.dumps({"event": event, "data": data}))
+
+    def subscribe(self, channels):
+        self._ensure_listener()
+        return self.hub.subscribe(channels)
+
+    def _ensure_listener(self):
+        pid = os.getpid()
+        if self._thread is not None and self._thread.is_alive() and self._pid == pid:
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive() and self._pid == pid:
+                return
+            self._pid = pid
+            self._thread = threading.Thread(target=self._listen, name="events", daemon=True)
+            self._thread.start()
+
+    def _listen(self):
+        while True:
+            try:
+                pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+                pubsub.psubscribe(self.prefix + "*")
+                for message in pubsub.listen():
+                    channel = message["channel"].decode()[len(self.prefix):]
+                    payload = json.loads(message["data"])
+                    self.hub.dispatch(channel, payload["event"], payload["data"])
+            except Exception as e:
+                print(f"❌ Event listener lost Redis, reconnecting: {e}")
+                time.sleep(1)
+
+
+def broker_from_env():
+    max_streams = int(os.getenv("EVENTS_MAX_STREAMS", 8))
+    url = os.getenv("EVENTS_REDIS_URL")
+    if url:
+        return RedisBroker(url, max_streams=max_streams)
+    return LocalBroker(max_streams=max_streams)
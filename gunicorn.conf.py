@@ -0,0 +1,75 @@
+# Production settings, read by gunicorn from the working directory:
+#     gunicorn wsgi:app
+# Every setting can be overridden from the environment (or on the command
+# line). WEB_WORKER_CLASS picks how a worker waits on slow I/O (MySQL,
+# Stripe, SMTP, open /events streams):
+#   gthread  (default) WEB_THREADS threads per worker.
+#   gevent   Cooperative: blocking sockets yield to other requests, so one
+#            worker holds WEB_CONNECTIONS slow requests. Needs
+#            `pip install gevent`; the MySQL driver is switched to its
+#            pure-Python protocol, which gevent can make cooperative.
+#   uvicorn  Serves asgi.py instead (`pip install uvicorn a2wsgi`).
+# Give each worker at least as many DB_POOL_SIZE connections as it runs
+# requests that touch the database at once; the rest wait DB_POOL_TIMEOUT.
+import os
+import multiprocessing
+
+worker_mode = os.getenv("WEB_WORKER_CLASS", "gthread")
+
+# Sessions (and so logins and CSRF tokens) live in one worker's memory
+# unless SESSION_REDIS_URL is set; only then is it safe to run, or to
+# recycle, more than one worker.
+shared_sessions = bool(os.getenv("SESSION_REDIS_URL"))
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_WORKERS", multiprocessing.cpu_count() if shared_sessions else 1))
+
+if worker_mode == "gevent":
+    worker_class = "gevent"
+    worker_connections = int(os.getenv("WEB_CONNECTIONS", 1000))
+    os.environ.setdefault("DB_USE_PURE", "1")
+    # An open /events stream is a parked greenlet, not a thread.
+    os.environ.setdefault("EVENTS_MAX_STREAMS", str(worker_connections // 2))
+elif worker_mode == "uvicorn":
+    worker_class = "uvicorn.workers.UvicornWorker"
+    wsgi_app = "asgi:app"
+else:
+    worker_class = "gthread"
+    threads = int(os.getenv("WEB_THREADS", 32))
+
+# A worker that stops answering the master for this long is restarted.
+timeout = int(os.getenv("WEB_TIMEOUT", 120))
+graceful_timeout = 30
+keepalive = 5
+
+# Recycle workers now and then so a slow leak cannot grow without bound;
+# the jitter keeps them from restarting all at once. A recycled worker
+# takes its in-memory sessions with it, so this is off without Redis.
+max_requests = int(os.getenv("WEB_MAX_REQUESTS", 5000 if shared_sessions else 0))
+max_requests_jitter = max_requests // 10
+
+# Each worker imports the app itself: gevent has to patch sockets and
+# threads before the app (and the MySQL driver) is imported.
+preload_app = False
+
+accesslog = os.getenv("WEB_ACCESS_LOG", "-")
+errorlog = "-"
+forwarded_allow_ips = os.getenv("FORWARDED_ALLOW_IPS", "127.0.0.1")
+
+
+def on_starting(server):
+    # Runs in the master before any worker starts; workers inherit the
+    # environment, and sessions.store_from_env() reads WEB_CONCURRENCY.
+    os.environ["WEB_CONCURRENCY"] = str(server.cfg.workers)
+    if server.cfg.workers > 1:
+        if not shared_sessions:
+            # gunicorn prints a RuntimeError and exits.
+            raise RuntimeError(f"{server.cfg.workers} workers need SESSION_REDIS_URL: each worker would keep "
+                               "its own sessions, so logins and CSRF tokens would only work on one of them")
+        missing = [name for name in ("RATELIMIT_REDIS_URL", "EVENTS_REDIS_URL") if not os.getenv(name)]
+        if missing:
+            server.log.warning("%s not set: with %d workers, rate limits are per worker and live updates only "
+                               "reach pages on the same worker", " and ".join(missing), server.cfg.workers)
+    if server.cfg.max_requests and not shared_sessions:
+        server.log.warning("WEB_MAX_REQUESTS is set without SESSION_REDIS_URL: every worker restart logs out "
+                           "the users it was serving")
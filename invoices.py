@@ -0,0 +1,162 @@
+import io
+import os
+import time
+import zipfile
+from datetime import date
+
+from reportlab.lib.pagesizes import letter
+from reportlab.pdfgen import canvas
+from reportlab.lib import colors
+from reportlab.platypus import Table, TableStyle
+
+from cache import TTLCache
+import metrics
+import jobs
+
+WIDTH, HEIGHT = letter
+
+# Everything that does not depend on the bill is built once per process.
+BRAND_ORANGE = colors.HexColor("#ff8c00")
+TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (1, 0), colors.HexColor(
+        "#333333")),
+    ('TEXTCOLOR', (0, 0), (1, 0), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('ALIGN', (0, 0), (0, -1), 'LEFT'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+    ('BACKGROUND', (0, -1), (-1, -1), BRAND_ORANGE),
+    ('GRID', (0, 0), (-1, -2), 1, colors.black)
+])
+WATERMARKS = {
+    "Paid": ("PAID", (0, 1, 0, 0.3)),
+    "Unpaid": ("UNPAID", (1, 0, 0, 0.1)),
+}
+
+
+def _draw_header(c):
+    c.setFillColor(BRAND_ORANGE)
+    c.rect(0, HEIGHT - 100, WIDTH, 100, fill=1, stroke=0)
+
+    c.setFillColor(colors.black)
+    c.setFont("Helvetica-Bold", 24)
+    c.drawString(50, HEIGHT - 60, "Society Management System")
+
+    c.setFillColor(colors.white)
+    c.setFont("Helvetica", 12)
+    c.drawString(50, HEIGHT - 80, "Sector 62, Noida, India - 201309")
+
+    c.setFillColor(colors.black)
+    c.setFont("Helvetica-Bold", 16)
+    c.drawRightString(WIDTH - 50, HEIGHT - 140, "INVOICE")
+
+
+def _draw_page(c, invoice_id, amount, status, user_email, issued_on):
+    _draw_header(c)
+
+    c.setFont("Helvetica", 12)
+    c.drawRightString(WIDTH - 50, HEIGHT - 160, f"#{invoice_id:04d}")
+    c.drawRightString(WIDTH - 50, HEIGHT - 175, f"Date: {issued_on.strftime('%B %d, %Y')}")
+
+    c.setFont("Helvetica-Bold", 12)
+    c.drawString(50, HEIGHT - 160, "Bill To:")
+    c.setFont("Helvetica", 12)
+    c.drawString(50, HEIGHT - 175, user_email)
+
+    data = [
+        ["Description", "Amount (INR)"],
+        ["Monthly Society Maintenance", f"Rs. {amount:,.2f}"],
+        ["Late Fees", "Rs. 0.00"],
+        ["TOTAL", f"Rs. {amount:,.2f}"]
+    ]
+
+    table = Table(data, colWidths=[400, 100])
+    table.setStyle(TABLE_STYLE)
+    table.wrapOn(c, WIDTH, HEIGHT)
+    table.drawOn(c, 50, HEIGHT - 350)
+
+    text, rgba = WATERMARKS["Paid" if status == "Paid" else "Unpaid"]
+    c.saveState()
+    c.translate(WIDTH/2, HEIGHT/2)
+    c.rotate(45)
+    c.setFillColorRGB(*rgba)
+    c.setFont("Helvetica-Bold", 80)
+    c.drawCentredString(0, 0, text)
+    c.restoreState()
+
+    c.showPage()
+
+
+def render_invoice(invoice_id, amount, status, user_email, issued_on=None):
+    start = time.perf_counter()
+    buffer = io.BytesIO()
+    c = canvas.Canvas(buffer, pagesize=letter)
+    _draw_page(c, invoice_id, amount, status, user_email, issued_on or date.today())
+    c.save()
+    metrics.PDF_RENDER_SECONDS.observe(time.perf_counter() - start)
+    return buffer.getvalue()
+
+
+def _render_row(row):
+    invoice_id, amount, status, user_email, issued_on = row
+    return f"Invoice_{invoice_id}.pdf", render_invoice(invoice_id, amount, status, user_email, issued_on)
+
+
+# ---------------- CACHE ----------------
+# Keyed by bill id; the stored fingerprint (amount, status, issue date)
+# makes an edited bill, a payment or a new day miss and re-render.
+_cache = TTLCache(ttl=24 * 3600, maxsize=int(os.getenv("INVOICE_CACHE_SIZE", 512)))
+
+
+def cached_invoice(invoice_id, amount, status, user_email):
+    today = date.today()
+    fingerprint = (amount, status, user_email, today)
+    hit = _cache.get(invoice_id)
+    if hit and hit[0] == fingerprint:
+        metrics.PDF_CACHE.inc(result="hit")
+        return hit[1]
+    metrics.PDF_CACHE.inc(result="miss")
+    pdf = render_invoice(invoice_id, amount, status, user_email, today)
+    _cache.set(invoice_id, (fingerprint, pdf))
+    return pdf
+
+
+def invalidate(invoice_id):
+    _cache.invalidate(invoice_id)
+
+
+# ---------------- BULK EXPORT ----------------
+class _ZipSink:
+    # Write-only file object; zipfile falls back to streaming mode (data
+    # descriptors, no seeking) when tell()/seek() are unavailable.
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def stream_invoice_zip(rows, batch_size=64):
+    # rows: (invoice_id, amount, status, user_email) tuples. PDFs are
+    # rendered a batch at a time in the process pool and each finished
+    # batch is flushed to the client before the next one starts.
+    issued_on = date.today()
+    rows = [tuple(r) + (issued_on,) for r in rows]
+    sink = _ZipSink()
+    with zipfile.ZipFile(sink, "w", zipfile.ZIP_DEFLATED) as zf:
+        for start in range(0, len(rows), batch_size):
+            batch = rows[start:start + batch_size]
+            with jobs.process_pool() as pool:
+                for name, pdf in pool.map(_render_row, batch, chunksize=8):
+                    zf.writestr(name, pdf)
+            yield sink.drain()
+    yield sink.drain()
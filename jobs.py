@@ -0,0 +1,97 @@
+import os
+import atexit
+import threading
+import traceback
+import multiprocessing
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+_executor = None
+_executor_pid = None
+_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor, _executor_pid
+    pid = os.getpid()
+    if _executor is None or _executor_pid != pid:
+        with _lock:
+            if _executor is None or _executor_pid != pid:
+                _executor = ThreadPoolExecutor(
+                    max_workers=int(os.getenv("JOB_WORKERS", 2)),
+                    thread_name_prefix="job",
+                )
+                _executor_pid = pid
+    return _executor
+
+
+def _run(fn, args, kwargs):
+    try:
+        return fn(*args, **kwargs)
+    except Exception:
+        print(f"❌ Background job {fn.__name__} failed:\n{traceback.format_exc()}")
+        raise
+
+
+def submit(fn, *args, **kwargs):
+    # Fire-and-forget: the job records its own progress/outcome somewhere
+    # every worker can read (normally a DB row), since the returned future
+    # only exists in this process.
+    return _get_executor().submit(_run, fn, args, kwargs)
+
+
+# ---------------- CPU-BOUND WORK ----------------
+# One process pool per web worker, shared by everything CPU-bound
+# (invoice PDFs, password hashes for imports). It is started on first use,
+# holds at most PROCESS_WORKERS processes, and is shut down once nobody
+# has used it for PROCESS_POOL_IDLE seconds, and when the worker exits.
+PROCESS_WORKERS = int(os.getenv("PROCESS_WORKERS", min(4, os.cpu_count() or 1)))
+PROCESS_POOL_IDLE = float(os.getenv("PROCESS_POOL_IDLE", 60))
+
+_processes = None
+_processes_pid = None
+_borrowers = 0
+_idle_timer = None
+
+
+@contextmanager
+def process_pool():
+    # Lends the shared pool for the duration of the block.
+    global _processes, _processes_pid, _borrowers, _idle_timer
+    pid = os.getpid()
+    with _lock:
+        if _processes is None or _processes_pid != pid:
+            # spawn, not fork: the web worker already runs background threads.
+            _processes = ProcessPoolExecutor(max_workers=PROCESS_WORKERS,
+                                             mp_context=multiprocessing.get_context("spawn"))
+            _processes_pid = pid
+            _borrowers = 0
+            _idle_timer = None
+        if _idle_timer is not None:
+            _idle_timer.cancel()
+            _idle_timer = None
+        _borrowers += 1
+        pool = _processes
+    try:
+        yield pool
+    finally:
+        with _lock:
+            _borrowers -= 1
+            if _borrowers == 0 and _processes is pool:
+                _idle_timer = threading.Timer(PROCESS_POOL_IDLE, _shutdown_processes, args=(pool,))
+                _idle_timer.daemon = True
+                _idle_timer.start()
+
+
+def _shutdown_processes(pool=None):
+    global _processes, _idle_timer
+    with _lock:
+        if _processes is None or _processes_pid != os.getpid():
+            return
+        if pool is not None and (pool is not _processes or _borrowers):
+            return
+        pool, _processes, _idle_timer = _processes, None, None
+    pool.shutdown(wait=True, cancel_futures=True)
+
+
+atexit.register(_shutdown_processes)
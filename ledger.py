@@ -0,0 +1,55 @@
+from decimal import Decimal
+
+# The society fund ledger. Every change to a society's fund is a row in
+# fund_ledger, which is never updated or deleted. society_fund.amount is
+# the running total, moved in the same transaction, and each row keeps
+# the balance it left behind.
+
+KINDS = {
+    "opening": "Opening balance",
+    "payment": "Bill payment",
+    "credit": "Credit",
+    "debit": "Debit",
+}
+
+
+def post(cur, admin_id, amount, kind, bill_id=None, reference=None, note=None):
+    # amount is signed: positive credits the fund, negative debits it.
+    # Must run inside a transaction. Moving society_fund first locks the
+    # society's row, so concurrent entries queue up behind it and each
+    # records the balance after it. Returns that balance.
+    cur.execute("INSERT IGNORE INTO society_fund (admin_id, amount) VALUES (%s, 0)", (admin_id,))
+    cur.execute("UPDATE society_fund SET amount = amount + %s WHERE admin_id = %s", (amount, admin_id))
+    cur.execute("SELECT amount FROM society_fund WHERE admin_id = %s", (admin_id,))
+    balance = cur.fetchone()[0]
+    cur.execute(
+        "INSERT INTO fund_ledger (admin_id, kind, amount, balance, bill_id, reference, note) "
+        "VALUES (%s, %s, %s, %s, %s, %s, %s)",
+        (admin_id, kind, amount, balance, bill_id, reference, note)
+    )
+    return balance
+
+
+def verify(cur):
+    # Societies whose stored balance disagrees with their ledger, as
+    # (admin_id, stored balance, sum of entries, balance on the last entry).
+    cur.execute("""
+        SELECT f.admin_id, f.amount, COALESCE(SUM(l.amount), 0),
+               (SELECT balance FROM fund_ledger WHERE admin_id = f.admin_id ORDER BY id DESC LIMIT 1)
+        FROM society_fund f
+        LEFT JOIN fund_ledger l ON l.admin_id = f.admin_id
+        GROUP BY f.admin_id, f.amount
+    """)
+    problems = []
+    for row in cur.fetchall():
+        # MySQL returns Decimals and SQLite floats, so compare in cents.
+        admin_id, stored, total, last = row[0], *map(_cents, row[1:])
+        if stored != total or (last is not None and last != stored):
+            problems.append((admin_id, stored, total, last))
+    return problems
+
+
+def _cents(value):
+    if value is None:
+        return None
+    return Decimal(str(value)).quantize(Decimal("0.01"))
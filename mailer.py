@@ -0,0 +1,211 @@
+import os
+import json
+import time
+import heapq
+import queue
+import smtplib
+import atexit
+import threading
+import itertools
+from datetime import datetime
+
+import metrics
+
+_STOP = object()
+
+
+class _Outgoing:
+    __slots__ = ("msg", "attempts", "last_error")
+
+    def __init__(self, msg):
+        self.msg = msg
+        self.attempts = 0
+        self.last_error = None
+
+
+class Mailer:
+    # Requests only enqueue; a single background thread per worker process
+    # owns one authenticated SMTP session and reuses it for every message.
+
+    def __init__(self, host, port, username=None, password=None, use_tls=True,
+                 max_attempts=5, backoff=2.0, idle_timeout=60.0, dead_letter_path=None):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.idle_timeout = idle_timeout
+        self.dead_letter_path = dead_letter_path
+
+        self._queue = queue.Queue()
+        self._retries = []
+        self._retrying = 0
+        self._seq = itertools.count()
+        self._smtp = None
+        self._last_used = 0.0
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+        self.sent = 0
+        self.retried = 0
+        self.dead = 0
+
+        atexit.register(self.stop)
+
+    @classmethod
+    def from_env(cls, dead_letter_path=None):
+        return cls(
+            host=os.getenv("MAIL_SERVER", "smtp.gmail.com"),
+            port=int(os.getenv("MAIL_PORT", 587)),
+            username=os.getenv("MAIL_USERNAME"),
+            password=os.getenv("MAIL_PASSWORD"),
+            use_tls=os.getenv("MAIL_USE_TLS", "1").lower() not in ("0", "false", "no"),
+            max_attempts=int(os.getenv("MAIL_MAX_ATTEMPTS", 5)),
+            backoff=float(os.getenv("MAIL_RETRY_BACKOFF", 2)),
+            dead_letter_path=os.getenv("MAIL_DEAD_LETTER_PATH", dead_letter_path),
+        )
+
+    @property
+    def sender(self):
+        return self.username
+
+    def send(self, msg):
+        self._ensure_worker()
+        self._queue.put(_Outgoing(msg))
+
+    def pending(self):
+        return self._queue.unfinished_tasks + len(self._retries) + self._retrying
+
+    def flush(self, timeout=30.0):
+        deadline = time.monotonic() + timeout
+        while self.pending() and time.monotonic() < deadline:
+            time.sleep(0.05)
+        return self.pending() == 0
+
+    def stop(self, timeout=10.0):
+        if self._thread and self._thread.is_alive():
+            self.flush(timeout)
+            self._queue.put(_STOP)
+            self._thread.join(timeout)
+
+    def _ensure_worker(self):
+        pid = os.getpid()
+        if self._thread is not None and self._thread.is_alive() and self._pid == pid:
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive() and self._pid == pid:
+                return
+            if self._pid != pid:
+                # Forked child: the parent's socket and queue are not ours.
+                self._queue = queue.Queue()
+                self._retries = []
+                self._smtp = None
+            self._pid = pid
+            self._thread = threading.Thread(target=self._run, name="mailer", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            now = time.monotonic()
+            wait = self.idle_timeout
+            if self._retries:
+                wait = max(0.0, min(wait, self._retries[0][0] - now))
+
+            try:
+                item = self._queue.get(timeout=wait)
+            except queue.Empty:
+                item = None
+
+            if item is _STOP:
+                self._queue.task_done()
+                self._disconnect()
+                return
+            if item is not None:
+                try:
+                    self._attempt(item)
+                finally:
+                    self._queue.task_done()
+
+            now = time.monotonic()
+            while self._retries and self._retries[0][0] <= now:
+                self._retrying += 1
+                _, _, due = heapq.heappop(self._retries)
+                try:
+                    self._attempt(due)
+                finally:
+                    self._retrying -= 1
+
+            if self._smtp is not None and now - self._last_used > self.idle_timeout:
+                self._disconnect()
+
+    def _attempt(self, item):
+        item.attempts += 1
+        try:
+            self._deliver(item.msg)
+        except Exception as e:
+            item.last_error = str(e)
+            self._disconnect()
+            if item.attempts >= self.max_attempts:
+                metrics.EMAILS.inc(outcome="dead")
+                self._dead_letter(item)
+            else:
+                metrics.EMAILS.inc(outcome="retry")
+                self.retried += 1
+                delay = self.backoff * (2 ** (item.attempts - 1))
+                heapq.heappush(self._retries, (time.monotonic() + delay, next(self._seq), item))
+                print(f"❌ Failed to send email (attempt {item.attempts}, retrying in {delay:.0f}s): {e}")
+            return
+        metrics.EMAILS.inc(outcome="sent")
+        self.sent += 1
+
+    def _deliver(self, msg):
+        start = time.monotonic()
+        try:
+            self._session().send_message(msg)
+        except smtplib.SMTPServerDisconnected:
+            # The server dropped the idle session; reconnect once right away.
+            self._disconnect()
+            self._session().send_message(msg)
+        self._last_used = time.monotonic()
+        metrics.SMTP_SEND_SECONDS.observe(self._last_used - start)
+
+    def _session(self):
+        if self._smtp is None:
+            smtp = smtplib.SMTP(self.host, self.port, timeout=30)
+            if self.use_tls:
+                smtp.starttls()
+            if self.username and self.password:
+                smtp.login(self.username, self.password)
+            self._smtp = smtp
+        return self._smtp
+
+    def _disconnect(self):
+        smtp, self._smtp = self._smtp, None
+        if smtp is not None:
+            try:
+                smtp.quit()
+            except Exception:
+                pass
+
+    def _dead_letter(self, item):
+        self.dead += 1
+        print(f"❌ Giving up on email to {item.msg['To']} after {item.attempts} attempts: {item.last_error}")
+        if not self.dead_letter_path:
+            return
+        record = {
+            "failed_at": datetime.now().isoformat(timespec="seconds"),
+            "to": item.msg["To"],
+            "subject": item.msg["Subject"],
+            "attempts": item.attempts,
+            "error": item.last_error,
+            "message": item.msg.as_string(),
+        }
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.dead_letter_path)), exist_ok=True)
+            with open(self.dead_letter_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record) + "\n")
+        except OSError as e:
+            print(f"❌ Could not write mail dead-letter record: {e}")
@@ -0,0 +1,151 @@
+import bisect
+import threading
+
+# Minimal Prometheus text-format metrics, kept in-process. Each gunicorn
+# worker has its own registry, so scrape every worker (or run with a
+# single worker per container) to see the whole picture.
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _label_str(names, values):
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values)) + "}"
+
+
+def _fmt(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, doc, labels=()):
+        self.name = name
+        self.doc = doc
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(n, "") for n in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            yield self.name + "_total" if not self.name.endswith("_total") else self.name, key, value
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, doc, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.doc = doc
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(n, "") for n in self.labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def samples(self):
+        with self._lock:
+            items = [(key, (list(s[0]), s[1], s[2])) for key, s in self._series.items()]
+        for key, (counts, total, count) in items:
+            running = 0
+            for bound, c in zip(self.buckets + (float("inf"),), counts):
+                running += c
+                yield self.name + "_bucket", key + (_fmt(bound),), running
+            yield self.name + "_sum", key, total
+            yield self.name + "_count", key, count
+
+
+class Gauge:
+    kind = "gauge"
+
+    def __init__(self, name, doc, labels=(), callback=None):
+        self.name = name
+        self.doc = doc
+        self.labels = tuple(labels)
+        self.callback = callback
+
+    def samples(self):
+        # callback() -> {label values tuple: value}
+        for key, value in (self.callback() or {}).items():
+            yield self.name, key, value
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, doc, labels=()):
+        return self.register(Counter(name, doc, labels))
+
+    def histogram(self, name, doc, labels=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, doc, labels, buckets))
+
+    def gauge(self, name, doc, labels=(), callback=None):
+        return self.register(Gauge(name, doc, labels, callback))
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.doc}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for sample_name, key, value in metric.samples():
+                names = metric.labels + (("le",) if sample_name.endswith("_bucket") else ())
+                lines.append(f"{sample_name}{_label_str(names, key)} {_fmt(value)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+REQUEST_SECONDS = registry.histogram(
+    "http_request_duration_seconds", "Request latency by endpoint.", ("endpoint", "method", "status"))
+REQUEST_QUERIES = registry.histogram(
+    "db_queries_per_request", "SQL statements executed per request.", ("endpoint",),
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 50, 100))
+REQUEST_DB_SECONDS = registry.histogram(
+    "db_time_per_request_seconds", "Time spent in SQL per request.", ("endpoint",))
+QUERY_SECONDS = registry.histogram(
+    "db_query_duration_seconds", "Latency of individual SQL statements.", ("verb",))
+PDF_RENDER_SECONDS = registry.histogram(
+    "invoice_pdf_render_seconds", "Time to render one invoice PDF.")
+PDF_CACHE = registry.counter(
+    "invoice_pdf_cache", "Invoice PDF cache lookups.", ("result",))
+SMTP_SEND_SECONDS = registry.histogram(
+    "smtp_send_duration_seconds", "Time to hand one message to the SMTP server.")
+EMAILS = registry.counter(
+    "emails", "Outbound email delivery outcomes.", ("outcome",))
+RATE_LIMITED = registry.counter(
+    "rate_limited", "Requests refused by a rate limit.", ("limit",))
+
+
+def query_verb(sql):
+    stripped = sql.lstrip()
+    return stripped.split(None, 1)[0].upper() if stripped else ""
@@ -0,0 +1,92 @@
+import os
+import re
+
+import mysql.connector
+from mysql.connector import errorcode
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+
+# Errors that only mean "this statement already ran". MySQL DDL commits
+# implicitly, so a migration that failed half way is re-run from the top
+# and these let it skip over what was already applied.
+ALREADY_APPLIED = {
+    errorcode.ER_TABLE_EXISTS_ERROR,
+    errorcode.ER_DUP_FIELDNAME,
+    errorcode.ER_DUP_KEYNAME,
+    errorcode.ER_CANT_DROP_FIELD_OR_KEY,
+}
+
+_FILENAME = re.compile(r"^(\d+)_([\w-]+)\.sql$")
+
+
+def available_migrations(directory=MIGRATIONS_DIR):
+    found = []
+    for filename in os.listdir(directory):
+        match = _FILENAME.match(filename)
+        if match:
+            found.append((int(match.group(1)), match.group(2), os.path.join(directory, filename)))
+    return sorted(found)
+
+
+def split_statements(sql):
+    lines = [line for line in sql.splitlines() if not line.strip().startswith("--")]
+    return [stmt.strip() for stmt in "\n".join(lines).split(";") if stmt.strip()]
+
+
+def ensure_version_table(cur):
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INT PRIMARY KEY,
+            name VARCHAR(200) NOT NULL,
+            applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+
+def applied_versions(cur):
+    ensure_version_table(cur)
+    cur.execute("SELECT version FROM schema_migrations")
+    return {row[0] for row in cur.fetchall()}
+
+
+def pending_migrations(conn, directory=MIGRATIONS_DIR):
+    cur = conn.cursor()
+    try:
+        done = applied_versions(cur)
+    finally:
+        cur.close()
+    return [m for m in available_migrations(directory) if m[0] not in done]
+
+
+def upgrade(conn, directory=MIGRATIONS_DIR, target=None, echo=print):
+    applied = []
+    for version, name, path in pending_migrations(conn, directory):
+        if target is not None and version > target:
+            break
+
+        with open(path, encoding="utf-8") as f:
+            statements = split_statements(f.read())
+
+        cur = conn.cursor()
+        try:
+            for stmt in statements:
+                try:
+                    cur.execute(stmt)
+                except mysql.connector.Error as err:
+                    if err.errno not in ALREADY_APPLIED:
+                        raise
+                    echo(f"   skipped (already applied): {err.msg}")
+            cur.execute(
+                "INSERT INTO schema_migrations (version, name) VALUES (%s, %s)",
+                (version, name)
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cur.close()
+
+        echo(f"✅ Applied {version:04d}_{name}")
+        applied.append(version)
+    return applied
@@ -0,0 +1,10 @@
+-- Composite indexes backing the keyset-paginated admin listings.
+-- Each listing filters on users.admin_id and seeks on the child table's
+-- (user_id, <sort columns>, id), so a page is an index range read instead
+-- of a full scan + filesort of the society's history.
+
+CREATE INDEX idx_users_admin ON users (admin_id, id);
+CREATE INDEX idx_bills_user ON bills (user_id, id);
+CREATE INDEX idx_visitors_user_date ON visitors (user_id, visit_date, id);
+CREATE INDEX idx_bookings_user_date ON bookings (user_id, booking_date, id);
+CREATE INDEX idx_complaints_user_status ON complaints (user_id, status, created_at, id);
@@ -0,0 +1,44 @@
+-- Covering indexes for the per-request hot paths.
+
+-- Poll tallies: COUNT(*) ... WHERE poll_id = ? AND choice = ? is answered
+-- from the index alone.
+CREATE INDEX idx_votes_poll_choice ON poll_votes (poll_id, choice);
+
+-- One vote per resident per poll; also serves the has_voted lookup.
+-- The old check-then-insert could record a vote twice; keep each
+-- resident's first vote so the key can be built.
+DELETE v FROM poll_votes v
+JOIN poll_votes kept
+  ON kept.user_id = v.user_id
+ AND kept.poll_id = v.poll_id
+ AND kept.id < v.id;
+
+ALTER TABLE poll_votes ADD UNIQUE KEY uq_votes_user_poll (user_id, poll_id);
+
+-- Slot availability check in user_bookings.
+CREATE INDEX idx_bookings_slot ON bookings (facility_name, booking_date, time_slot, status);
+
+-- At most one Confirmed booking per facility slot. The generated column is
+-- NULL for every other status, and NULLs never collide in a unique key.
+-- Existing data may hold several Confirmed bookings for one slot: keep
+-- the earliest and reject the rest, or the key cannot be built.
+UPDATE bookings b
+JOIN bookings o
+  ON o.facility_name = b.facility_name
+ AND o.booking_date = b.booking_date
+ AND o.time_slot = b.time_slot
+ AND o.status = 'Confirmed'
+ AND o.id < b.id
+SET b.status = 'Rejected'
+WHERE b.status = 'Confirmed';
+
+ALTER TABLE bookings
+    ADD COLUMN confirmed_slot TINYINT
+        AS (IF(status = 'Confirmed', 1, NULL)) STORED,
+    ADD UNIQUE KEY uq_bookings_confirmed_slot (facility_name, booking_date, time_slot, confirmed_slot);
+
+-- Notice boards, newest first, per society.
+CREATE INDEX idx_notices_admin ON notices (admin_id, id);
+
+-- Polls listing per society.
+CREATE INDEX idx_polls_admin ON polls (admin_id, id);
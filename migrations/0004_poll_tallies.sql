@@ -0,0 +1,17 @@
+-- Maintained vote counters on polls, bumped in the same transaction as the
+-- poll_votes insert, so listing polls no longer counts votes per row.
+
+ALTER TABLE polls
+    ADD COLUMN vote1 INT NOT NULL DEFAULT 0,
+    ADD COLUMN vote2 INT NOT NULL DEFAULT 0;
+
+UPDATE polls p
+LEFT JOIN (
+    SELECT poll_id,
+           SUM(choice = 'option1') AS vote1,
+           SUM(choice = 'option2') AS vote2
+    FROM poll_votes
+    GROUP BY poll_id
+) t ON t.poll_id = p.id
+SET p.vote1 = COALESCE(t.vote1, 0),
+    p.vote2 = COALESCE(t.vote2, 0);
@@ -0,0 +1,22 @@
+-- Month-end bulk billing. period is NULL for ad-hoc bills, so the unique
+-- key only constrains bills generated for a billing period.
+
+ALTER TABLE bills
+    ADD COLUMN period CHAR(7) NULL,
+    ADD UNIQUE KEY uq_bills_user_period (user_id, period);
+
+CREATE TABLE billing_runs (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    admin_id INT NOT NULL,
+    period CHAR(7) NOT NULL,
+    amount DECIMAL(10, 2) NOT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'Queued',
+    total INT NOT NULL DEFAULT 0,
+    done INT NOT NULL DEFAULT 0,
+    bills_created INT NOT NULL DEFAULT 0,
+    error TEXT,
+    started_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    finished_at TIMESTAMP NULL,
+    KEY idx_billing_runs_admin (admin_id, id),
+    CONSTRAINT fk_billing_runs_admin FOREIGN KEY (admin_id) REFERENCES admins (id) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
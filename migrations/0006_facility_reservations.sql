@@ -0,0 +1,56 @@
+-- Facilities and time slots move out of the code into cached lookup
+-- tables, and a slot is now held by Pending as well as Confirmed bookings.
+
+CREATE TABLE facilities (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    name VARCHAR(100) NOT NULL,
+    sort_order INT NOT NULL DEFAULT 0,
+    active TINYINT(1) NOT NULL DEFAULT 1,
+    UNIQUE KEY uq_facilities_name (name)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE facility_slots (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    label VARCHAR(50) NOT NULL,
+    sort_order INT NOT NULL DEFAULT 0,
+    UNIQUE KEY uq_facility_slots_label (label)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+INSERT IGNORE INTO facilities (name, sort_order) VALUES
+    ('Community Hall', 1),
+    ('Clubhouse', 2),
+    ('Tennis Court', 3),
+    ('Swimming Pool Area', 4);
+
+INSERT IGNORE INTO facility_slots (label, sort_order) VALUES
+    ('Morning (9 AM - 1 PM)', 1),
+    ('Afternoon (2 PM - 6 PM)', 2),
+    ('Evening (7 PM - 11 PM)', 3);
+
+-- Facilities belong to a society, so slots are scoped by admin_id.
+ALTER TABLE bookings ADD COLUMN admin_id INT NULL AFTER user_id;
+
+UPDATE bookings b JOIN users u ON b.user_id = u.id SET b.admin_id = u.admin_id;
+
+-- Existing data may hold several active bookings for one slot. Keep the
+-- Confirmed one (or the earliest request) and reject the rest so the
+-- unique key below can be built.
+UPDATE bookings b
+JOIN bookings o
+  ON o.admin_id = b.admin_id
+ AND o.facility_name = b.facility_name
+ AND o.booking_date = b.booking_date
+ AND o.time_slot = b.time_slot
+ AND o.id <> b.id
+ AND (o.status = 'Confirmed' OR (o.status = 'Pending' AND o.id < b.id))
+SET b.status = 'Rejected'
+WHERE b.status = 'Pending';
+
+-- active_slot is 1 while a booking holds its slot and NULL once it is
+-- rejected; the unique key makes the INSERT itself the availability check.
+ALTER TABLE bookings
+    DROP INDEX uq_bookings_confirmed_slot,
+    DROP COLUMN confirmed_slot,
+    ADD COLUMN active_slot TINYINT
+        AS (IF(status IN ('Pending', 'Confirmed'), 1, NULL)) STORED,
+    ADD UNIQUE KEY uq_bookings_active_slot (admin_id, facility_name, booking_date, time_slot, active_slot);
@@ -0,0 +1,14 @@
+-- Webhook-driven payment reconciliation.
+
+ALTER TABLE bills
+    ADD COLUMN paid_at DATETIME NULL,
+    ADD COLUMN checkout_session_id VARCHAR(255) NULL,
+    ADD COLUMN checkout_url TEXT NULL,
+    ADD COLUMN checkout_expires_at DATETIME NULL;
+
+-- Processed Stripe event ids, for idempotent webhook handling.
+CREATE TABLE stripe_events (
+    id VARCHAR(255) PRIMARY KEY,
+    type VARCHAR(100) NOT NULL,
+    received_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
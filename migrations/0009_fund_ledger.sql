@@ -0,0 +1,26 @@
+-- The society fund becomes an append-only ledger. society_fund.amount
+-- stays as the materialised current balance, updated in the same
+-- transaction as every entry; each entry also records the balance after
+-- it, so "balance as of" is one index seek.
+
+CREATE TABLE fund_ledger (
+    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    admin_id INT NOT NULL,
+    kind VARCHAR(20) NOT NULL,
+    amount DECIMAL(12, 2) NOT NULL,
+    balance DECIMAL(12, 2) NOT NULL,
+    bill_id INT NULL,
+    reference VARCHAR(255) NULL,
+    note VARCHAR(255) NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    KEY idx_fund_ledger_admin (admin_id, id),
+    KEY idx_fund_ledger_admin_time (admin_id, created_at, id),
+    KEY idx_fund_ledger_bill (bill_id),
+    CONSTRAINT fk_fund_ledger_admin FOREIGN KEY (admin_id) REFERENCES admins (id) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- Whatever the fund holds today is carried in as an opening entry.
+INSERT INTO fund_ledger (admin_id, kind, amount, balance, note)
+SELECT admin_id, 'opening', amount, amount, 'Opening balance'
+FROM society_fund
+WHERE amount <> 0;
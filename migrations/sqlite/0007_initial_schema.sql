@@ -0,0 +1,164 @@
+-- SQLite schema, equivalent to MySQL migrations 0001-0007. A SQLite
+-- database starts at version 7; later migrations get a file in both
+-- directories under the same version number.
+
+CREATE TABLE admins (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name VARCHAR(100) NOT NULL,
+    email VARCHAR(150) NOT NULL UNIQUE,
+    password VARCHAR(255) NOT NULL,
+    society_name VARCHAR(150) NOT NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE users (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    admin_id INTEGER NOT NULL REFERENCES admins (id) ON DELETE CASCADE,
+    name VARCHAR(100) NOT NULL,
+    email VARCHAR(150) NOT NULL UNIQUE,
+    password VARCHAR(255) NOT NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX idx_users_admin ON users (admin_id, id);
+
+CREATE TABLE society_fund (
+    admin_id INTEGER PRIMARY KEY REFERENCES admins (id) ON DELETE CASCADE,
+    amount DECIMAL(12, 2) NOT NULL DEFAULT 0
+);
+
+CREATE TABLE bills (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+    amount DECIMAL(10, 2) NOT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'Unpaid',
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    period CHAR(7) NULL,
+    paid_at TIMESTAMP NULL,
+    checkout_session_id VARCHAR(255) NULL,
+    checkout_url TEXT NULL,
+    checkout_expires_at TIMESTAMP NULL
+);
+CREATE INDEX idx_bills_user ON bills (user_id, id);
+CREATE UNIQUE INDEX uq_bills_user_period ON bills (user_id, period);
+
+CREATE TABLE billing_runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    admin_id INTEGER NOT NULL REFERENCES admins (id) ON DELETE CASCADE,
+    period CHAR(7) NOT NULL,
+    amount DECIMAL(10, 2) NOT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'Queued',
+    total INTEGER NOT NULL DEFAULT 0,
+    done INTEGER NOT NULL DEFAULT 0,
+    bills_created INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    started_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    finished_at TIMESTAMP NULL
+);
+CREATE INDEX idx_billing_runs_admin ON billing_runs (admin_id, id);
+
+CREATE TABLE notices (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    admin_id INTEGER NOT NULL REFERENCES admins (id) ON DELETE CASCADE,
+    title VARCHAR(200) NOT NULL,
+    content TEXT NOT NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX idx_notices_admin ON notices (admin_id, id);
+
+CREATE TABLE complaints (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+    subject VARCHAR(200) NOT NULL,
+    description TEXT NOT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'Pending',
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX idx_complaints_user_status ON complaints (user_id, status, created_at, id);
+
+CREATE TABLE visitors (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+    name VARCHAR(100) NOT NULL,
+    phone VARCHAR(20) NOT NULL,
+    visit_date DATE NOT NULL,
+    visit_time TIME NOT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'Expected'
+);
+CREATE INDEX idx_visitors_user_date ON visitors (user_id, visit_date, id);
+
+CREATE TABLE polls (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    admin_id INTEGER NOT NULL REFERENCES admins (id) ON DELETE CASCADE,
+    question VARCHAR(255) NOT NULL,
+    option1 VARCHAR(150) NOT NULL,
+    option2 VARCHAR(150) NOT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'Active',
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    vote1 INTEGER NOT NULL DEFAULT 0,
+    vote2 INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX idx_polls_admin ON polls (admin_id, id);
+
+CREATE TABLE poll_votes (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    poll_id INTEGER NOT NULL REFERENCES polls (id) ON DELETE CASCADE,
+    user_id INTEGER NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+    choice VARCHAR(10) NOT NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX idx_votes_poll_choice ON poll_votes (poll_id, choice);
+CREATE UNIQUE INDEX uq_votes_user_poll ON poll_votes (user_id, poll_id);
+
+CREATE TABLE facilities (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name VARCHAR(100) NOT NULL UNIQUE,
+    sort_order INTEGER NOT NULL DEFAULT 0,
+    active INTEGER NOT NULL DEFAULT 1
+);
+
+CREATE TABLE facility_slots (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    label VARCHAR(50) NOT NULL UNIQUE,
+    sort_order INTEGER NOT NULL DEFAULT 0
+);
+
+INSERT INTO facilities (name, sort_order) VALUES
+    ('Community Hall', 1),
+    ('Clubhouse', 2),
+    ('Tennis Court', 3),
+    ('Swimming Pool Area', 4);
+
+INSERT INTO facility_slots (label, sort_order) VALUES
+    ('Morning (9 AM - 1 PM)', 1),
+    ('Afternoon (2 PM - 6 PM)', 2),
+    ('Evening (7 PM - 11 PM)', 3);
+
+CREATE TABLE bookings (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+    admin_id INTEGER NULL,
+    facility_name VARCHAR(100) NOT NULL,
+    booking_date DATE NOT NULL,
+    time_slot VARCHAR(50) NOT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'Pending',
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    active_slot INTEGER GENERATED ALWAYS
+        AS (CASE WHEN status IN ('Pending', 'Confirmed') THEN 1 END) STORED
+);
+CREATE INDEX idx_bookings_user_date ON bookings (user_id, booking_date, id);
+CREATE INDEX idx_bookings_slot ON bookings (facility_name, booking_date, time_slot, status);
+CREATE UNIQUE INDEX uq_bookings_active_slot ON bookings (admin_id, facility_name, booking_date, time_slot, active_slot);
+
+CREATE TABLE contact_inquiries (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name VARCHAR(100),
+    email VARCHAR(150),
+    message TEXT,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE stripe_events (
+    id VARCHAR(255) PRIMARY KEY,
+    type VARCHAR(100) NOT NULL,
+    received_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
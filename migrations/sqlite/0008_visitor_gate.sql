@@ -0,0 +1,11 @@
+-- Gate check-in: a pass code per visitor, check-in/out times, and the
+-- indexes the guard's lookups by date + phone or date + code use.
+
+ALTER TABLE visitors ADD COLUMN pass_code CHAR(6) NULL;
+ALTER TABLE visitors ADD COLUMN checked_in_at TIMESTAMP NULL;
+ALTER TABLE visitors ADD COLUMN checked_out_at TIMESTAMP NULL;
+
+CREATE INDEX idx_visitors_date_phone ON visitors (visit_date, phone);
+
+-- Codes only have to be unique among the visitors of one day.
+CREATE UNIQUE INDEX uq_visitors_date_pass_code ON visitors (visit_date, pass_code);
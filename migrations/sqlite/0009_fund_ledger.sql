@@ -0,0 +1,25 @@
+-- The society fund becomes an append-only ledger. society_fund.amount
+-- stays as the materialised current balance, updated in the same
+-- transaction as every entry; each entry also records the balance after
+-- it, so "balance as of" is one index seek.
+
+CREATE TABLE fund_ledger (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    admin_id INTEGER NOT NULL REFERENCES admins (id) ON DELETE CASCADE,
+    kind VARCHAR(20) NOT NULL,
+    amount DECIMAL(12, 2) NOT NULL,
+    balance DECIMAL(12, 2) NOT NULL,
+    bill_id INTEGER NULL,
+    reference VARCHAR(255) NULL,
+    note VARCHAR(255) NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX idx_fund_ledger_admin ON fund_ledger (admin_id, id);
+CREATE INDEX idx_fund_ledger_admin_time ON fund_ledger (admin_id, created_at, id);
+CREATE INDEX idx_fund_ledger_bill ON fund_ledger (bill_id);
+
+-- Whatever the fund holds today is carried in as an opening entry.
+INSERT INTO fund_ledger (admin_id, kind, amount, balance, note)
+SELECT admin_id, 'opening', amount, amount, 'Opening balance'
+FROM society_fund
+WHERE amount <> 0;
@@ -0,0 +1,18 @@
+-- The admin listings of bills, complaints and visitors filter on the
+-- tenant's society, which lived only on users: a page joined through
+-- users and sorted the society's whole history. Each row now carries its
+-- society's admin_id (as bookings do since 0006), and an index on
+-- (admin_id, <sort columns>, id) hands a page straight off the index.
+
+ALTER TABLE bills ADD COLUMN admin_id INTEGER NULL;
+ALTER TABLE complaints ADD COLUMN admin_id INTEGER NULL;
+ALTER TABLE visitors ADD COLUMN admin_id INTEGER NULL;
+
+UPDATE bills SET admin_id = (SELECT admin_id FROM users WHERE users.id = bills.user_id);
+UPDATE complaints SET admin_id = (SELECT admin_id FROM users WHERE users.id = complaints.user_id);
+UPDATE visitors SET admin_id = (SELECT admin_id FROM users WHERE users.id = visitors.user_id);
+
+CREATE INDEX idx_bills_admin ON bills (admin_id, id);
+CREATE INDEX idx_visitors_admin_date ON visitors (admin_id, visit_date, id);
+-- Open complaints first, newest first within a status.
+CREATE INDEX idx_complaints_admin_status ON complaints (admin_id, status, created_at DESC, id DESC);
@@ -0,0 +1,6 @@
+-- The admin bookings listing still filtered through users, so a page
+-- scanned and sorted the society's whole booking history. bookings has
+-- carried admin_id since 0006; index it with the listing's sort columns
+-- as 0010 does for bills, complaints and visitors.
+
+CREATE INDEX idx_bookings_admin_date ON bookings (admin_id, booking_date, id);
@@ -0,0 +1,101 @@
+import json
+import base64
+
+DEFAULT_PAGE_SIZE = 25
+MAX_PAGE_SIZE = 100
+
+
+def encode_token(values):
+    raw = json.dumps(list(values), default=str, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_token(token):
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        values = json.loads(raw)
+    except (ValueError, TypeError):
+        return None
+    # Tokens come back from the client: anything but a flat list of values
+    # the database can bind is treated as no token. keyset_page() checks
+    # the length against the listing's sort columns.
+    if not isinstance(values, list) or not values or not all(_bindable(value) for value in values):
+        return None
+    return values
+
+
+def _bindable(value):
+    if isinstance(value, int):
+        return -2 ** 63 <= value < 2 ** 63
+    return value is None or isinstance(value, (str, float))
+
+
+def clamp_page_size(size):
+    if not size or size < 1:
+        return DEFAULT_PAGE_SIZE
+    return min(size, MAX_PAGE_SIZE)
+
+
+def _seek_clause(order, values, backwards):
+    # (a, b, c) "after" (x, y, z) expands to
+    #   a > x OR (a = x AND b > y) OR (a = x AND b = y AND c > z)
+    # with > / < picked per column direction, so each branch stays sargable.
+    branches = []
+    params = []
+    for i, (column, direction) in enumerate(order):
+        ascending = direction == "ASC"
+        if backwards:
+            ascending = not ascending
+        parts = [f"{col} = %s" for col, _ in order[:i]]
+        parts.append(f"{column} {'>' if ascending else '<'} %s")
+        branches.append("(" + " AND ".join(parts) + ")")
+        params.extend(values[:i + 1])
+    return "(" + " OR ".join(branches) + ")", params
+
+
+def _order_by(order, backwards):
+    flip = {"ASC": "DESC", "DESC": "ASC"}
+    return ", ".join(f"{col} {flip[d] if backwards else d}" for col, d in order)
+
+
+def keyset_page(cur, query, params, order, key, size, after=None, before=None):
+    """Fetch one page of ``query`` using keyset (seek) pagination.
+
+    ``query`` must end with its WHERE clause; ``order`` is a list of
+    ``(column, "ASC" | "DESC")`` pairs that ends in a unique column, and
+    ``key(row)`` returns the matching values from a result row.
+    """
+    size = clamp_page_size(size)
+    backwards = before is not None
+    cursor = before if backwards else after
+    params = list(params)
+
+    if cursor is not None and len(cursor) == len(order):
+        clause, seek_params = _seek_clause(order, cursor, backwards)
+        query += " AND " + clause
+        params += seek_params
+    else:
+        cursor = None
+        backwards = False
+
+    query += f" ORDER BY {_order_by(order, backwards)} LIMIT %s"
+    params.append(size + 1)
+
+    cur.execute(query, params)
+    rows = cur.fetchall()
+    more = len(rows) > size
+    rows = rows[:size]
+    if backwards:
+        rows.reverse()
+
+    has_prev = more if backwards else cursor is not None
+    has_next = True if backwards else more
+
+    return {
+        "rows": rows,
+        "size": size,
+        "next": encode_token(key(rows[-1])) if rows and has_next else None,
+        "prev": encode_token(key(rows[0])) if rows and has_prev else None,
+    }
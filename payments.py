@@ -0,0 +1,77 @@
+import json
+from datetime import datetime
+
+import stripe
+
+import ledger
+
+# Stripe expires Checkout Sessions after 24h by default; stop reusing a
+# stored one a little before that so the resident never lands on an
+# expired page.
+REUSE_MARGIN_SECONDS = 300
+
+
+def parse_event(payload, signature, secret):
+    # Raises stripe.SignatureVerificationError on a bad/forged signature
+    # and ValueError on a malformed body.
+    stripe.WebhookSignature.verify_header(
+        payload.decode("utf-8"), signature, secret, stripe.Webhook.DEFAULT_TOLERANCE
+    )
+    return json.loads(payload)
+
+
+def record_event(cur, event_id, event_type):
+    # Stripe delivers at least once; the primary key on stripe_events makes
+    # a redelivered event a no-op.
+    cur.execute(
+        "INSERT IGNORE INTO stripe_events (id, type) VALUES (%s, %s)",
+        (event_id, event_type)
+    )
+    return cur.rowcount == 1
+
+
+def mark_bill_paid(cur, bill_id, amount_total, session_id):
+    # Returns the society's admin_id when this call flipped the bill to
+    # Paid, None when there was nothing to do. Must run inside a
+    # transaction: the row lock serialises the webhook and the success page.
+    cur.execute(
+        "SELECT amount, status, admin_id FROM bills WHERE id = %s FOR UPDATE",
+        (bill_id,)
+    )
+    row = cur.fetchone()
+    if not row:
+        return None
+
+    amount, status, admin_id = row
+    if status == "Paid":
+        return None
+    if amount_total is not None and int(amount_total) != int(amount * 100):
+        raise ValueError(f"Bill #{bill_id}: paid {amount_total} but {int(amount * 100)} was due")
+
+    cur.execute(
+        "UPDATE bills SET status = 'Paid', paid_at = CURRENT_TIMESTAMP, checkout_session_id = %s WHERE id = %s",
+        (session_id, bill_id)
+    )
+    ledger.post(cur, admin_id, amount, "payment", bill_id=bill_id, reference=session_id)
+    return admin_id
+
+
+def completed_checkout(event):
+    # (bill_id, amount_total, session_id) for a paid checkout, else None.
+    if event.get("type") != "checkout.session.completed":
+        return None
+    session = event["data"]["object"]
+    if session.get("payment_status") != "paid":
+        return None
+    bill_id = (session.get("metadata") or {}).get("bill_id") or session.get("client_reference_id")
+    if not bill_id:
+        return None
+    return int(bill_id), session.get("amount_total"), session["id"]
+
+
+def reusable_checkout_url(url, expires_at):
+    if not url or not expires_at:
+        return None
+    if (expires_at - datetime.now()).total_seconds() < REUSE_MARGIN_SECONDS:
+        return None
+    return url
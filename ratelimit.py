@@ -0,0 +1,174 @@
+import os
+import math
+import time
+import secrets
+import threading
+from collections import OrderedDict, deque
+
+from werkzeug.exceptions import TooManyRequests
+
+import metrics
+
+# Rate limits for the routes that send email or check a password. Two
+# kinds, both keyed by a string (a client IP, an email address):
+#   take()   token bucket: `burst` requests at once, then `rate` per second.
+#   window() sliding window: at most `limit` events in the last `seconds`;
+#            events are recorded separately with hit(), so e.g. only failed
+#            logins count.
+# Both raise TooManyRequests (429) with the seconds until a retry can work.
+
+
+class MemoryStore:
+    # Per-process, like sessions.MemoryStore: every gunicorn worker keeps
+    # its own counts, so with N workers a client can get up to N times the
+    # limit. Use RedisStore for exact limits across workers.
+
+    def __init__(self, maxsize=100000):
+        self.maxsize = maxsize
+        self._buckets = OrderedDict()
+        self._windows = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _remember(self, table, key, value):
+        table[key] = value
+        table.move_to_end(key)
+        while len(table) > self.maxsize:
+            table.popitem(last=False)
+
+    def take(self, key, rate, burst):
+        # Returns 0 when a token was taken, else seconds until one refills.
+        now = time.monotonic()
+        with self._lock:
+            tokens, stamp = self._buckets.get(key, (burst, now))
+            tokens = min(burst, tokens + (now - stamp) * rate)
+            if tokens >= 1:
+                tokens, wait = tokens - 1, 0
+            else:
+                wait = (1 - tokens) / rate
+            self._remember(self._buckets, key, (tokens, now))
+        return wait
+
+    def _events(self, key, seconds, now):
+        events = self._windows.get(key)
+        if events is None:
+            return None
+        while events and events[0] <= now - seconds:
+            events.popleft()
+        return events
+
+    def blocked(self, key, limit, seconds):
+        # Returns 0 while fewer than `limit` events are in the window, else
+        # seconds until the oldest one drops out of it.
+        now = time.monotonic()
+        with self._lock:
+            events = self._events(key, seconds, now)
+            if events is None or len(events) < limit:
+                return 0
+            return events[-limit] + seconds - now
+
+    def hit(self, key, seconds):
+        now = time.monotonic()
+        with self._lock:
+            events = self._events(key, seconds, now)
+            if events is None:
+                events = deque(maxlen=1000)
+            events.append(now)
+            self._remember(self._windows, key, events)
+
+    def reset(self, key):
+        with self._lock:
+            self._windows.pop(key, None)
+
+
+# Refill and take in one round trip, atomically. Lua numbers come back as
+# integers, so the wait is returned as a string.
+_TAKE = """
+local rate, burst, now = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+local state = redis.call("HMGET", KEYS[1], "tokens", "stamp")
+local tokens = tonumber(state[1]) or burst
+local stamp = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - stamp) * rate)
+local wait = 0
+if tokens >= 1 then tokens = tokens - 1 else wait = (1 - tokens) / rate end
+redis.call("HSET", KEYS[1], "tokens", tokens, "stamp", now)
+redis.call("EXPIRE", KEYS[1], math.ceil(burst / rate) + 1)
+return tostring(wait)
+"""
+
+
+class RedisStore:
+    # Shared by every worker and host. Buckets are hashes, windows are
+    # sorted sets of event times; both expire once idle.
+
+    def __init__(self, url, prefix="societypro:ratelimit:"):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("RATELIMIT_REDIS_URL is set but the redis package is not installed (pip install redis)")
+        self._redis = redis.Redis.from_url(url)
+        self._take = self._redis.register_script(_TAKE)
+        self.prefix = prefix
+
+    def take(self, key, rate, burst):
+        return float(self._take(keys=[self.prefix + "bucket:" + key], args=[rate, burst, time.time()]))
+
+    def blocked(self, key, limit, seconds):
+        key = self.prefix + "window:" + key
+        now = time.time()
+        pipe = self._redis.pipeline()
+        pipe.zremrangebyscore(key, 0, now - seconds)
+        pipe.zrange(key, -limit, -limit, withscores=True)
+        _, oldest = pipe.execute()
+        if not oldest:
+            return 0
+        return max(0, oldest[0][1] + seconds - now)
+
+    def hit(self, key, seconds):
+        key = self.prefix + "window:" + key
+        now = time.time()
+        pipe = self._redis.pipeline()
+        pipe.zadd(key, {f"{now}:{secrets.token_hex(4)}": now})
+        pipe.expire(key, math.ceil(seconds))
+        pipe.execute()
+
+    def reset(self, key):
+        self._redis.delete(self.prefix + "window:" + key)
+
+
+def store_from_env():
+    url = os.getenv("RATELIMIT_REDIS_URL")
+    if url:
+        return RedisStore(url)
+    return MemoryStore(maxsize=int(os.getenv("RATELIMIT_CACHE_SIZE", 100000)))
+
+
+class Limiter:
+    def __init__(self, store, enabled=True):
+        self.store = store
+        self.enabled = enabled
+
+    def _refuse(self, name, wait, message):
+        metrics.RATE_LIMITED.inc(limit=name)
+        raise TooManyRequests(message, retry_after=max(1, math.ceil(wait)))
+
+    def take(self, name, key, rate, burst, message="Too many requests. Please try again later."):
+        if not self.enabled:
+            return
+        wait = self.store.take(f"{name}:{key}", rate, burst)
+        if wait:
+            self._refuse(name, wait, message)
+
+    def window(self, name, key, limit, seconds, message="Too many attempts. Please try again later."):
+        if not self.enabled:
+            return
+        wait = self.store.blocked(f"{name}:{key}", limit, seconds)
+        if wait:
+            self._refuse(name, wait, message)
+
+    def hit(self, name, key, seconds):
+        if self.enabled:
+            self.store.hit(f"{name}:{key}", seconds)
+
+    def reset(self, name, key):
+        if self.enabled:
+            self.store.reset(f"{name}:{key}")
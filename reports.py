@@ -0,0 +1,135 @@
+import io
+import csv
+import tempfile
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import letter, landscape
+from reportlab.pdfgen import canvas
+
+# Financial reports and CSV exports. The database does the aggregation
+# (GROUP BY) and the rows come off the cursor a batch at a time; each
+# function here turns such a row stream into the lines of a report
+# without collecting it into a list first.
+
+COLLECTION_HEADER = ("Month", "Bills", "Billed", "Collected", "Outstanding", "Collected %")
+ARREARS_HEADER = ("Tenant", "Name", "Email", "0-30 days", "31-60 days", "61-90 days", "90+ days", "Total",
+                  "Oldest bill")
+STATEMENT_HEADER = ("Date", "Description", "Charge", "Payment", "Balance")
+
+BRAND_ORANGE = colors.HexColor("#ff8c00")
+
+
+def day(value):
+    # SQLite hands back computed timestamps (MIN(), COALESCE()) as text.
+    if isinstance(value, (date, datetime)):
+        return value.strftime("%Y-%m-%d")
+    return str(value)[:10] if value else ""
+
+
+def ageing_cutoffs(today=None):
+    midnight = datetime.combine(today or date.today(), datetime.min.time())
+    return tuple(midnight - timedelta(days=days) for days in (30, 60, 90))
+
+
+def collection_rows(rows):
+    for month, bills, billed, collected, outstanding in rows:
+        rate = f"{collected * 100 / billed:.1f}" if billed else "0.0"
+        yield month, bills, billed, collected, outstanding, rate
+
+
+def arrears_rows(rows):
+    for row in rows:
+        yield row[:8] + (day(row[8]),)
+
+
+def statement_rows(entries):
+    balance = Decimal(0)
+    for at, kind, bill_id, period, amount in entries:
+        amount = Decimal(amount)
+        label = f"Maintenance {period}" if period else "Maintenance"
+        if kind == "charge":
+            balance += amount
+            yield day(at), f"{label} (bill #{bill_id})", amount, "", balance
+        else:
+            balance -= amount
+            yield day(at), f"Payment for bill #{bill_id}", "", amount, balance
+
+
+def stream_csv(header, rows, flush_every=500):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    for count, row in enumerate(rows, start=1):
+        writer.writerow([_safe(value) for value in row])
+        if count % flush_every == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def _safe(value):
+    # Spreadsheet apps run cells starting with these as formulas.
+    if isinstance(value, str) and value[:1] in ("=", "+", "-", "@"):
+        return "'" + value
+    return value
+
+
+def _cell(value):
+    if isinstance(value, Decimal):
+        return f"{value:,.2f}"
+    return str(value)
+
+
+def stream_pdf(title, subtitle, header, rows, widths, chunk_size=64 * 1024):
+    # Pages are drawn as the rows arrive. reportlab only writes the file
+    # on save(), so the finished PDF is spooled (to disk once it outgrows
+    # a few MB) and then sent in chunks.
+    width, height = landscape(letter)
+    margin = 40
+    spool = tempfile.SpooledTemporaryFile(max_size=4 * 1024 * 1024)
+    c = canvas.Canvas(spool, pagesize=(width, height))
+    c.setTitle(title)
+    scale = (width - 2 * margin) / sum(widths)
+    offsets = [margin + sum(widths[:i]) * scale for i in range(len(widths))]
+
+    def start_page(page):
+        c.setFillColor(BRAND_ORANGE)
+        c.rect(0, height - 60, width, 60, fill=1, stroke=0)
+        c.setFillColor(colors.black)
+        c.setFont("Helvetica-Bold", 18)
+        c.drawString(margin, height - 38, title)
+        c.setFont("Helvetica", 10)
+        c.drawRightString(width - margin, height - 38, f"{subtitle}  ·  page {page}")
+        c.setFont("Helvetica-Bold", 9)
+        for x, label in zip(offsets, header):
+            c.drawString(x, height - 85, label)
+        c.line(margin, height - 90, width - margin, height - 90)
+        c.setFont("Helvetica", 9)
+        return height - 105
+
+    page = 1
+    y = start_page(page)
+    for row in rows:
+        if y < margin:
+            c.showPage()
+            page += 1
+            y = start_page(page)
+        for x, column_width, value in zip(offsets, widths, row):
+            text = _cell(value)
+            limit = int(column_width * scale / 5)
+            c.drawString(x, y, text if len(text) <= limit else text[:limit - 1] + "…")
+        y -= 14
+    c.save()
+
+    spool.seek(0)
+    try:
+        while True:
+            chunk = spool.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+    finally:
+        spool.close()
@@ -0,0 +1,591 @@
+import secrets
+
+import storage
+from pagination import keyset_page
+
+# One repository per entity. Each runs on the connection it was built
+# with and never commits: callers group writes with app.transaction().
+# The SQL sticks to what both MySQL and SQLite (via storage.py) accept.
+
+
+def display_date(value):
+    return value.strftime("%d %b %Y") if value else ""
+
+
+class Repository:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def _fetchall(self, sql, params=()):
+        cur = self.conn.cursor()
+        try:
+            cur.execute(sql, params)
+            return cur.fetchall()
+        finally:
+            cur.close()
+
+    def _fetchone(self, sql, params=()):
+        cur = self.conn.cursor()
+        try:
+            cur.execute(sql, params)
+            return cur.fetchone()
+        finally:
+            cur.close()
+
+    def _execute(self, sql, params=()):
+        # Returns (rowcount, lastrowid).
+        cur = self.conn.cursor()
+        try:
+            cur.execute(sql, params)
+            return cur.rowcount, cur.lastrowid
+        finally:
+            cur.close()
+
+    def _executemany(self, sql, seq_params):
+        cur = self.conn.cursor()
+        try:
+            cur.executemany(sql, seq_params)
+            return cur.rowcount
+        finally:
+            cur.close()
+
+    def _iter(self, sql, params=(), batch_size=500):
+        # Yields rows as the cursor fetches them, for exports that should
+        # not hold the whole result in memory.
+        cur = self.conn.cursor()
+        try:
+            cur.execute(sql, params)
+            while True:
+                rows = cur.fetchmany(batch_size)
+                if not rows:
+                    return
+                yield from rows
+        finally:
+            cur.close()
+
+    @staticmethod
+    def _in(values):
+        return "(" + ", ".join(["%s"] * len(values)) + ")"
+
+    def _page(self, sql, params, order, key, size=None, after=None, before=None):
+        cur = self.conn.cursor()
+        try:
+            return keyset_page(cur, sql, params, order, key, size=size, after=after, before=before)
+        finally:
+            cur.close()
+
+
+class UserRepository(Repository):
+    def login(self, email):
+        return self._fetchone("SELECT id, password, admin_id FROM users WHERE email = %s", (email,))
+
+    def for_society(self, admin_id):
+        return self._fetchall("SELECT id, name, email FROM users WHERE admin_id = %s ORDER BY id DESC", (admin_id,))
+
+    def create(self, admin_id, name, email, password_hash):
+        return self._execute(
+            "INSERT INTO users (name, email, password, admin_id) VALUES (%s, %s, %s, %s)",
+            (name, email, password_hash, admin_id)
+        )[1]
+
+    def create_many(self, admin_id, tenants):
+        # tenants: (name, email, password_hash). Each new tenant also gets
+        # the zero "Paid" opening bill that create() callers add one by one.
+        self._executemany("INSERT INTO users (name, email, password, admin_id) VALUES (%s, %s, %s, %s)",
+                          [(name, email, password_hash, admin_id) for name, email, password_hash in tenants])
+        emails = [tenant[1] for tenant in tenants]
+        self._execute(
+            f"INSERT INTO bills (user_id, admin_id, amount, status) SELECT id, admin_id, 0, 'Paid' FROM users "
+            f"WHERE admin_id = %s AND email IN {self._in(emails)}",
+            [admin_id, *emails])
+
+    def taken_emails(self, emails):
+        return {row[0] for row in self._fetchall(f"SELECT email FROM users WHERE email IN {self._in(emails)}",
+                                                 list(emails))}
+
+    def export_rows(self, admin_id):
+        return self._iter("SELECT id, name, email, created_at FROM users WHERE admin_id = %s ORDER BY id",
+                          (admin_id,))
+
+    # Mutations by an admin take the admin's society id and only touch rows
+    # inside it, so a forged id from another society changes nothing.
+
+    def update(self, user_id, admin_id, name, email, password_hash=None):
+        # With a new password the row always changes, so the result says
+        # whether the tenant is in the society. (MySQL counts an UPDATE
+        # that changes nothing as 0 rows.)
+        if password_hash:
+            updated, _ = self._execute(
+                "UPDATE users SET name = %s, email = %s, password = %s WHERE id = %s AND admin_id = %s",
+                (name, email, password_hash, user_id, admin_id))
+        else:
+            updated, _ = self._execute("UPDATE users SET name = %s, email = %s WHERE id = %s AND admin_id = %s",
+                                       (name, email, user_id, admin_id))
+        return updated == 1
+
+    def in_society(self, user_id, admin_id):
+        return self._fetchone("SELECT id, name, email FROM users WHERE id = %s AND admin_id = %s", (user_id, admin_id))
+
+    def delete(self, user_id, admin_id):
+        if not self.in_society(user_id, admin_id):
+            return False
+        # The tenant's poll_votes rows go with them (ON DELETE CASCADE), so
+        # their votes come off the stored tallies here, in the same
+        # transaction.
+        self._execute("""
+            UPDATE polls SET
+                vote1 = vote1 - (SELECT COUNT(*) FROM poll_votes v
+                                 WHERE v.poll_id = polls.id AND v.user_id = %s AND v.choice = 'option1'),
+                vote2 = vote2 - (SELECT COUNT(*) FROM poll_votes v
+                                 WHERE v.poll_id = polls.id AND v.user_id = %s AND v.choice = 'option2')
+            WHERE id IN (SELECT poll_id FROM poll_votes WHERE user_id = %s)
+        """, (user_id, user_id, user_id))
+        self._execute("DELETE FROM bills WHERE user_id IN (SELECT id FROM users WHERE id = %s AND admin_id = %s)",
+                      (user_id, admin_id))
+        deleted, _ = self._execute("DELETE FROM users WHERE id = %s AND admin_id = %s", (user_id, admin_id))
+        return deleted == 1
+
+
+class BillRepository(Repository):
+    # *_FIELDS name the columns of the matching query's rows (JSON API).
+    SOCIETY_FIELDS = ("id", "email", "amount", "status")
+    USER_FIELDS = ("id", "amount", "status", "period", "created_at")
+    SOCIETY_BILLS = """
+        SELECT b.id, u.email, b.amount, b.status
+        FROM bills b
+        JOIN users u ON b.user_id = u.id
+        WHERE b.admin_id = %s
+    """
+
+    def society_page(self, admin_id, **page):
+        return self._page(self.SOCIETY_BILLS, (admin_id,), [("b.id", "DESC")], lambda r: (r[0],), **page)
+
+    def totals_by_status(self, admin_id):
+        # {status: (count, total amount)}
+        rows = self._fetchall("""
+            SELECT status, COUNT(*), COALESCE(SUM(amount), 0)
+            FROM bills
+            WHERE admin_id = %s
+            GROUP BY status
+        """, (admin_id,))
+        return {status: (count, total) for status, count, total in rows}
+
+    # Reports. Aggregation happens in the database and rows are streamed
+    # with _iter(); the zero opening bills are left out.
+
+    def monthly_collection(self, admin_id):
+        # (month, bills, billed, collected, outstanding), newest month first.
+        # A bill's month is its billing period, or its creation month for
+        # bills added by hand.
+        return self._iter("""
+            SELECT COALESCE(b.period, SUBSTR(b.created_at, 1, 7)) AS month, COUNT(*), SUM(b.amount),
+                   SUM(CASE WHEN b.status = 'Paid' THEN b.amount ELSE 0 END),
+                   SUM(CASE WHEN b.status = 'Paid' THEN 0 ELSE b.amount END)
+            FROM bills b
+            WHERE b.admin_id = %s AND b.amount > 0
+            GROUP BY COALESCE(b.period, SUBSTR(b.created_at, 1, 7))
+            ORDER BY month DESC
+        """, (admin_id,))
+
+    def arrears(self, admin_id, cutoffs):
+        # Unpaid amounts per tenant, bucketed by bill age: cutoffs are the
+        # datetimes 30, 60 and 90 days back. Rows are (user_id, name, email,
+        # 0-30, 31-60, 61-90, 90+, total, oldest bill), largest debt first.
+        d30, d60, d90 = cutoffs
+        return self._iter("""
+            SELECT u.id, u.name, u.email,
+                   SUM(CASE WHEN b.created_at >= %s THEN b.amount ELSE 0 END),
+                   SUM(CASE WHEN b.created_at < %s AND b.created_at >= %s THEN b.amount ELSE 0 END),
+                   SUM(CASE WHEN b.created_at < %s AND b.created_at >= %s THEN b.amount ELSE 0 END),
+                   SUM(CASE WHEN b.created_at < %s THEN b.amount ELSE 0 END),
+                   SUM(b.amount) AS total,
+                   MIN(b.created_at)
+            FROM bills b
+            JOIN users u ON b.user_id = u.id
+            WHERE b.admin_id = %s AND b.status <> 'Paid' AND b.amount > 0
+            GROUP BY u.id, u.name, u.email
+            ORDER BY total DESC, u.id
+        """, (d30, d30, d60, d60, d90, d90, admin_id))
+
+    def statement(self, user_id):
+        # A tenant's charges and payments in date order: (at, kind, bill id,
+        # period, amount), kind being "charge" or "payment".
+        return self._iter("""
+            SELECT created_at AS at, 'charge' AS kind, id, period, amount
+            FROM bills WHERE user_id = %s AND amount > 0
+            UNION ALL
+            SELECT COALESCE(paid_at, created_at), 'payment', id, period, amount
+            FROM bills WHERE user_id = %s AND status = 'Paid' AND amount > 0
+            ORDER BY at, id, kind
+        """, (user_id, user_id))
+
+    def for_user(self, user_id):
+        return self._fetchall("SELECT id, amount, status FROM bills WHERE user_id = %s", (user_id,))
+
+    def user_page(self, user_id, **page):
+        return self._page("SELECT id, amount, status, period, created_at FROM bills WHERE user_id = %s", (user_id,),
+                          [("id", "DESC")], lambda r: (r[0],), **page)
+
+    def create(self, user_id, admin_id, amount, status="Unpaid"):
+        return self._execute("INSERT INTO bills (user_id, admin_id, amount, status) VALUES (%s, %s, %s, %s)",
+                             (user_id, admin_id, amount, status))[1]
+
+    def create_for_tenant(self, user_id, admin_id, amount):
+        # Returns the new bill id, or None when the tenant is not in the society.
+        created, bill_id = self._execute(
+            "INSERT INTO bills (user_id, admin_id, amount, status) "
+            "SELECT id, admin_id, %s, 'Unpaid' FROM users WHERE id = %s AND admin_id = %s",
+            (amount, user_id, admin_id)
+        )
+        return bill_id if created == 1 else None
+
+    def delete(self, bill_id, admin_id):
+        deleted, _ = self._execute(
+            "DELETE FROM bills WHERE id = %s AND admin_id = %s",
+            (bill_id, admin_id)
+        )
+        return deleted == 1
+
+    def invoice(self, bill_id, admin_id):
+        return self._fetchone("""
+            SELECT b.id, b.amount, b.status, u.email
+            FROM bills b JOIN users u ON b.user_id = u.id
+            WHERE b.id = %s AND b.admin_id = %s
+        """, (bill_id, admin_id))
+
+    def invoices_for_society(self, admin_id, start=None, end=None):
+        query = """
+            SELECT b.id, b.amount, b.status, u.email
+            FROM bills b JOIN users u ON b.user_id = u.id
+            WHERE b.admin_id = %s
+        """
+        params = [admin_id]
+        if start is not None:
+            query += " AND b.created_at >= %s AND b.created_at < %s"
+            params += [start, end]
+        return self._fetchall(query + " ORDER BY b.id", params)
+
+    def export_rows(self, admin_id):
+        return self._iter("""
+            SELECT b.id, u.id, u.name, u.email, b.period, b.amount, b.status, b.created_at, b.paid_at
+            FROM bills b JOIN users u ON b.user_id = u.id
+            WHERE b.admin_id = %s
+            ORDER BY b.id
+        """, (admin_id,))
+
+    def checkout_state(self, bill_id, user_id):
+        return self._fetchone(
+            "SELECT amount, status, checkout_url, checkout_expires_at FROM bills WHERE id = %s AND user_id = %s",
+            (bill_id, user_id)
+        )
+
+    def payment_state(self, bill_id, user_id):
+        return self._fetchone("SELECT status, checkout_session_id FROM bills WHERE id = %s AND user_id = %s",
+                              (bill_id, user_id))
+
+    def store_checkout(self, bill_id, session_id, url, expires_at):
+        self._execute(
+            "UPDATE bills SET checkout_session_id = %s, checkout_url = %s, checkout_expires_at = %s WHERE id = %s",
+            (session_id, url, expires_at, bill_id)
+        )
+
+
+class NoticeRepository(Repository):
+    FIELDS = ("id", "title", "content", "created_at")
+
+    def for_society(self, admin_id):
+        rows = self._fetchall(
+            "SELECT id, title, content, created_at FROM notices WHERE admin_id = %s ORDER BY id DESC", (admin_id,))
+        return [(id, title, content, display_date(created_at)) for id, title, content, created_at in rows]
+
+    def society_page(self, admin_id, formatted=True, **page):
+        # Newest first. Formatted rows are (title, content, display date);
+        # raw rows match FIELDS.
+        page = self._page("SELECT id, title, content, created_at FROM notices WHERE admin_id = %s", (admin_id,),
+                          [("id", "DESC")], lambda r: (r[0],), **page)
+        if formatted:
+            page["rows"] = [(title, content, display_date(created_at)) for _, title, content, created_at in page["rows"]]
+        return page
+
+    def create(self, admin_id, title, content):
+        return self._execute("INSERT INTO notices (title, content, admin_id) VALUES (%s, %s, %s)",
+                             (title, content, admin_id))[1]
+
+    def update(self, notice_id, admin_id, title, content):
+        self._execute("UPDATE notices SET title = %s, content = %s WHERE id = %s AND admin_id = %s",
+                      (title, content, notice_id, admin_id))
+
+    def delete(self, notice_id, admin_id):
+        deleted, _ = self._execute("DELETE FROM notices WHERE id = %s AND admin_id = %s", (notice_id, admin_id))
+        return deleted == 1
+
+
+class PollRepository(Repository):
+    COLUMNS = {"option1": "vote1", "option2": "vote2"}
+    FIELDS = ("id", "question", "option1", "option2", "status", "vote1", "vote2")
+
+    def for_society(self, admin_id):
+        return self._fetchall(
+            "SELECT id, question, option1, option2, status, vote1, vote2 FROM polls WHERE admin_id = %s ORDER BY id DESC",
+            (admin_id,)
+        )
+
+    def create(self, admin_id, question, option1, option2):
+        return self._execute("INSERT INTO polls (question, option1, option2, admin_id) VALUES (%s, %s, %s, %s)",
+                             (question, option1, option2, admin_id))[1]
+
+    def vote(self, user_id, poll_id, choice):
+        # uq_votes_user_poll turns a second vote into a no-op, and the
+        # tally only moves when the vote row was actually inserted.
+        inserted, _ = self._execute("INSERT IGNORE INTO poll_votes (user_id, poll_id, choice) VALUES (%s, %s, %s)",
+                                    (user_id, poll_id, choice))
+        if inserted == 1:
+            column = self.COLUMNS[choice]
+            self._execute(f"UPDATE polls SET {column} = {column} + 1 WHERE id = %s", (poll_id,))
+        return inserted == 1
+
+    def voted_by(self, user_id):
+        return {row[0] for row in self._fetchall("SELECT poll_id FROM poll_votes WHERE user_id = %s", (user_id,))}
+
+
+class BookingRepository(Repository):
+    SOCIETY_FIELDS = ("id", "facility", "date", "slot", "status", "email")
+    USER_FIELDS = ("id", "facility", "date", "slot", "status")
+    SOCIETY_BOOKINGS = """
+        SELECT b.id, b.facility_name, b.booking_date, b.time_slot, b.status, u.email
+        FROM bookings b
+        JOIN users u ON b.user_id = u.id
+        WHERE b.admin_id = %s
+    """
+
+    def society_page(self, admin_id, **page):
+        return self._page(self.SOCIETY_BOOKINGS, (admin_id,),
+                          [("b.booking_date", "DESC"), ("b.id", "DESC")], lambda r: (r[2], r[0]), **page)
+
+    def for_user(self, user_id):
+        return self._fetchall(
+            "SELECT facility_name, booking_date, time_slot, status FROM bookings WHERE user_id = %s ORDER BY booking_date DESC",
+            (user_id,)
+        )
+
+    def user_page(self, user_id, **page):
+        return self._page(
+            "SELECT id, facility_name, booking_date, time_slot, status FROM bookings WHERE user_id = %s", (user_id,),
+            [("booking_date", "DESC"), ("id", "DESC")], lambda r: (r[2], r[0]), **page)
+
+    def options(self):
+        facilities = [row[0] for row in self._fetchall("SELECT name FROM facilities WHERE active = 1 ORDER BY sort_order, name")]
+        slots = [row[0] for row in self._fetchall("SELECT label FROM facility_slots ORDER BY sort_order, id")]
+        return facilities, slots
+
+    def taken_slots(self, admin_id, facility, start, end):
+        # One range scan of uq_bookings_active_slot.
+        return self._fetchall(
+            """SELECT booking_date, time_slot FROM bookings
+               WHERE admin_id = %s AND facility_name = %s
+                 AND booking_date >= %s AND booking_date < %s
+                 AND active_slot = 1""",
+            (admin_id, facility, start, end)
+        )
+
+    def create(self, user_id, admin_id, facility, booking_date, slot):
+        # Raises storage.IntegrityError when the slot is already held.
+        return self._execute(
+            "INSERT INTO bookings (user_id, admin_id, facility_name, booking_date, time_slot, status) VALUES (%s, %s, %s, %s, %s, 'Pending')",
+            (user_id, admin_id, facility, booking_date, slot)
+        )[1]
+
+    def set_status(self, booking_id, admin_id, status):
+        # Returns (user_id, facility_name, booking_date) of the booking, or
+        # None when the society has no such booking.
+        self._execute("UPDATE bookings SET status = %s WHERE id = %s AND admin_id = %s", (status, booking_id, admin_id))
+        return self._fetchone("SELECT user_id, facility_name, booking_date FROM bookings WHERE id = %s AND admin_id = %s",
+                              (booking_id, admin_id))
+
+    def set_status_many(self, booking_ids, admin_id, status):
+        # Returns [(id, user_id, facility_name, booking_date)] of the
+        # society's bookings among booking_ids.
+        scope = f"id IN {self._in(booking_ids)} AND admin_id = %s"
+        self._execute(f"UPDATE bookings SET status = %s WHERE {scope}", [status, *booking_ids, admin_id])
+        return self._fetchall(f"SELECT id, user_id, facility_name, booking_date FROM bookings WHERE {scope}",
+                              [*booking_ids, admin_id])
+
+
+class VisitorRepository(Repository):
+    SOCIETY_FIELDS = ("id", "name", "phone", "visit_date", "visit_time", "status", "email",
+                      "checked_in_at", "checked_out_at")
+    USER_FIELDS = ("id", "name", "phone", "visit_date", "visit_time", "status", "pass_code")
+    GATE_FIELDS = ("id", "name", "phone", "pass_code", "visit_time", "status", "checked_in_at", "checked_out_at",
+                   "host", "email")
+    # Expected (or Approved) -> Inside -> Exited, each move stamped.
+    CHECK_IN_FROM = ("Expected", "Approved")
+    # Admins can decide on a visitor only until the gate has seen them.
+    DECIDE_FROM = ("Expected", "Approved", "Denied")
+    SOCIETY_VISITORS = """
+        SELECT v.id, v.name, v.phone, v.visit_date, v.visit_time, v.status, u.email,
+               v.checked_in_at, v.checked_out_at
+        FROM visitors v
+        JOIN users u ON v.user_id = u.id
+        WHERE v.admin_id = %s
+    """
+
+    def society_page(self, admin_id, **page):
+        return self._page(self.SOCIETY_VISITORS, (admin_id,),
+                          [("v.visit_date", "DESC"), ("v.id", "DESC")], lambda r: (r[3], r[0]), **page)
+
+    def for_user(self, user_id):
+        return self._fetchall(
+            "SELECT name, phone, visit_date, visit_time, status, pass_code FROM visitors WHERE user_id = %s "
+            "ORDER BY id DESC",
+            (user_id,)
+        )
+
+    def user_page(self, user_id, **page):
+        return self._page(
+            "SELECT id, name, phone, visit_date, visit_time, status, pass_code FROM visitors WHERE user_id = %s",
+            (user_id,),
+            [("id", "DESC")], lambda r: (r[0],), **page)
+
+    def set_status_many(self, visitor_ids, admin_id, status):
+        # Returns ([(id, user_id)] updated, [id] skipped) for the society's
+        # visitors among visitor_ids; those already Inside or Exited are
+        # skipped. The UPDATE locks the rows it changed, so they still read
+        # as DECIDE_FROM below.
+        scope = f"id IN {self._in(visitor_ids)} AND admin_id = %s"
+        self._execute(f"UPDATE visitors SET status = %s WHERE {scope} AND status IN {self._in(self.DECIDE_FROM)}",
+                      [status, *visitor_ids, admin_id, *self.DECIDE_FROM])
+        rows = self._fetchall(f"SELECT id, user_id, status FROM visitors WHERE {scope}", [*visitor_ids, admin_id])
+        updated = [(row[0], row[1]) for row in rows if row[2] in self.DECIDE_FROM]
+        skipped = [row[0] for row in rows if row[2] not in self.DECIDE_FROM]
+        return updated, skipped
+
+    def create(self, user_id, admin_id, name, phone, visit_date, visit_time):
+        # Returns (id, pass_code). The code is what the visitor shows at the
+        # gate; uq_visitors_date_pass_code makes a clash with another
+        # visitor of that day fail, and a fresh code is drawn.
+        for attempt in range(5):
+            code = f"{secrets.randbelow(10 ** 6):06d}"
+            try:
+                visitor_id = self._execute(
+                    "INSERT INTO visitors (user_id, admin_id, name, phone, visit_date, visit_time, pass_code) "
+                    "VALUES (%s, %s, %s, %s, %s, %s, %s)",
+                    (user_id, admin_id, name, phone, visit_date, visit_time, code)
+                )[1]
+                return visitor_id, code
+            except storage.IntegrityError:
+                if attempt == 4:
+                    raise
+
+    def for_gate(self, admin_id, day):
+        # One society's visitors for one day, in GATE_FIELDS order.
+        return self._fetchall("""
+            SELECT v.id, v.name, v.phone, v.pass_code, v.visit_time, v.status, v.checked_in_at, v.checked_out_at,
+                   u.name, u.email
+            FROM visitors v
+            JOIN users u ON v.user_id = u.id
+            WHERE v.admin_id = %s AND v.visit_date = %s
+            ORDER BY v.visit_time, v.id
+        """, (admin_id, day))
+
+    def check_in(self, visitor_id, admin_id, day):
+        # Only visitors due that day. Returns the host's user_id, or None if
+        # the visitor is not in the society, not due or not waiting.
+        return self._move(visitor_id, admin_id, self.CHECK_IN_FROM, "Inside", "checked_in_at",
+                          "AND visit_date = %s", (day,))
+
+    def check_out(self, visitor_id, admin_id):
+        return self._move(visitor_id, admin_id, ("Inside",), "Exited", "checked_out_at")
+
+    def _move(self, visitor_id, admin_id, from_statuses, status, stamp, extra="", extra_params=()):
+        # The status always changes, so the rowcount is reliable here.
+        updated, _ = self._execute(
+            f"UPDATE visitors SET status = %s, {stamp} = CURRENT_TIMESTAMP "
+            f"WHERE id = %s AND status IN {self._in(from_statuses)} {extra} "
+            "AND admin_id = %s",
+            [status, visitor_id, *from_statuses, *extra_params, admin_id])
+        if updated != 1:
+            return None
+        return self._fetchone("SELECT user_id FROM visitors WHERE id = %s", (visitor_id,))[0]
+
+
+class ComplaintRepository(Repository):
+    SOCIETY_FIELDS = ("id", "email", "subject", "description", "status", "created_at")
+    USER_FIELDS = ("id", "subject", "description", "status", "created_at")
+    SOCIETY_COMPLAINTS = """
+        SELECT c.id, u.email, c.subject, c.description, c.status, c.created_at
+        FROM complaints c
+        JOIN users u ON c.user_id = u.id
+        WHERE c.admin_id = %s
+    """
+
+    def society_page(self, admin_id, formatted=True, **page):
+        # Open complaints first, newest first within each status. Formatted
+        # rows gain a display date at index 5 (created_at moves to 6).
+        page = self._page(self.SOCIETY_COMPLAINTS, (admin_id,),
+                          [("c.status", "ASC"), ("c.created_at", "DESC"), ("c.id", "DESC")],
+                          lambda r: (r[4], r[5], r[0]), **page)
+        if formatted:
+            page["rows"] = [row[:5] + (display_date(row[5]), row[5]) for row in page["rows"]]
+        return page
+
+    def user_page(self, user_id, **page):
+        return self._page(
+            "SELECT id, subject, description, status, created_at FROM complaints WHERE user_id = %s", (user_id,),
+            [("id", "DESC")], lambda r: (r[0],), **page)
+
+    def for_user(self, user_id):
+        return self._fetchall(
+            "SELECT subject, description, status, created_at FROM complaints WHERE user_id = %s ORDER BY id DESC",
+            (user_id,)
+        )
+
+    def create(self, user_id, admin_id, subject, description):
+        return self._execute("INSERT INTO complaints (user_id, admin_id, subject, description) VALUES (%s, %s, %s, %s)",
+                             (user_id, admin_id, subject, description))[1]
+
+    def set_status(self, complaint_id, admin_id, status):
+        # Returns the complaint's resident, or None outside the society.
+        scope = "id = %s AND admin_id = %s"
+        self._execute(f"UPDATE complaints SET status = %s WHERE {scope}", (status, complaint_id, admin_id))
+        row = self._fetchone(f"SELECT user_id FROM complaints WHERE {scope}", (complaint_id, admin_id))
+        return row[0] if row else None
+
+    def set_status_many(self, complaint_ids, admin_id, status):
+        # Returns [(id, user_id)] of the society's complaints among complaint_ids.
+        scope = f"id IN {self._in(complaint_ids)} AND admin_id = %s"
+        self._execute(f"UPDATE complaints SET status = %s WHERE {scope}", [status, *complaint_ids, admin_id])
+        return self._fetchall(f"SELECT id, user_id FROM complaints WHERE {scope}", [*complaint_ids, admin_id])
+
+
+class FundRepository(Repository):
+    # Reads only; entries are written through ledger.post().
+    FIELDS = ("id", "kind", "amount", "balance", "bill_id", "reference", "note", "created_at")
+
+    def page(self, admin_id, **page):
+        return self._page(
+            "SELECT id, kind, amount, balance, bill_id, reference, note, created_at FROM fund_ledger "
+            "WHERE admin_id = %s", (admin_id,),
+            [("id", "DESC")], lambda r: (r[0],), **page)
+
+    def balance_as_of(self, admin_id, moment):
+        # The balance left by the last entry before moment: one seek on
+        # idx_fund_ledger_admin_time, however long the history.
+        row = self._fetchone("""
+            SELECT balance FROM fund_ledger
+            WHERE admin_id = %s AND created_at < %s
+            ORDER BY created_at DESC, id DESC
+            LIMIT 1
+        """, (admin_id, moment))
+        return row[0] if row else 0
+
+
+class Repositories:
+    def __init__(self, conn):
+        self.users = UserRepository(conn)
+        self.bills = BillRepository(conn)
+        self.fund = FundRepository(conn)
+        self.notices = NoticeRepository(conn)
+        self.polls = PollRepository(conn)
+        self.bookings = BookingRepository(conn)
+        self.visitors = VisitorRepository(conn)
+        self.complaints = ComplaintRepository(conn)
@@ -0,0 +1,233 @@
+import os
+import time
+import secrets
+import threading
+
+from flask.sessions import SessionInterface, SessionMixin, session_json_serializer
+from werkzeug.datastructures import CallbackDict
+
+from cache import TTLCache
+
+# Server-side sessions: the cookie carries only a random session id, the
+# data lives in a store. Login caches the account id and its society id
+# in the session, so ownership checks need no extra query, and every
+# session of an account can be revoked at once (tenant deleted, password
+# changed) instead of living on in a signed cookie until it expires.
+
+
+def principal(role, account_id):
+    return f"{role}:{account_id}"
+
+
+def principal_of(data):
+    for role in ("admin", "user"):
+        if role in data:
+            return principal(role, data[role])
+    return None
+
+
+class ServerSession(CallbackDict, SessionMixin):
+    def __init__(self, initial=None, sid=None, written=0.0, bearer=False):
+        def on_update(self):
+            self.modified = True
+            self.accessed = True
+
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.written = written
+        # Sent as "Authorization: Bearer <sid>" by API clients, not as a cookie.
+        self.bearer = bearer
+        self.loaded_principal = principal_of(self)
+        self.modified = False
+        self.accessed = False
+
+    def __getitem__(self, key):
+        self.accessed = True
+        return super().__getitem__(key)
+
+    def __contains__(self, key):
+        self.accessed = True
+        return super().__contains__(key)
+
+    def get(self, key, default=None):
+        self.accessed = True
+        return super().get(key, default)
+
+    def setdefault(self, key, default=None):
+        self.accessed = True
+        return super().setdefault(key, default)
+
+
+class MemoryStore:
+    # Per-process LRU. Sessions are not shared between gunicorn workers
+    # and do not survive a restart; use RedisStore for more than one
+    # worker. Sessions nobody is logged in to (a CSRF token, a password
+    # reset under way) have an LRU of their own: anyone can create them
+    # by the thousand, and they must not push logged-in users out.
+
+    def __init__(self, maxsize=10000, anonymous_maxsize=10000):
+        self._sessions = TTLCache(maxsize=maxsize)
+        self._anonymous = TTLCache(maxsize=anonymous_maxsize)
+        self._index = {}
+        self._lock = threading.Lock()
+
+    def get(self, sid):
+        payload = self._sessions.get(sid)
+        return payload if payload is not None else self._anonymous.get(sid)
+
+    def set(self, sid, payload, owner, ttl):
+        # A session moves between the two when someone logs in or out of it.
+        if not owner:
+            self._sessions.invalidate(sid)
+            self._anonymous.set(sid, payload, ttl)
+            return
+        self._anonymous.invalidate(sid)
+        self._sessions.set(sid, payload, ttl)
+        with self._lock:
+            sids = self._index.setdefault(owner, set())
+            sids.add(sid)
+            if len(sids) > 16:
+                # Forget ids the LRU has already evicted.
+                sids.intersection_update(s for s in list(sids) if self._sessions.get(s) is not None)
+
+    def delete(self, sid):
+        self._sessions.invalidate(sid)
+        self._anonymous.invalidate(sid)
+
+    def revoke(self, owner, keep=None):
+        with self._lock:
+            sids = self._index.pop(owner, set())
+            if keep in sids:
+                self._index[owner] = {keep}
+        for sid in sids - {keep}:
+            self._sessions.invalidate(sid)
+
+
+class RedisStore:
+    # Any Redis-protocol server (Redis, Valkey, KeyDB). Shared by every
+    # worker and host, and survives restarts.
+
+    def __init__(self, url, prefix="societypro:session:"):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("SESSION_REDIS_URL is set but the redis package is not installed (pip install redis)")
+        self._redis = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def _key(self, sid):
+        return self.prefix + sid
+
+    def _index(self, owner):
+        return f"{self.prefix}index:{owner}"
+
+    def get(self, sid):
+        payload = self._redis.get(self._key(sid))
+        return payload.decode() if payload is not None else None
+
+    def set(self, sid, payload, owner, ttl):
+        pipe = self._redis.pipeline()
+        pipe.set(self._key(sid), payload, ex=ttl)
+        if owner:
+            pipe.sadd(self._index(owner), sid)
+            pipe.expire(self._index(owner), ttl)
+        pipe.execute()
+
+    def delete(self, sid):
+        self._redis.delete(self._key(sid))
+
+    def revoke(self, owner, keep=None):
+        index = self._index(owner)
+        sids = [s.decode() for s in self._redis.smembers(index) if s.decode() != keep]
+        if sids:
+            pipe = self._redis.pipeline()
+            pipe.delete(*(self._key(s) for s in sids))
+            pipe.srem(index, *sids)
+            pipe.execute()
+
+
+def store_from_env():
+    url = os.getenv("SESSION_REDIS_URL")
+    if url:
+        return RedisStore(url)
+    # WEB_CONCURRENCY is the number of worker processes (gunicorn reads it,
+    # and gunicorn.conf.py sets it). Each would have sessions of its own,
+    # and a login would only count on the worker that handled it.
+    if int(os.getenv("WEB_CONCURRENCY") or 1) > 1:
+        raise RuntimeError("Sessions are kept in each worker's memory, which does not work with more than one "
+                           "worker process: set SESSION_REDIS_URL, or run a single worker")
+    return MemoryStore(maxsize=int(os.getenv("SESSION_CACHE_SIZE", 10000)),
+                       anonymous_maxsize=int(os.getenv("SESSION_ANONYMOUS_CACHE_SIZE", 10000)))
+
+
+class ServerSessionInterface(SessionInterface):
+    def __init__(self, store):
+        self.store = store
+
+    def open_session(self, app, request):
+        # An explicit bearer token wins over whatever cookie came along.
+        if request.authorization and request.authorization.type == "bearer":
+            sid, bearer = request.authorization.token, True
+        else:
+            sid, bearer = request.cookies.get(self.get_cookie_name(app)), False
+        if sid:
+            payload = self.store.get(sid)
+            if payload is not None:
+                record = session_json_serializer.loads(payload)
+                return ServerSession(record["data"], sid=sid, written=record["written"], bearer=bearer)
+        return ServerSession()
+
+    def issue_token(self, session):
+        # Turns the session into a bearer-token session and assigns its id
+        # now (it is stored when the response is saved), so an API login
+        # can return it. No cookie is set for it.
+        if session.sid is not None:
+            self.store.delete(session.sid)
+        session.sid = secrets.token_urlsafe(32)
+        session.loaded_principal = principal_of(session)
+        session.bearer = True
+        session.modified = True
+        return session.sid
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        secure = self.get_cookie_secure(app)
+        samesite = self.get_cookie_samesite(app)
+        httponly = self.get_cookie_httponly(app)
+
+        if session.accessed:
+            response.vary.add("Authorization" if session.bearer else "Cookie")
+
+        if not session:
+            if session.sid is not None and session.modified:
+                self.store.delete(session.sid)
+                if not session.bearer:
+                    response.delete_cookie(name, domain=domain, path=path, secure=secure,
+                                           samesite=samesite, httponly=httponly)
+            return
+
+        owner = principal_of(session)
+        if session.sid is not None and owner != session.loaded_principal:
+            # A new id on login, so an id planted before it is worthless.
+            self.store.delete(session.sid)
+            session.sid = None
+
+        lifetime = int(app.permanent_session_lifetime.total_seconds())
+        # Active sessions are re-written (and their expiry pushed back)
+        # at most once per half lifetime, not on every request.
+        stale = time.time() - session.written > lifetime / 2
+        if session.sid is not None and not (session.modified or stale):
+            return
+
+        if session.sid is None:
+            session.sid = secrets.token_urlsafe(32)
+        session.written = time.time()
+        payload = session_json_serializer.dumps({"data": dict(session), "written": session.written})
+        self.store.set(session.sid, payload, owner, lifetime)
+        if session.bearer:
+            return
+        response.set_cookie(name, session.sid, expires=self.get_expiration_time(app, session),
+                            httponly=httponly, domain=domain, path=path, secure=secure, samesite=samesite)
+        response.vary.add("Cookie")
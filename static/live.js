@@ -0,0 +1,55 @@
+// Live sections: an element with data-live="complaint" (or booking, poll,
+// visitor) is re-fetched and swapped in place whenever the server pushes
+// an event of that type over /events, instead of the user refreshing.
+// When the server has no stream to spare (204) the page polls instead.
+(function () {
+  const regions = document.querySelectorAll("[data-live]");
+  if (!regions.length) return;
+
+  const POLL_MS = 30000;
+  const types = new Set();
+  regions.forEach((el) => el.dataset.live.split(" ").forEach((t) => types.add(t)));
+
+  const stale = new Set();
+  let pending = null;
+
+  async function reload() {
+    pending = null;
+    if (document.hidden) return; // picked up again on visibilitychange
+    const changed = new Set(stale);
+    stale.clear();
+    const response = await fetch(window.location.href, { credentials: "same-origin" });
+    if (!response.ok) return;
+    const page = new DOMParser().parseFromString(await response.text(), "text/html");
+    const fresh = page.querySelectorAll("[data-live]");
+    document.querySelectorAll("[data-live]").forEach((el, i) => {
+      // Only the sections an event was about.
+      if (fresh[i] && el.dataset.live.split(" ").some((t) => changed.has(t))) el.replaceWith(fresh[i]);
+    });
+  }
+
+  function refresh(type) {
+    stale.add(type);
+    if (pending || document.hidden) return;
+    // One fetch per burst, and spread out so an event that reaches every
+    // open page does not bring them all back at the same instant.
+    pending = setTimeout(reload, 300 + Math.random() * 2000);
+  }
+
+  document.addEventListener("visibilitychange", () => {
+    if (!document.hidden && stale.size && !pending) pending = setTimeout(reload, 300);
+  });
+
+  function poll() {
+    setInterval(() => types.forEach(refresh), POLL_MS);
+  }
+
+  if (!window.EventSource) return poll();
+  const source = new EventSource("/events");
+  types.forEach((type) => source.addEventListener(type, () => refresh(type)));
+  source.addEventListener("error", () => {
+    // CLOSED means the server turned the stream down; plain network
+    // errors leave it CONNECTING and EventSource retries by itself.
+    if (source.readyState === EventSource.CLOSED) poll();
+  });
+})();
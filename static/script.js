@@ -293,4 +293,89 @@ document.addEventListener("DOMContentLoaded", () => {
         icon.classList.add("ri-menu-3-line");
       });
     });
-  }
\ No newline at end of file
+  }
+
+document.addEventListener("DOMContentLoaded", () => {
+  // --- 8. MONTHLY BILLING PROGRESS ---
+  const billingRun = document.getElementById("billing-run");
+  if (billingRun && ["Queued", "Running"].includes(billingRun.dataset.status)) {
+    const poll = setInterval(async () => {
+      const res = await fetch(`/admin/billing/runs/${billingRun.dataset.runId}`);
+      if (!res.ok) return clearInterval(poll);
+      const run = await res.json();
+      billingRun.textContent = `${run.period}: ${run.status} (${run.done}/${run.total})`;
+      if (run.status === "Completed" || run.status === "Failed") {
+        clearInterval(poll);
+        if (run.status === "Completed") window.location.reload();
+      }
+    }, 2000);
+  }
+
+  // --- 9. FACILITY AVAILABILITY ---
+  const bookingForm = document.getElementById("booking-form");
+  const availability = document.getElementById("availability");
+  if (bookingForm && availability) {
+    const facilitySelect = bookingForm.querySelector('select[name="facility"]');
+    const dateInput = bookingForm.querySelector('input[name="date"]');
+    const slotSelect = bookingForm.querySelector('select[name="slot"]');
+    const months = {};
+
+    const refresh = async () => {
+      const day = dateInput.value;
+      const month = (day || new Date().toISOString()).slice(0, 7);
+      const key = `${facilitySelect.value}|${month}`;
+      if (!months[key]) {
+        const res = await fetch(
+          `${availability.dataset.url}?facility=${encodeURIComponent(facilitySelect.value)}&month=${month}`,
+        );
+        if (!res.ok) return;
+        months[key] = await res.json();
+      }
+      const data = months[key];
+      const takenOnDay = day ? data.taken[day] || [] : [];
+      [...slotSelect.options].forEach((opt) => {
+        opt.disabled = takenOnDay.includes(opt.value);
+      });
+      if (slotSelect.selectedOptions[0] && slotSelect.selectedOptions[0].disabled) {
+        const free = [...slotSelect.options].find((opt) => !opt.disabled);
+        if (free) free.selected = true;
+      }
+
+      const fullDays = Object.keys(data.taken)
+        .filter((d) => data.taken[d].length >= data.slots.length)
+        .sort();
+      if (day) {
+        availability.textContent = `${data.slots.length - takenOnDay.length} of ${data.slots.length} slots free on ${day}.`;
+      } else if (fullDays.length) {
+        availability.textContent = `Fully booked in ${month}: ${fullDays.map((d) => d.slice(8)).join(", ")}`;
+      } else {
+        availability.textContent = `Every date in ${month} has free slots.`;
+      }
+    };
+
+    facilitySelect.addEventListener("change", refresh);
+    dateInput.addEventListener("change", refresh);
+    refresh();
+  }
+
+  // --- 10. CONTACT FORM CSRF TOKEN ---
+  // The home page is cached and shared by every visitor, so the form's
+  // token is fetched (uncached) the first time the form is used.
+  document.querySelectorAll("form[data-csrf-url]").forEach((form) => {
+    const field = form.querySelector('input[name="csrf_token"]');
+    let loading = null;
+    const load = () => {
+      loading = loading || fetch(form.dataset.csrfUrl, { credentials: "same-origin", cache: "no-store" })
+        .then((res) => (res.ok ? res.json() : Promise.reject(res)))
+        .then((data) => { field.value = data.token; })
+        .catch(() => { loading = null; });
+      return loading;
+    };
+    form.addEventListener("focusin", load, { once: true });
+    form.addEventListener("submit", (e) => {
+      if (field.value) return;
+      e.preventDefault();
+      load().then(() => { if (field.value) form.submit(); });
+    });
+  });
+});
@@ -0,0 +1,198 @@
+import os
+import re
+import sqlite3
+import threading
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+
+import mysql.connector
+
+import migrate
+from db import get_pool, timed
+
+# What the routes catch, whichever backend is configured.
+Error = (mysql.connector.Error, sqlite3.Error)
+IntegrityError = (mysql.connector.IntegrityError, sqlite3.IntegrityError)
+
+
+class MySQLBackend:
+    name = "mysql"
+    migrations_dir = migrate.MIGRATIONS_DIR
+    single_writer = False
+
+    def __init__(self, config):
+        self.config = config
+
+    def connect(self):
+        return get_pool(self.config).get()
+
+    def stats(self):
+        return get_pool(self.config).stats()
+
+
+# ---------------- SQLITE ----------------
+# The app's SQL is written for MySQL; these are the only constructs it
+# uses that SQLite spells differently.
+_PARAM = re.compile(r"%s")
+_INSERT_IGNORE = re.compile(r"^\s*INSERT\s+IGNORE\b", re.IGNORECASE)
+_FOR_UPDATE = re.compile(r"\s+FOR\s+UPDATE\s*$", re.IGNORECASE)
+
+sqlite3.register_adapter(Decimal, str)
+sqlite3.register_adapter(date, date.isoformat)
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(" "))
+sqlite3.register_adapter(time, time.isoformat)
+sqlite3.register_adapter(timedelta, lambda value: str(value))
+sqlite3.register_converter("DECIMAL", lambda raw: Decimal(raw.decode()))
+sqlite3.register_converter("DATE", lambda raw: date.fromisoformat(raw.decode()))
+sqlite3.register_converter("TIMESTAMP", lambda raw: datetime.fromisoformat(raw.decode()))
+
+
+def translate(sql):
+    sql = _INSERT_IGNORE.sub("INSERT OR IGNORE", sql)
+    sql = _FOR_UPDATE.sub("", sql)
+    return _PARAM.sub("?", sql)
+
+
+class SQLiteCursor:
+    def __init__(self, conn, dictionary=False):
+        self._conn = conn
+        self._cursor = conn.raw.cursor()
+        self._dictionary = dictionary
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def execute(self, operation, params=()):
+        if _FOR_UPDATE.search(operation) and not self._conn.raw.in_transaction:
+            # SQLite has no row locks; take the database write lock up
+            # front so the read and the following write stay atomic.
+            self._cursor.execute("BEGIN IMMEDIATE")
+        self._cursor.execute(translate(operation), tuple(params or ()))
+        return None
+
+    def executemany(self, operation, seq_params):
+        self._cursor.executemany(translate(operation), [tuple(p) for p in seq_params])
+        return None
+
+    def _row(self, row):
+        if row is None or not self._dictionary:
+            return row
+        return {col[0]: value for col, value in zip(self._cursor.description, row)}
+
+    def fetchone(self):
+        return self._row(self._cursor.fetchone())
+
+    def fetchall(self):
+        return [self._row(row) for row in self._cursor.fetchall()]
+
+    def __iter__(self):
+        return (self._row(row) for row in self._cursor)
+
+    def close(self):
+        self._cursor.close()
+
+
+class SQLiteConnection:
+    # Same surface as a pooled MySQL connection: cursor(), commit(),
+    # rollback(), close(). close() hands the sqlite3 connection back to
+    # the backend for reuse.
+
+    def __init__(self, backend, raw):
+        self._backend = backend
+        self.raw = raw
+
+    def cursor(self, dictionary=False, **kwargs):
+        return timed(SQLiteCursor(self, dictionary))
+
+    @property
+    def in_transaction(self):
+        return self.raw.in_transaction
+
+    def commit(self):
+        self.raw.commit()
+
+    def rollback(self):
+        self.raw.rollback()
+
+    def close(self):
+        raw, self.raw = self.raw, None
+        if raw is not None:
+            self._backend.release(raw)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+class SQLiteBackend:
+    name = "sqlite"
+    migrations_dir = os.path.join(migrate.MIGRATIONS_DIR, "sqlite")
+    # One write transaction at a time for the whole database.
+    single_writer = True
+
+    def __init__(self, path, busy_timeout=5.0):
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self._idle = []
+        self._pid = os.getpid()
+        self._opened = 0
+        self._lock = threading.Lock()
+
+    def _open(self):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        raw = sqlite3.connect(self.path, timeout=self.busy_timeout,
+                              detect_types=sqlite3.PARSE_DECLTYPES, check_same_thread=False)
+        # WAL lets readers run alongside the single writer; NORMAL sync is
+        # durable across application crashes, which is what WAL needs.
+        raw.execute("PRAGMA journal_mode = WAL")
+        raw.execute("PRAGMA synchronous = NORMAL")
+        raw.execute("PRAGMA foreign_keys = ON")
+        return raw
+
+    def connect(self):
+        # Connections are kept open and reused; there is no handshake to
+        # amortise, but the PRAGMAs and page cache are worth keeping.
+        with self._lock:
+            if self._pid != os.getpid():
+                # Forked child: never share the parent's file handles.
+                self._idle, self._pid, self._opened = [], os.getpid(), 0
+            raw = self._idle.pop() if self._idle else None
+            if raw is None:
+                self._opened += 1
+        if raw is None:
+            try:
+                raw = self._open()
+            except Exception:
+                with self._lock:
+                    self._opened -= 1
+                raise
+        return SQLiteConnection(self, raw)
+
+    def release(self, raw):
+        if raw.in_transaction:
+            raw.rollback()
+        with self._lock:
+            self._idle.append(raw)
+
+    def stats(self):
+        with self._lock:
+            return {"created": self._opened, "idle": len(self._idle), "in_use": self._opened - len(self._idle)}
+
+
+def backend_from_env(mysql_config):
+    kind = os.getenv("DB_BACKEND", "mysql").lower()
+    if kind == "sqlite":
+        return SQLiteBackend(os.getenv("SQLITE_PATH", os.path.join("instance", "society.db")),
+                             busy_timeout=float(os.getenv("SQLITE_BUSY_TIMEOUT", 5)))
+    if kind != "mysql":
+        raise ValueError(f"Unknown DB_BACKEND {kind!r}; expected 'mysql' or 'sqlite'")
+    return MySQLBackend(mysql_config)
@@ -0,0 +1,116 @@
+"""Local stand-in for the Stripe API, for development and load tests.
+
+Implements just what SocietyPro uses: creating and retrieving Checkout
+Sessions. Opening a session's URL "pays" it, posts a signed
+checkout.session.completed event to the app's webhook and redirects back to
+the success_url, the same round trip a real payment makes.
+
+    python stubs/stripe_stub.py --port 12111 \\
+        --webhook http://127.0.0.1:5000/stripe/webhook --secret whsec_local
+
+    # .env
+    STRIPE_SECRET_KEY=sk_test_local
+    STRIPE_API_BASE=http://127.0.0.1:12111
+    STRIPE_WEBHOOK_SECRET=whsec_local
+"""
+import hmac
+import json
+import time
+import hashlib
+import argparse
+import itertools
+import threading
+import urllib.request
+
+from flask import Flask, request, jsonify, redirect
+
+_ids = itertools.count(1)
+
+
+def sign_payload(payload, secret, timestamp=None):
+    # Same scheme as Stripe: HMAC-SHA256 over "<timestamp>.<body>".
+    timestamp = int(timestamp or time.time())
+    digest = hmac.new(secret.encode(), f"{timestamp}.{payload}".encode(), hashlib.sha256).hexdigest()
+    return f"t={timestamp},v1={digest}"
+
+
+def completed_event(checkout_session):
+    return {
+        "id": f"evt_stub_{next(_ids)}",
+        "object": "event",
+        "type": "checkout.session.completed",
+        "created": int(time.time()),
+        "data": {"object": checkout_session},
+    }
+
+
+def deliver(webhook_url, secret, event):
+    payload = json.dumps(event)
+    req = urllib.request.Request(
+        webhook_url,
+        data=payload.encode(),
+        headers={"Content-Type": "application/json", "Stripe-Signature": sign_payload(payload, secret)},
+        method="POST",
+    )
+    with urllib.request.urlopen(req, timeout=10) as res:
+        return res.status
+
+
+def create_app(webhook_url=None, secret="whsec_local"):
+    app = Flask(__name__)
+    sessions = {}
+    lock = threading.Lock()
+
+    @app.post("/v1/checkout/sessions")
+    def create_session():
+        form = request.form
+        unit_amount = int(form.get("line_items[0][price_data][unit_amount]", 0))
+        quantity = int(form.get("line_items[0][quantity]", 1))
+        session_id = f"cs_test_stub_{next(_ids)}"
+        checkout_session = {
+            "id": session_id,
+            "object": "checkout.session",
+            "mode": form.get("mode", "payment"),
+            "status": "open",
+            "payment_status": "unpaid",
+            "amount_total": unit_amount * quantity,
+            "currency": form.get("line_items[0][price_data][currency]", "inr"),
+            "client_reference_id": form.get("client_reference_id"),
+            "metadata": {k[len("metadata["):-1]: v for k, v in form.items() if k.startswith("metadata[")},
+            "success_url": form.get("success_url"),
+            "cancel_url": form.get("cancel_url"),
+            "expires_at": int(time.time()) + 24 * 3600,
+            "url": f"{request.host_url}pay/{session_id}",
+        }
+        with lock:
+            sessions[session_id] = checkout_session
+        return jsonify(checkout_session)
+
+    @app.get("/v1/checkout/sessions/<session_id>")
+    def retrieve_session(session_id):
+        checkout_session = sessions.get(session_id)
+        if not checkout_session:
+            return jsonify(error={"type": "invalid_request_error", "message": f"No such checkout.session: '{session_id}'"}), 404
+        return jsonify(checkout_session)
+
+    @app.get("/pay/<session_id>")
+    def pay(session_id):
+        checkout_session = sessions.get(session_id)
+        if not checkout_session:
+            return "No such session", 404
+        with lock:
+            checkout_session.update(status="complete", payment_status="paid")
+        if webhook_url:
+            deliver(webhook_url, secret, completed_event(checkout_session))
+        return redirect(checkout_session["success_url"].replace("{CHECKOUT_SESSION_ID}", session_id))
+
+    return app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=12111)
+    parser.add_argument("--webhook", help="App webhook URL, e.g. http://127.0.0.1:5000/stripe/webhook")
+    parser.add_argument("--secret", default="whsec_local", help="Must match STRIPE_WEBHOOK_SECRET")
+    args = parser.parse_args()
+    create_app(args.webhook, args.secret).run(port=args.port, threaded=True)
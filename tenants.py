@@ -0,0 +1,160 @@
+import io
+import re
+import csv
+
+from werkzeug.security import generate_password_hash
+
+import jobs
+import storage
+from repositories import UserRepository
+
+# Bulk tenant import; the matching exports are in reports.py. An upload
+# is read one row at a time and handled in batches: each batch is
+# validated (one query for emails already registered), its passwords are
+# hashed in the shared process pool (jobs.py), and it is inserted with
+# executemany and committed on its own. A bad row costs only its line in
+# the report, and a large file never sits in memory.
+
+COLUMNS = ("name", "email", "password")
+EMAIL = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+MAX_NAME = 100
+MAX_EMAIL = 150
+
+def _xlsx_rows(stream):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ValueError("XLSX import needs the openpyxl package (pip install openpyxl); upload a CSV instead.")
+    # read_only parses the sheet as it is iterated instead of loading it.
+    workbook = load_workbook(stream, read_only=True, data_only=True)
+    try:
+        yield from workbook.active.iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+
+def _cell(value):
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        # Spreadsheets store numeric passwords as floats.
+        value = int(value)
+    return str(value).strip()
+
+
+def read_rows(upload):
+    # Yields (line number, {column: value}) from a CSV or XLSX upload.
+    # Raises ValueError for a file that cannot be read at all.
+    if upload.filename.lower().endswith(".xlsx"):
+        rows = _xlsx_rows(upload.stream)
+    else:
+        rows = csv.reader(io.TextIOWrapper(upload.stream, encoding="utf-8-sig", newline=""))
+
+    header = None
+    try:
+        for line, row in enumerate(rows, start=1):
+            values = [_cell(value) for value in row]
+            if not any(values):
+                continue
+            if header is None:
+                header = [value.lower() for value in values]
+                missing = [column for column in COLUMNS if column not in header]
+                if missing:
+                    raise ValueError(f"Missing column(s): {', '.join(missing)}. "
+                                     f"The first row must name the columns {', '.join(COLUMNS)}.")
+                continue
+            yield line, dict(zip(header, values))
+    except UnicodeDecodeError:
+        raise ValueError("The CSV file must be UTF-8 encoded.")
+    except csv.Error as e:
+        raise ValueError(f"Could not read the CSV file: {e}")
+    if header is None:
+        raise ValueError("The file is empty.")
+
+
+def _problem(values, seen):
+    name, email, password = (values.get(column, "") for column in COLUMNS)
+    if not name:
+        return "Name is required"
+    if len(name) > MAX_NAME:
+        return f"Name is longer than {MAX_NAME} characters"
+    if not EMAIL.match(email) or len(email) > MAX_EMAIL:
+        return "Invalid email address"
+    if email.lower() in seen:
+        return "Email appears more than once in the file"
+    if not password:
+        return "Password is required"
+    return None
+
+
+def _import_batch(conn, admin_id, batch, seen, errors):
+    users = UserRepository(conn)
+    valid = []
+    for line, values in batch:
+        problem = _problem(values, seen)
+        if problem:
+            errors.append((line, values.get("email", ""), problem))
+            continue
+        seen.add(values["email"].lower())
+        valid.append((line, values))
+    if not valid:
+        return 0
+
+    taken = {email.lower() for email in users.taken_emails([values["email"] for _, values in valid])}
+    fresh = []
+    for line, values in valid:
+        if values["email"].lower() in taken:
+            errors.append((line, values["email"], "Email is already registered"))
+        else:
+            fresh.append((line, values))
+    if not fresh:
+        return 0
+
+    with jobs.process_pool() as pool:
+        hashes = list(pool.map(generate_password_hash, [values["password"] for _, values in fresh], chunksize=8))
+    tenants = [(values["name"], values["email"], password_hash) for (_, values), password_hash in zip(fresh, hashes)]
+
+    try:
+        users.create_many(admin_id, tenants)
+        conn.commit()
+        return len(tenants)
+    except storage.IntegrityError:
+        # Someone registered one of these emails since the check above;
+        # fall back to one row at a time to find out which.
+        conn.rollback()
+
+    created = 0
+    for (line, values), tenant in zip(fresh, tenants):
+        try:
+            users.create_many(admin_id, [tenant])
+            conn.commit()
+            created += 1
+        except storage.IntegrityError:
+            conn.rollback()
+            errors.append((line, values["email"], "Email is already registered"))
+    return created
+
+
+def import_tenants(conn, admin_id, rows, batch_size=250):
+    # rows: (line, values) pairs from read_rows(). Returns (created,
+    # errors), errors being (line, email, message) tuples; line is None for
+    # a problem with the file as a whole. Every batch is its own
+    # transaction, so rows before a failure stay imported.
+    created = 0
+    errors = []
+    seen = set()
+    batch = []
+    try:
+        for row in rows:
+            batch.append(row)
+            if len(batch) == batch_size:
+                created += _import_batch(conn, admin_id, batch, seen, errors)
+                batch = []
+    except ValueError as e:
+        # The file itself is unreadable from here on; keep what came before.
+        errors.append((None, "", str(e)))
+    if batch:
+        created += _import_batch(conn, admin_id, batch, seen, errors)
+    errors.sort(key=lambda error: error[0] or 0)
+    return created, errors
+
@@ -0,0 +1,5 @@
+# Production WSGI entry point: `gunicorn wsgi:app` (settings in
+# gunicorn.conf.py). `python app.py` is the development server only.
+from app import app
+
+application = app